@@ -7,6 +7,8 @@ class UserProfileInline(admin.StackedInline):
     model = UserProfile
     can_delete = False
     verbose_name_plural = 'Профиль'
+    # Счетчики ведет accounts.stats
+    readonly_fields = ('books_read', 'clubs_count')
 
 
 @admin.register(User)
@@ -21,5 +23,5 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'books_read', 'clubs_count', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('user__username', 'user__email')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('books_read', 'clubs_count', 'created_at', 'updated_at')
 
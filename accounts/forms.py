@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
+from images.uploads import DirectUploadMixin
 from .models import User, UserProfile
 
 
@@ -26,8 +27,10 @@ class UserRegistrationForm(UserCreationForm):
         return user
 
 
-class UserProfileForm(forms.ModelForm):
+class UserProfileForm(DirectUploadMixin, forms.ModelForm):
     """Форма редактирования профиля"""
+    direct_upload_fields = ('avatar',)
+
     class Meta:
         model = UserProfile
         fields = ('avatar', 'bio', 'favorite_genres')
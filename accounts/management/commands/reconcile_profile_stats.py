@@ -0,0 +1,37 @@
+"""
+Сверяет счетчики профилей (books_read, clubs_count) с фактическими данными.
+
+Запуск: python manage.py reconcile_profile_stats [--user USERNAME] [--enqueue]
+Периодически то же делает задача accounts.reconcile_statistics
+(CELERY_BEAT_SCHEDULE или cron с --enqueue).
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts import stats
+from accounts.models import User
+from jobs.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Исправляет расхождения статистики профилей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', default=[], help='Только для указанных пользователей')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--enqueue', action='store_true', help='Поставить сверку в очередь jobs, а не выполнять сразу')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            # Ключ по часу: повторный запуск в тот же час не создает дубликат
+            enqueue('accounts.reconcile_statistics', key=f'accounts.reconcile_statistics:{timezone.now():%Y%m%d%H}')
+            self.stdout.write(self.style.SUCCESS('Сверка поставлена в очередь'))
+            return
+
+        user_ids = None
+        if options['user']:
+            user_ids = list(User.objects.filter(username__in=options['user']).values_list('pk', flat=True))
+            if len(user_ids) != len(set(options['user'])):
+                raise CommandError('Некоторые пользователи не найдены')
+        fixed = stats.reconcile(user_ids=user_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Исправлено профилей: {fixed}'))
@@ -3,6 +3,8 @@ from django.db import models
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
+from . import stats
+
 
 class User(AbstractUser):
     """Расширенная модель пользователя"""
@@ -39,15 +41,18 @@ class UserProfile(models.Model):
     def get_absolute_url(self):
         return reverse('accounts:profile', kwargs={'username': self.user.username})
     
+    def save(self, *args, **kwargs):
+        # Счетчики меняются только атомарными UPDATE (accounts.stats): сохранение
+        # профиля со старыми значениями не должно их перезаписывать
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in stats.STAT_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
     def update_statistics(self):
-        """Обновляет статистику пользователя"""
-        from clubs.models import ClubMembership
-        from books.models import ReadingProgress
-        
-        self.clubs_count = ClubMembership.objects.filter(user=self.user).count()
-        self.books_read = ReadingProgress.objects.filter(
-            user=self.user,
-            is_completed=True
-        ).count()
-        self.save()
+        """Полностью пересчитывает статистику пользователя"""
+        stats.reconcile(user_ids=[self.user_id])
+        self.refresh_from_db(fields=stats.STAT_FIELDS)
 
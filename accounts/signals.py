@@ -1,7 +1,13 @@
+import logging
+
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from jobs.queue import job
+from . import stats
 from .models import User, UserProfile
 
+logger = logging.getLogger(__name__)
+
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -16,3 +22,11 @@ def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, 'profile'):
         instance.profile.save()
 
+
+
+@job('accounts.reconcile_statistics')
+def reconcile_statistics():
+    """Исправляет расхождения счетчиков профиля с фактическими данными"""
+    fixed = stats.reconcile()
+    if fixed:
+        logger.warning('Исправлена статистика профилей: %s', fixed)
@@ -0,0 +1,122 @@
+"""
+Инкрементальная статистика профиля (books_read, clubs_count).
+
+Счетчики меняются только при переходах состояния: прогресс чтения стал
+(или перестал быть) завершенным, участие в клубе создано или удалено.
+Изменение применяется одним атомарным UPDATE ... SET x = x + delta без
+сохранения профиля, поэтому не порождает сигналов и не перезаписывает
+параллельные изменения. Обычный UserProfile.save() счетчики не трогает.
+
+Массовые операции можно обернуть в deferred(): изменения копятся и
+применяются по одному UPDATE на пользователя при выходе из внешнего блока
+(вложенные блоки и повторные вызовы безопасны).
+
+Расхождения (bulk-операции в обход сигналов, ручные правки в базе)
+исправляет периодическая задача accounts.reconcile_statistics.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+STAT_FIELDS = ('books_read', 'clubs_count')
+
+_local = threading.local()
+
+
+def _pending():
+    return getattr(_local, 'pending', None)
+
+
+def adjust(user_id, **deltas):
+    """Сдвигает счетчики профиля пользователя: adjust(user_id, books_read=1)"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    unknown = set(deltas) - set(STAT_FIELDS)
+    if unknown:
+        raise ValueError(f'Неизвестные счетчики: {", ".join(sorted(unknown))}')
+    pending = _pending()
+    if pending is not None:
+        for field, delta in deltas.items():
+            pending[user_id][field] += delta
+        return
+    _apply(user_id, deltas)
+
+
+def _apply(user_id, deltas):
+    from .models import UserProfile
+
+    UserProfile.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items() if delta}
+    )
+
+
+@contextmanager
+def deferred():
+    """Копит изменения счетчиков и применяет их при выходе из внешнего блока"""
+    if _pending() is not None:
+        yield
+        return
+    _local.pending = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+    try:
+        yield
+    finally:
+        pending, _local.pending = _local.pending, None
+    # Применяем только при успешном выходе; при откате транзакции откатятся и UPDATE
+    for user_id, deltas in pending.items():
+        if any(deltas.values()):
+            _apply(user_id, deltas)
+
+
+def completed_delta(previous, current):
+    """+1/-1/0 для перехода is_completed"""
+    return int(bool(current)) - int(bool(previous))
+
+
+def expected_counts():
+    """Аннотации с фактическими значениями счетчиков для UserProfile"""
+    from books.models import ReadingProgress
+    from clubs.models import ClubMembership
+
+    def count_of(queryset):
+        subquery = queryset.order_by().values('user_id').annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(subquery, output_field=IntegerField()), Value(0))
+
+    return {
+        'expected_books_read': count_of(ReadingProgress.objects.filter(user_id=OuterRef('user_id'), is_completed=True)),
+        'expected_clubs_count': count_of(ClubMembership.objects.filter(user_id=OuterRef('user_id'))),
+    }
+
+
+def reconcile(user_ids=None, batch_size=500):
+    """
+    Пересчитывает счетчики и исправляет расхождения.
+
+    Выбираются только профили, где счетчик не совпадает с фактом; каждая
+    пачка исправляется одним UPDATE. Возвращает число исправленных профилей.
+    """
+    from .models import UserProfile
+
+    profiles = UserProfile.objects.annotate(**expected_counts()).filter(
+        ~Q(books_read=F('expected_books_read')) | ~Q(clubs_count=F('expected_clubs_count'))
+    )
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=user_ids)
+
+    fixed = 0
+    last_pk = 0
+    while True:
+        batch = list(profiles.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return fixed
+        # Значения пересчитываются в самом UPDATE, чтобы не затереть изменения,
+        # зафиксированные между выборкой и исправлением
+        expected = expected_counts()
+        fixed += UserProfile.objects.filter(pk__in=batch).update(
+            books_read=expected['expected_books_read'],
+            clubs_count=expected['expected_clubs_count'],
+        )
+        last_pk = batch[-1]
@@ -14,6 +14,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookclubhub.settings')
 django_asgi_app = get_asgi_application()
 
 # Import routing after Django is initialized
+from clubs import routing as clubs_routing
 from discussions import routing
 
 application = ProtocolTypeRouter({
@@ -21,7 +22,7 @@ application = ProtocolTypeRouter({
     "websocket": AllowedHostsOriginValidator(
         AuthMiddlewareStack(
             URLRouter(
-                routing.websocket_urlpatterns
+                routing.websocket_urlpatterns + clubs_routing.websocket_urlpatterns
             )
         )
     ),
@@ -0,0 +1,155 @@
+"""
+Кеширование страниц и фрагментов шаблонов с инвалидацией по сигналам.
+
+Ключи кеша включают версию "пространства имен" (books, clubs,
+posts:<club_id>). Сигналы моделей увеличивают версию через bump(), после
+чего все старые записи этого пространства перестают находиться и
+вытесняются по таймауту. Так инвалидация одинаково работает на locmem,
+файловом кеше и Redis, где нельзя удалить ключи по шаблону.
+
+bump() меняет версию только в том кеше, который видит процесс: с locmem
+остальные воркеры продолжали бы отдавать старые страницы. Поэтому без
+общего кеша (CACHE_SHARED) PAGE_TIMEOUT по умолчанию 0, и cache_page()
+и cached() ничего не кешируют.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+PAGE_TIMEOUT = getattr(settings, 'CACHE_PAGE_TIMEOUT', 0)
+VERSION_TIMEOUT = None  # версии хранятся бессрочно
+
+
+def _version_key(namespace):
+    return f'cache-version:{namespace}'
+
+
+def get_version(namespace):
+    """Текущая версия пространства имен"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Версия после вытеснения берется из времени, а не с 1,
+        # чтобы не совпасть с уже закешированными записями
+        cache.add(key, int(time.time() * 1000), VERSION_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(namespaces):
+    return [get_version(namespace) for namespace in namespaces]
+
+
+def bump(*namespaces):
+    """Инвалидирует все записи указанных пространств имен"""
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Версии нет в кеше - следующая get_version() создаст новую
+            pass
+
+
+def make_key(prefix, namespaces, *parts):
+    versions = '.'.join(str(version) for version in get_versions(namespaces))
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'{prefix}:{versions}:{digest}'
+
+
+def cached(prefix, namespaces, compute, *parts, timeout=PAGE_TIMEOUT):
+    """Значение compute() из кеша с ключом, зависящим от версий namespaces"""
+    if not timeout:
+        return compute()
+    key = make_key(prefix, namespaces, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def user_role(request):
+    """Роль пользователя для ключа кеша"""
+    user = request.user
+    if not user.is_authenticated:
+        return 'anon'
+    return 'staff' if user.is_staff else 'user'
+
+
+def _cacheable(request):
+    """
+    Кешируются только GET-запросы анонимов без сессии и отложенных сообщений:
+    у остальных страница содержит персональные данные.
+    """
+    return (
+        request.method == 'GET'
+        and not request.user.is_authenticated
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and 'messages' not in request.COOKIES
+    )
+
+
+def cache_page(namespaces, timeout=PAGE_TIMEOUT):
+    """
+    Кеширует ответ представления для анонимных пользователей.
+
+    namespaces - список пространств имен или функция (request, **kwargs) -> список.
+    Ключ зависит от пути, параметров запроса, роли пользователя и версий.
+    """
+    def decorator(view):
+        if not timeout:
+            return view
+        
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _cacheable(request):
+                return view(request, *args, **kwargs)
+            
+            names = namespaces(request, **kwargs) if callable(namespaces) else namespaces
+            query = sorted((key, value) for key in request.GET for value in request.GET.getlist(key))
+            key = make_key('page', names, request.path, query, user_role(request))
+            
+            entry = cache.get(key)
+            if entry is not None:
+                response = HttpResponse(entry['content'], status=entry['status'], content_type=entry['content_type'])
+                response['X-Cache'] = 'HIT'
+                return response
+            
+            response = view(request, *args, **kwargs)
+            
+            def store(response):
+                if response.status_code == 200:
+                    cache.set(key, {
+                        'content': response.content,
+                        'status': response.status_code,
+                        'content_type': response['Content-Type'],
+                    }, timeout)
+                response['X-Cache'] = 'MISS'
+            
+            if hasattr(response, 'add_post_render_callback') and not response.is_rendered:
+                response.add_post_render_callback(store)
+            else:
+                store(response)
+            return response
+        return wrapper
+    return decorator
+
+
+class CacheVersions:
+    """Ленивый доступ к версиям из шаблонов: {% cache 600 name cache_versions.books %}"""
+    
+    def __getitem__(self, namespace):
+        return get_version(namespace)
+    
+    def __contains__(self, namespace):
+        return True
+
+
+def cache_versions(request):
+    """Контекстный процессор: версии пространств имен для {% cache %}"""
+    return {'cache_versions': CacheVersions()}
@@ -0,0 +1,459 @@
+"""
+Слои каналов (channel layers) для Django Channels без Redis.
+
+MemoryChannelLayer - один процесс (разработка, один ASGI-воркер).
+DatabaseChannelLayer - несколько процессов через базу данных проекта:
+на PostgreSQL сообщения рассылаются через LISTEN/NOTIFY, на SQLite -
+через таблицу-журнал, которую процессы опрашивают.
+
+Общее для обоих слоев:
+
+* group_send не отправляет сообщение сразу, а кладет его в очередь группы;
+  фоновый поток раз в batch_interval отправляет накопившееся одной пачкой.
+* Сообщения с ключом "coalesce" схлопываются: пока пачка не отправлена,
+  новое сообщение группы с тем же значением заменяет предыдущее (например,
+  несколько обновлений счетчика лайков превращаются в одно).
+* Очередь группы ограничена group_capacity. Если она заполнена, group_send
+  ждет отправки пачки до backpressure_timeout секунд, после чего самое
+  старое сообщение группы отбрасывается. Очередь канала ограничена capacity:
+  медленный клиент теряет сообщения группы, а send() в его канал
+  выбрасывает ChannelFull.
+
+Сообщения передаются между процессами в JSON, поэтому должны состоять из
+JSON-совместимых значений. Вся работа с базой идет в фоновых потоках и не
+блокирует цикл событий.
+"""
+import asyncio
+import json
+import logging
+import secrets
+import select
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'channel_layer'
+NOTIFY_LIMIT = 7900  # полезная нагрузка NOTIFY ограничена 8000 байт
+MESSAGE_TABLE = 'channel_layer_message'
+
+
+def _put_all(puts):
+    for queue, item in puts:
+        queue.put_nowait(item)
+
+
+class _LocalChannel:
+    """Очередь канала и цикл событий, в котором его читают"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+
+class BatchingChannelLayer(BaseChannelLayer):
+    """
+    Базовый слой: локальные каналы и группы процесса, пакетная отправка.
+
+    Подклассы задают транспорт между процессами (publish/listen). Без
+    транспорта слой работает в пределах одного процесса.
+    """
+
+    extensions = ['groups', 'flush']
+
+    def __init__(self, expiry=60, capacity=100, channel_capacity=None, group_expiry=86400,
+                 group_capacity=1000, batch_interval=0.02, batch_size=500,
+                 backpressure_timeout=1.0, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.channel_capacity = self.compile_capacities(self.channel_capacity)
+        self.group_expiry = group_expiry
+        self.group_capacity = group_capacity
+        self.batch_interval = batch_interval
+        self.batch_size = batch_size
+        self.backpressure_timeout = backpressure_timeout
+
+        self.client_prefix = secrets.token_hex(6)
+        self.channels = {}
+        self.groups = {}
+        self.outbox = OrderedDict()
+        self.pending = 0
+        self.stats = Counter()
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._flusher = None
+        self._listener = None
+
+    # Транспорт (переопределяется в подклассах)
+
+    def publish(self, payload):
+        """Отправляет пачку остальным процессам"""
+
+    def listen(self, handle):
+        """Блокирующий цикл получения пачек от других процессов"""
+
+    # API слоя
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        assert self.valid_channel_name(channel), 'Channel name not valid'
+        local = self.channels.get(channel)
+        if local is not None:
+            if local.queue.qsize() >= self.get_capacity(channel):
+                raise ChannelFull(channel)
+            self._deliver(channel, message, strict=True)
+            return
+        await self._enqueue(None, channel, message)
+
+    async def receive(self, channel):
+        assert self.valid_channel_name(channel)
+        local = self._register(channel)
+        try:
+            expires, message = await local.queue.get()
+            while expires < time.time():
+                self.stats['expired'] += 1
+                expires, message = await local.queue.get()
+        except asyncio.CancelledError:
+            # Отмена receive означает, что потребитель завершился
+            self._forget(channel)
+            raise
+        return message
+
+    async def new_channel(self, prefix='specific'):
+        channel = f'{prefix}.{self.client_prefix}!{secrets.token_hex(8)}'
+        self._register(channel)
+        return channel
+
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), 'Group name not valid'
+        assert self.valid_channel_name(channel), 'Channel name not valid'
+        with self._lock:
+            self.groups.setdefault(group, {})[channel] = time.time()
+
+    async def group_discard(self, group, channel):
+        assert self.valid_group_name(group), 'Invalid group name'
+        assert self.valid_channel_name(channel), 'Invalid channel name'
+        with self._lock:
+            members = self.groups.get(group)
+            if members is not None:
+                members.pop(channel, None)
+                if not members:
+                    del self.groups[group]
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        assert self.valid_group_name(group), 'Invalid group name'
+        await self._enqueue(group, None, message)
+
+    async def flush(self):
+        with self._lock:
+            self.channels = {}
+            self.groups = {}
+            self.outbox = OrderedDict()
+            self.pending = 0
+
+    async def close(self):
+        pass
+
+    def drain(self, timeout=5.0):
+        """Ждет отправки всех накопленных сообщений (для команд и тестов)"""
+        self._wakeup.set()
+        return self._idle.wait(timeout)
+
+    # Локальная доставка
+
+    def _register(self, channel):
+        local = self.channels.get(channel)
+        if local is None:
+            local = self.channels[channel] = _LocalChannel(asyncio.get_running_loop())
+            self._ensure_listener()
+        return local
+
+    def _forget(self, channel):
+        with self._lock:
+            self.channels.pop(channel, None)
+            for group in [group for group, members in self.groups.items() if channel in members]:
+                del self.groups[group][channel]
+                if not self.groups[group]:
+                    del self.groups[group]
+
+    def _prepare(self, channel, message, strict=False):
+        """Проверяет емкость канала и возвращает (канал, элемент очереди) или None"""
+        local = self.channels.get(channel)
+        if local is None:
+            return None
+        if not strict and local.queue.qsize() >= self.get_capacity(channel):
+            self.stats['dropped'] += 1
+            return None
+        return local, (time.time() + self.expiry, dict(message))
+
+    def _deliver_many(self, entries):
+        """
+        Кладет элементы в очереди локальных каналов из любого потока.
+
+        Элементы группируются по циклу событий, чтобы будить каждый цикл
+        один раз на пачку, а не на каждого получателя.
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        by_loop = {}
+        for local, item in entries:
+            by_loop.setdefault(local.loop, []).append((local.queue, item))
+        for loop, puts in by_loop.items():
+            if loop is running:
+                _put_all(puts)
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(_put_all, puts)
+            self.stats['delivered'] += len(puts)
+
+    def _deliver(self, channel, message, strict=False):
+        entry = self._prepare(channel, message, strict)
+        if entry is not None:
+            self._deliver_many([entry])
+
+    def _dispatch(self, items):
+        """Раздает пачку локальным каналам"""
+        expired_before = time.time() - self.group_expiry
+        entries = []
+        for group, channel, message in items:
+            if group is None:
+                names = [channel]
+            else:
+                with self._lock:
+                    names = [
+                        name for name, joined in self.groups.get(group, {}).items()
+                        if joined >= expired_before
+                    ]
+            for name in names:
+                entry = self._prepare(name, message)
+                if entry is not None:
+                    entries.append(entry)
+        self._deliver_many(entries)
+
+    # Пакетная отправка
+
+    async def _enqueue(self, group, channel, message):
+        key = (group, channel)
+        deadline = time.monotonic() + self.backpressure_timeout
+        while True:
+            with self._lock:
+                pending = self.outbox.setdefault(key, OrderedDict())
+                coalesce = message.get('coalesce')
+                if coalesce is not None and ('c', coalesce) in pending:
+                    pending[('c', coalesce)] = message
+                    self.stats['coalesced'] += 1
+                    return
+                if len(pending) < self.group_capacity or time.monotonic() >= deadline:
+                    if len(pending) >= self.group_capacity:
+                        pending.popitem(last=False)
+                        self.pending -= 1
+                        self.stats['dropped'] += 1
+                    slot = ('c', coalesce) if coalesce is not None else ('m', self.stats['queued'])
+                    pending[slot] = message
+                    self.stats['queued'] += 1
+                    self.pending += 1
+                    self._idle.clear()
+                    break
+            # Группа переполнена: даем фоновому потоку отправить пачку
+            self._wakeup.set()
+            await asyncio.sleep(self.batch_interval)
+        self._ensure_flusher()
+        self._wakeup.set()
+
+    def _ensure_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_loop, name='channel-layer-flush', daemon=True)
+            self._flusher.start()
+
+    def _ensure_listener(self):
+        if type(self).listen is BatchingChannelLayer.listen:
+            return
+        if self._listener is None or not self._listener.is_alive():
+            self._listener = threading.Thread(target=self._listen_loop, name='channel-layer-listen', daemon=True)
+            self._listener.start()
+
+    def _take_batch(self):
+        with self._lock:
+            outbox, self.outbox = self.outbox, OrderedDict()
+            self.pending = 0
+        return [
+            [group, channel, message]
+            for (group, channel), messages in outbox.items()
+            for message in messages.values()
+        ]
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self.pending < self.batch_size:
+                # Собираем пачку, пока не истек интервал или не набран batch_size
+                time.sleep(self.batch_interval)
+            items = self._take_batch()
+            if not items:
+                self._idle.set()
+                continue
+            self._dispatch(items)
+            for start in range(0, len(items), self.batch_size):
+                chunk = items[start:start + self.batch_size]
+                payload = json.dumps({'src': self.client_prefix, 'items': chunk})
+                try:
+                    self.publish(payload)
+                    self.stats['batches'] += 1
+                except Exception:
+                    self.stats['errors'] += 1
+                    logger.exception('Не удалось отправить пачку сообщений слоя каналов')
+            with self._lock:
+                if not self.pending:
+                    self._idle.set()
+
+    def _listen_loop(self):
+        while True:
+            try:
+                self.listen(self._receive_payload)
+            except Exception:
+                self.stats['errors'] += 1
+                logger.exception('Ошибка получения сообщений слоя каналов, переподключение')
+                time.sleep(1)
+
+    def _receive_payload(self, payload):
+        envelope = json.loads(payload)
+        # Свои пачки уже доставлены локально при отправке
+        if envelope['src'] != self.client_prefix:
+            self._dispatch(envelope['items'])
+
+
+class MemoryChannelLayer(BatchingChannelLayer):
+    """Слой для одного процесса"""
+
+
+class DatabaseChannelLayer(BatchingChannelLayer):
+    """
+    Слой для нескольких процессов через базу данных alias.
+
+    PostgreSQL: LISTEN/NOTIFY, большие пачки сохраняются в таблицу, а в
+    NOTIFY передается только их id. SQLite: журнал в таблице, опрос раз в
+    poll_interval. Таблица создается при первом использовании, старые записи
+    удаляются через expiry секунд.
+    """
+
+    def __init__(self, alias='default', poll_interval=0.05, **kwargs):
+        super().__init__(**kwargs)
+        self.alias = alias
+        self.poll_interval = poll_interval
+        self.vendor = connections[alias].vendor
+        self._publisher = None
+        self._last_cleanup = 0
+
+    def _connect(self):
+        wrapper = connections[self.alias]
+        params = wrapper.get_connection_params()
+        if self.vendor == 'postgresql':
+            import psycopg2
+            conn = psycopg2.connect(**params)
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS {MESSAGE_TABLE} ('
+                    'id bigserial PRIMARY KEY, payload text NOT NULL, '
+                    'created_at double precision NOT NULL)'
+                )
+            return conn
+        if self.vendor == 'sqlite':
+            conn = sqlite3.connect(params['database'], timeout=params.get('timeout', 5),
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {MESSAGE_TABLE} ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, '
+                'created_at REAL NOT NULL)'
+            )
+            return conn
+        raise NotImplementedError(f'DatabaseChannelLayer не поддерживает {self.vendor}')
+
+    def _cleanup(self, cursor):
+        now = time.time()
+        if now - self._last_cleanup > self.expiry:
+            placeholder = '%s' if self.vendor == 'postgresql' else '?'
+            cursor.execute(f'DELETE FROM {MESSAGE_TABLE} WHERE created_at < {placeholder}', [now - self.expiry])
+            self._last_cleanup = now
+
+    def publish(self, payload):
+        if self._publisher is None:
+            self._publisher = self._connect()
+        try:
+            if self.vendor == 'postgresql':
+                self._publish_postgres(payload)
+            else:
+                self._publish_sqlite(payload)
+        except Exception:
+            self._publisher.close()
+            self._publisher = None
+            raise
+
+    def _publish_postgres(self, payload):
+        with self._publisher.cursor() as cursor:
+            if len(payload.encode()) <= NOTIFY_LIMIT:
+                cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, payload])
+                return
+            cursor.execute(
+                f'INSERT INTO {MESSAGE_TABLE} (payload, created_at) VALUES (%s, %s) RETURNING id',
+                [payload, time.time()],
+            )
+            message_id = cursor.fetchone()[0]
+            cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, f'#{message_id}'])
+            self._cleanup(cursor)
+
+    def _publish_sqlite(self, payload):
+        cursor = self._publisher.cursor()
+        cursor.execute(f'INSERT INTO {MESSAGE_TABLE} (payload, created_at) VALUES (?, ?)', [payload, time.time()])
+        self._cleanup(cursor)
+
+    def listen(self, handle):
+        conn = self._connect()
+        try:
+            if self.vendor == 'postgresql':
+                self._listen_postgres(conn, handle)
+            else:
+                self._listen_sqlite(conn, handle)
+        finally:
+            conn.close()
+
+    def _listen_postgres(self, conn, handle):
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+        while True:
+            if select.select([conn], [], [], 5.0) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                payload = conn.notifies.pop(0).payload
+                if payload.startswith('#'):
+                    with conn.cursor() as cursor:
+                        cursor.execute(f'SELECT payload FROM {MESSAGE_TABLE} WHERE id = %s', [int(payload[1:])])
+                        row = cursor.fetchone()
+                    if row is None:
+                        continue
+                    payload = row[0]
+                handle(payload)
+
+    def _listen_sqlite(self, conn, handle):
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {MESSAGE_TABLE}')
+        last_id = cursor.fetchone()[0]
+        while True:
+            cursor.execute(f'SELECT id, payload FROM {MESSAGE_TABLE} WHERE id > ? ORDER BY id', [last_id])
+            rows = cursor.fetchall()
+            for last_id, payload in rows:
+                handle(payload)
+            if not rows:
+                time.sleep(self.poll_interval)
@@ -0,0 +1,565 @@
+"""
+Синтетические данные для нагрузочного тестирования.
+
+План генерации (объемы, размеры клубов, распределение постов, комментариев
+и лайков) строится в основном процессе NumPy-генератором по seed. Строки
+пишутся задачами по диапазонам этого плана через bulk_create, задачи
+выполняются параллельно в процессах (fork). Первичные ключи пользователей,
+книг, клубов, постов и комментариев назначаются планом, поэтому задачи не
+обмениваются данными: участники клуба, авторы и лайки в любой задаче
+восстанавливаются из того же seed.
+
+Каждый объект получает собственный генератор random.Random от (seed, фаза,
+номер объекта), так что результат не зависит от числа процессов и размера
+пачек: на пустой базе одинаковые seed и anchor дают одинаковые данные.
+
+Распределения подобраны под реальную нагрузку: размеры клубов и число
+комментариев в посте - Парето (несколько огромных клубов и горячих постов,
+длинный хвост маленьких), популярность книг - степенная, деревья
+комментариев содержат длинные цепочки ответов до max_depth уровней. Поля
+MPTT (tree_id, lft, rght, level) и path считаются сразу, счетчики
+likes_count и comments_count заполняются при вставке.
+"""
+import multiprocessing
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+
+from accounts.models import UserProfile
+from books.models import Book, Genre, ReadingProgress
+from clubs.models import Club, ClubMembership
+from discussions import storage
+from discussions.models import Comment, Post
+
+User = get_user_model()
+
+# Объемы при scale=1 (около 600 тыс. строк); scale=20 - около 10 млн
+DEFAULTS = {
+    'users': 10000,
+    'books': 5000,
+    'clubs': 500,
+    'posts': 20000,
+    'comments': 200000,
+    'likes': 200000,
+    'reading': 100000,
+}
+
+BATCH_SIZE = 2000
+# Строк в одной задаче процесса
+TASK_ROWS = 50000
+
+# Фазы: отдельные последовательности случайных чисел
+PHASE_USERS = 1
+PHASE_BOOKS = 2
+PHASE_CLUBS = 3
+PHASE_MEMBERS = 4
+PHASE_MEMBERSHIPS = 5
+PHASE_POSTS = 6
+PHASE_READING = 7
+PHASE_PAGES = 8
+
+# Уровень вложенности ограничен длиной path
+MAX_DEPTH = storage.MAX_LEVEL
+
+GENRES = [
+    'Фантастика', 'Фэнтези', 'Детектив', 'Роман', 'Драма', 'Приключения', 'Историческая проза',
+    'Научная литература', 'Биография', 'Поэзия', 'Комедия', 'Триллер', 'Хоррор', 'Мистика', 'Юмор',
+]
+
+WORDS = (
+    'книга глава герой автор сюжет финал начало роман читать думать страница история мир время '
+    'жизнь город дорога письмо память ночь утро свет тень вопрос ответ мысль идея образ стиль язык '
+    'диалог персонаж конфликт развязка поворот смысл эпоха война любовь семья дружба выбор судьба '
+    'очень совсем снова почти сразу потом вдруг никогда всегда здесь там интересно странно понятно '
+    'кажется согласен спорно сильно слабо медленно быстро неожиданно предсказуемо красиво'
+).split()
+FIRST_NAMES = 'Анна Мария Елена Ольга Ирина Алексей Иван Дмитрий Сергей Николай Павел Татьяна Юлия Андрей Михаил'.split()
+LAST_NAMES = 'Иванов Петров Смирнов Кузнецов Попов Соколов Лебедев Козлов Новиков Морозов Волков Зайцев Орлов'.split()
+POST_TYPES = ['discussion', 'question', 'quote', 'note']
+POST_TYPE_WEIGHTS = [0.55, 0.25, 0.1, 0.1]
+
+# План для задач: при fork процессы наследуют его без сериализации
+_plan = None
+
+
+@dataclass
+class Plan:
+    seed: int
+    anchor: object
+    days: int
+    prefix: str
+    password: str
+    max_depth: int
+    users: int
+    books: int
+    clubs: int
+    user_base: int
+    book_base: int
+    club_base: int
+    post_base: int
+    comment_base: int
+    tree_base: int
+    genre_ids: list
+    # Массивы по клубам и постам (индексы с нуля)
+    club_sizes: np.ndarray = field(repr=False)
+    club_creators: np.ndarray = field(repr=False)
+    post_offsets: np.ndarray = field(repr=False)
+    post_comments: np.ndarray = field(repr=False)
+    comment_offsets: np.ndarray = field(repr=False)
+    post_likes: np.ndarray = field(repr=False)
+    comment_likes: np.ndarray = field(repr=False)
+    user_reading: np.ndarray = field(repr=False)
+
+    def rng(self, phase, index):
+        return random.Random(((self.seed * 16 + phase) << 40) + index)
+
+    def moment(self, rng, after=None):
+        """Случайный момент между after (или началом периода) и anchor"""
+        start = after or self.anchor - timedelta(days=self.days)
+        return start + (self.anchor - start) * rng.random()
+
+    def user_id(self, index):
+        return self.user_base + 1 + index
+
+    def members(self, club):
+        """Индексы участников клуба; создатель первый, активные участники ближе к началу"""
+        size = int(self.club_sizes[club])
+        creator = int(self.club_creators[club])
+        sample = self.rng(PHASE_MEMBERS, club).sample(range(self.users), size)
+        return [creator] + [user for user in sample if user != creator][:size - 1]
+
+    @property
+    def posts(self):
+        return int(self.post_offsets[-1])
+
+
+def _pareto(rng, alpha, size):
+    return rng.pareto(alpha, size) + 1
+
+
+def _spread(rng, total, weights):
+    """Раскладывает total по корзинам пропорционально весам"""
+    if not total or not weights.sum():
+        return np.zeros(len(weights), dtype=np.int64)
+    return rng.multinomial(total, weights / weights.sum()).astype(np.int64)
+
+
+def _max_pk(model, field_name='pk'):
+    return model.objects.aggregate(value=Max(field_name))['value'] or 0
+
+
+def build_plan(seed, anchor, days=730, prefix='load', password='loadtest', max_depth=MAX_DEPTH,
+               club_size_alpha=1.3, min_club_size=3, **volumes):
+    """Строит план генерации; объемы - ключи DEFAULTS"""
+    volumes = {**DEFAULTS, **{name: value for name, value in volumes.items() if value is not None}}
+    rng = np.random.default_rng(seed)
+    users, books, clubs = volumes['users'], volumes['books'], volumes['clubs']
+    if not users or (clubs and not books):
+        raise ValueError('Нужен хотя бы один пользователь и книга для клубов')
+
+    club_sizes = np.minimum(users, (_pareto(rng, club_size_alpha, clubs) * min_club_size).astype(np.int64))
+    club_sizes = np.maximum(club_sizes, 1)
+    club_creators = rng.integers(0, users, clubs)
+    # Посты пропорциональны размеру клуба, комментарии и лайки - Парето по постам
+    club_posts = _spread(rng, volumes['posts'], club_sizes.astype(np.float64))
+    post_offsets = np.concatenate([[0], np.cumsum(club_posts)])
+    posts = int(post_offsets[-1])
+    post_comments = _spread(rng, volumes['comments'], _pareto(rng, 1.2, posts))
+    comment_offsets = np.concatenate([[0], np.cumsum(post_comments)])
+    post_sizes = np.repeat(club_sizes, club_posts)
+    post_likes = np.minimum(_spread(rng, volumes['likes'] // 2, _pareto(rng, 1.5, posts)), post_sizes)
+    comment_likes = np.minimum(
+        _spread(rng, volumes['likes'] - volumes['likes'] // 2, post_comments.astype(np.float64)),
+        post_comments * post_sizes,
+    )
+    user_reading = np.minimum(books, _spread(rng, volumes['reading'], _pareto(rng, 1.5, users)))
+
+    return Plan(
+        seed=seed, anchor=anchor, days=days, prefix=prefix, password=make_password(password),
+        max_depth=min(max_depth, MAX_DEPTH), users=users, books=books, clubs=clubs,
+        user_base=_max_pk(User), book_base=_max_pk(Book), club_base=_max_pk(Club),
+        post_base=_max_pk(Post), comment_base=_max_pk(Comment), tree_base=_max_pk(Comment, 'tree_id'),
+        genre_ids=ensure_genres(),
+        club_sizes=club_sizes, club_creators=club_creators, post_offsets=post_offsets,
+        post_comments=post_comments, comment_offsets=comment_offsets,
+        post_likes=post_likes, comment_likes=comment_likes, user_reading=user_reading,
+    )
+
+
+def ensure_genres():
+    """Id жанров; при пустом справочнике создаются стандартные жанры"""
+    if not Genre.objects.exists():
+        Genre.objects.bulk_create([Genre(name=name, slug=f'genre-{i}') for i, name in enumerate(GENRES, 1)])
+    return list(Genre.objects.order_by('pk').values_list('pk', flat=True))
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Отключает auto_now/auto_now_add, чтобы bulk_create сохранил заданные даты"""
+    fields = [
+        (model_field, model_field.auto_now, model_field.auto_now_add)
+        for model in models for model_field in model._meta.concrete_fields
+        if getattr(model_field, 'auto_now', False) or getattr(model_field, 'auto_now_add', False)
+    ]
+    for model_field, _, _ in fields:
+        model_field.auto_now = model_field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for model_field, auto_now, auto_now_add in fields:
+            model_field.auto_now, model_field.auto_now_add = auto_now, auto_now_add
+
+
+def _text(rng, low, high):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return ' '.join(words).capitalize() + '.'
+
+
+def _isbn(index):
+    # 9790 - префикс нотных изданий (ISMN): не пересекается с ISBN реального каталога
+    digits = f'9790{index:08d}'
+    total = sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(digits))
+    return digits + str((10 - total % 10) % 10)
+
+
+def _skewed(rng, size, power):
+    """Индекс в [0, size), смещенный к началу: степенная популярность"""
+    return int(size * rng.random() ** power)
+
+
+def _unique(rng, count, draw):
+    """
+    До count различных значений draw().
+
+    Попыток не больше 20 на значение: при почти полном переборе редкий
+    хвост распределения не выпадает, и значений получается меньше.
+    """
+    values = set()
+    for _ in range(count * 20):
+        if len(values) >= count:
+            break
+        values.add(draw())
+    return values
+
+
+class Writer:
+    """Накапливает объекты по моделям и сохраняет их пачками"""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.pending = {}
+        self.counts = {}
+
+    def add(self, model, obj):
+        rows = self.pending.setdefault(model, [])
+        rows.append(obj)
+        if len(rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Модели сохраняются в порядке первого добавления: родители раньше детей
+        for model, rows in self.pending.items():
+            if rows:
+                model.objects.bulk_create(rows, batch_size=self.batch_size)
+                label = model._meta.label
+                self.counts[label] = self.counts.get(label, 0) + len(rows)
+        self.pending = {}
+
+
+def make_users(plan, start, stop, writer):
+    for index in range(start, stop):
+        rng = plan.rng(PHASE_USERS, index)
+        pk = plan.user_id(index)
+        joined = plan.moment(rng)
+        writer.add(User, User(
+            pk=pk, username=f'{plan.prefix}{index}', email=f'{plan.prefix}{index}@example.com',
+            password=plan.password, first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+            date_joined=joined,
+        ))
+        writer.add(UserProfile, UserProfile(user_id=pk, created_at=joined, updated_at=joined))
+
+
+def book_pages(plan, index):
+    """Объем книги; отдельная последовательность, чтобы фаза прогресса знала его без запроса"""
+    return int(min(1500, max(40, plan.rng(PHASE_PAGES, index).lognormvariate(5.7, 0.5))))
+
+
+def make_books(plan, start, stop, writer):
+    through = Book.genres.through
+    for index in range(start, stop):
+        rng = plan.rng(PHASE_BOOKS, index)
+        pk = plan.book_base + 1 + index
+        added = plan.moment(rng)
+        writer.add(Book, Book(
+            pk=pk, title=_text(rng, 1, 5).rstrip('.'),
+            author=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            isbn=_isbn(index), description=_text(rng, 20, 80),
+            pages=book_pages(plan, index),
+            published_year=rng.randint(1850, plan.anchor.year),
+            created_at=added, updated_at=added,
+        ))
+        for genre_id in rng.sample(plan.genre_ids, min(len(plan.genre_ids), rng.randint(1, 3))):
+            writer.add(through, through(book_id=pk, genre_id=genre_id))
+
+
+def make_clubs(plan, start, stop, writer):
+    for index in range(start, stop):
+        rng = plan.rng(PHASE_CLUBS, index)
+        created = plan.moment(rng)
+        club = Club(
+            pk=plan.club_base + 1 + index, name=f'Клуб {_text(rng, 1, 3).rstrip(".")}',
+            description=_text(rng, 10, 40), is_private=rng.random() < 0.2,
+            invitation_code=uuid.UUID(int=rng.getrandbits(128), version=4),
+            created_by_id=plan.user_id(int(plan.club_creators[index])),
+            created_at=created, updated_at=created,
+        )
+        if rng.random() < 0.7:
+            club.current_book_id = plan.book_base + 1 + _skewed(rng, plan.books, 3)
+            club.reading_start_date = (plan.anchor - timedelta(days=rng.randint(0, 60))).date()
+            club.reading_end_date = club.reading_start_date + timedelta(days=rng.randint(14, 90))
+        writer.add(Club, club)
+
+
+def make_memberships(plan, start, stop, writer):
+    for index in range(start, stop):
+        rng = plan.rng(PHASE_MEMBERSHIPS, index)
+        club_id = plan.club_base + 1 + index
+        members = plan.members(index)
+        moderators = max(0, len(members) // 50)
+        for position, user in enumerate(members):
+            role = 'admin' if position == 0 else 'moderator' if position <= moderators else 'member'
+            writer.add(ClubMembership, ClubMembership(
+                club_id=club_id, user_id=plan.user_id(user), role=role, joined_at=plan.moment(rng),
+            ))
+
+
+def comment_tree(rng, size, max_depth):
+    """
+    Родители (индекс или -1) и уровни комментариев поста.
+
+    Часть комментариев - новые ветки, часть - ответ на предыдущий
+    комментарий (так получаются глубокие цепочки), остальные - ответ на
+    случайный комментарий.
+    """
+    parents = []
+    levels = []
+    for index in range(size):
+        roll = rng.random()
+        parent = -1
+        if index and roll >= 0.25:
+            parent = index - 1 if roll < 0.6 else rng.randrange(index)
+            if levels[parent] >= max_depth:
+                parent = -1
+        parents.append(parent)
+        levels.append(levels[parent] + 1 if parent >= 0 else 0)
+    return parents, levels
+
+
+def nested_sets(parents):
+    """lft и rght для деревьев, где дети упорядочены по индексу (= created_at)"""
+    children = [[] for _ in parents]
+    for index, parent in enumerate(parents):
+        if parent >= 0:
+            children[parent].append(index)
+    lft = [0] * len(parents)
+    rght = [0] * len(parents)
+    for root, parent in enumerate(parents):
+        if parent >= 0:
+            continue
+        counter = 1
+        stack = [(root, iter(children[root]))]
+        lft[root] = counter
+        while stack:
+            node, rest = stack[-1]
+            child = next(rest, None)
+            if child is None:
+                stack.pop()
+                counter += 1
+                rght[node] = counter
+            else:
+                counter += 1
+                lft[child] = counter
+                stack.append((child, iter(children[child])))
+    return lft, rght
+
+
+def make_posts(plan, start, stop, writer):
+    """Посты с диапазоном номеров [start, stop), их комментарии и лайки"""
+    post_likes = Post.likes.through
+    comment_likes = Comment.likes.through
+    club = int(np.searchsorted(plan.post_offsets, start, side='right')) - 1
+    members = plan.members(club)
+    for index in range(start, stop):
+        while index >= plan.post_offsets[club + 1]:
+            club += 1
+            members = plan.members(club)
+        rng = plan.rng(PHASE_POSTS, index)
+        post_id = plan.post_base + 1 + index
+        created = plan.moment(rng)
+        size = int(plan.post_comments[index])
+        likes = int(plan.post_likes[index])
+        writer.add(Post, Post(
+            pk=post_id, club_id=plan.club_base + 1 + club,
+            author_id=plan.user_id(members[_skewed(rng, len(members), 2)]),
+            title=_text(rng, 2, 8).rstrip('.'), content=_text(rng, 30, 200),
+            post_type=rng.choices(POST_TYPES, POST_TYPE_WEIGHTS)[0],
+            chapter=rng.randint(1, 40) if rng.random() < 0.5 else None,
+            likes_count=likes, comments_count=size, created_at=created, updated_at=created,
+        ))
+        for user in rng.sample(members, likes):
+            writer.add(post_likes, post_likes(post_id=post_id, user_id=plan.user_id(user)))
+
+        # Лайки комментариев: уникальные пары (комментарий, участник)
+        liked = _unique(rng, int(plan.comment_likes[index]), lambda: (
+            _skewed(rng, size, 2), _skewed(rng, len(members), 1.5),
+        ))
+        counts = [0] * size
+        for position, _ in liked:
+            counts[position] += 1
+
+        parents, levels = comment_tree(rng, size, plan.max_depth)
+        lft, rght = nested_sets(parents)
+        base = plan.comment_base + 1 + int(plan.comment_offsets[index])
+        moments = sorted(created + (plan.anchor - created) * rng.random() for _ in range(size))
+        paths = []
+        roots = []
+        for position in range(size):
+            parent = parents[position]
+            pk = base + position
+            root = roots[parent] if parent >= 0 else position
+            roots.append(root)
+            paths.append((paths[parent] if parent >= 0 else '') + storage.encode(pk))
+            writer.add(Comment, Comment(
+                pk=pk, post_id=post_id, author_id=plan.user_id(members[_skewed(rng, len(members), 2)]),
+                content=_text(rng, 5, 60), parent_id=base + parent if parent >= 0 else None,
+                likes_count=counts[position], path=paths[position],
+                tree_id=plan.tree_base + 1 + (base + root - plan.comment_base - 1),
+                lft=lft[position], rght=rght[position], level=levels[position],
+                created_at=moments[position], updated_at=moments[position],
+            ))
+        for position, user in sorted(liked):
+            writer.add(comment_likes, comment_likes(comment_id=base + position, user_id=plan.user_id(user)))
+
+
+def make_reading(plan, start, stop, writer):
+    for index in range(start, stop):
+        rng = plan.rng(PHASE_READING, index)
+        books = _unique(rng, int(plan.user_reading[index]), lambda: _skewed(rng, plan.books, 3))
+        for book in sorted(books):
+            started = plan.moment(rng)
+            updated = plan.moment(rng, after=started)
+            completed = rng.random() < 0.4
+            pages = book_pages(plan, book)
+            pages_read = pages if completed else rng.randint(0, pages)
+            writer.add(ReadingProgress, ReadingProgress(
+                user_id=plan.user_id(index), book_id=plan.book_base + 1 + book,
+                current_chapter=pages_read // 20 + 1, pages_read=pages_read, is_completed=completed,
+                started_at=started, completed_at=updated if completed else None, updated_at=updated,
+            ))
+
+
+# (название, функция, модели с явными датами)
+PHASES = [
+    ('users', make_users, [User, UserProfile]),
+    ('books', make_books, [Book]),
+    ('clubs', make_clubs, [Club]),
+    ('memberships', make_memberships, [ClubMembership]),
+    ('posts', make_posts, [Post, Comment]),
+    ('reading', make_reading, [ReadingProgress]),
+]
+
+
+def tasks(phase, plan):
+    """Диапазоны объектов фазы примерно по TASK_ROWS строк"""
+    if phase == 'users':
+        weights = np.full(plan.users, 2)
+    elif phase == 'books':
+        weights = np.full(plan.books, 3)
+    elif phase == 'clubs':
+        weights = np.ones(plan.clubs)
+    elif phase == 'memberships':
+        weights = plan.club_sizes
+    elif phase == 'posts':
+        weights = 1 + plan.post_comments * 2 + plan.post_likes
+    else:
+        weights = plan.user_reading
+    bounds = np.searchsorted(np.cumsum(weights), np.arange(TASK_ROWS, int(np.sum(weights)), TASK_ROWS))
+    edges = sorted({0, len(weights), *(int(bound) + 1 for bound in bounds)})
+    return [(phase, start, stop) for start, stop in zip(edges, edges[1:]) if start < min(stop, len(weights))]
+
+
+def run_task(task, batch_size=BATCH_SIZE):
+    """Выполняет задачу (фаза, начало, конец) в одной транзакции; возвращает {модель: строк}"""
+    phase, start, stop = task
+    _, make, models = next(entry for entry in PHASES if entry[0] == phase)
+    writer = Writer(batch_size)
+    with explicit_timestamps(*models), transaction.atomic():
+        make(_plan, start, stop, writer)
+        writer.flush()
+    return writer.counts
+
+
+def _init_worker():
+    # Соединения родителя закрыты до fork; каждый процесс открывает свое
+    connections.close_all()
+
+
+def generate(plan, workers=1, batch_size=BATCH_SIZE, progress=None):
+    """
+    Выполняет фазы плана по очереди; задачи фазы - параллельно в workers процессах.
+
+    progress(phase, counts, seconds) вызывается после каждой фазы.
+    Возвращает {модель: строк}.
+    """
+    global _plan
+    _plan = plan
+    totals = {}
+    if workers > 1:
+        connections.close_all()
+        pool = multiprocessing.get_context('fork').Pool(workers, initializer=_init_worker)
+    try:
+        for phase, _, _ in PHASES:
+            start = time.monotonic()
+            phase_tasks = tasks(phase, plan)
+            if workers > 1:
+                results = pool.imap_unordered(_run_pooled, [(task, batch_size) for task in phase_tasks])
+            else:
+                results = (run_task(task, batch_size) for task in phase_tasks)
+            counts = {}
+            for result in results:
+                for label, rows in result.items():
+                    counts[label] = counts.get(label, 0) + rows
+            for label, rows in counts.items():
+                totals[label] = totals.get(label, 0) + rows
+            if progress:
+                progress(phase, counts, time.monotonic() - start)
+    finally:
+        if workers > 1:
+            pool.close()
+            pool.join()
+        _plan = None
+    reset_sequences()
+    return totals
+
+
+def _run_pooled(args):
+    return run_task(*args)
+
+
+def reset_sequences():
+    """После вставки с явными pk сдвигает последовательности (PostgreSQL)"""
+    statements = connection.ops.sequence_reset_sql(no_style(), [User, Book, Club, Post, Comment])
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
@@ -0,0 +1,173 @@
+"""
+Keyset (курсорная) пагинация для ListView.
+
+В отличие от OFFSET-пагинации страница выбирается условием по значениям
+сортировки последней показанной строки, поэтому глубокие страницы не
+медленнее первой, а COUNT(*) не выполняется вовсе. Курсор - непрозрачный
+токен в параметре ?cursor=.
+
+Поля cursor_ordering не должны содержать NULL, а последнее поле должно быть
+уникальным (обычно id), иначе строки с одинаковыми значениями потеряются
+на границе страниц.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Сохраняет микросекунды: DjangoJSONEncoder обрезает время до миллисекунд"""
+    
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps([direction, values], cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    padded = token + '=' * (-len(token) % 4)
+    try:
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise Http404('Неверный курсор')
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        raise Http404('Неверный курсор')
+    return direction, values
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """
+    Условие "строка идет после (values)" в порядке ordering.
+
+    Для (a DESC, b DESC, id DESC) это
+    a < x OR (a = x AND b < y) OR (a = x AND b = y AND id < z).
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != reverse
+        condition |= equal & Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+class CursorPage:
+    """Страница курсорной пагинации (совместима с page_obj в шаблонах)"""
+    
+    def __init__(self, object_list, next_query=None, previous_query=None):
+        self.object_list = object_list
+        self.next_query = next_query
+        self.previous_query = previous_query
+    
+    def __iter__(self):
+        return iter(self.object_list)
+    
+    def __len__(self):
+        return len(self.object_list)
+    
+    def has_next(self):
+        return self.next_query is not None
+    
+    def has_previous(self):
+        return self.previous_query is not None
+    
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginationMixin:
+    """
+    Подключает keyset-пагинацию к ListView.
+
+    cursor_ordering задает сортировку страницы; get_cursor_ordering() может
+    вернуть None, чтобы для конкретного запроса (например, для результатов
+    поиска по релевантности) использовать обычную пагинацию. В обоих случаях
+    у page_obj есть next_query/previous_query - строка запроса соседней
+    страницы с сохранением остальных GET-параметров (поиск, фильтры).
+    """
+    cursor_ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    
+    def get_cursor_ordering(self):
+        return self.cursor_ordering
+    
+    def paginate_queryset(self, queryset, page_size):
+        ordering = self.get_cursor_ordering()
+        if ordering is None or isinstance(queryset, list):
+            paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+            page.next_query = self._offset_query(page.next_page_number()) if page.has_next() else None
+            page.previous_query = self._offset_query(page.previous_page_number()) if page.has_previous() else None
+            return paginator, page, object_list, is_paginated
+        
+        token = self.request.GET.get(self.cursor_query_param)
+        direction, values = decode_cursor(token) if token else (NEXT, None)
+        if values is not None:
+            if len(values) != len(ordering):
+                raise Http404('Неверный курсор')
+            values = self._parse_values(queryset.model, ordering, values)
+        
+        backwards = direction == PREVIOUS
+        if backwards:
+            queryset = queryset.order_by(*[self._invert(field) for field in ordering])
+        else:
+            queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(ordering, values, reverse=backwards))
+        
+        # Лишняя строка показывает, есть ли страница дальше в этом направлении
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+        
+        has_next = has_more if not backwards else True
+        has_previous = has_more if backwards else values is not None
+        page = CursorPage(
+            rows,
+            next_query=self._page_query(NEXT, ordering, rows[-1]) if rows and has_next else None,
+            previous_query=self._page_query(PREVIOUS, ordering, rows[0]) if rows and has_previous else None,
+        )
+        return None, page, rows, page.has_other_pages()
+    
+    def _offset_query(self, number):
+        params = self.request.GET.copy()
+        params.pop(self.cursor_query_param, None)
+        params[self.page_kwarg] = number
+        return params.urlencode()
+    
+    def _page_query(self, direction, ordering, row):
+        values = [getattr(row, field.lstrip('-')) for field in ordering]
+        params = self.request.GET.copy()
+        params.pop(self.page_kwarg, None)
+        params[self.cursor_query_param] = encode_cursor(direction, values)
+        return params.urlencode()
+    
+    @staticmethod
+    def _parse_values(model, ordering, values):
+        parsed = []
+        for field, value in zip(ordering, values):
+            try:
+                parsed.append(model._meta.get_field(field.lstrip('-')).to_python(value))
+            except (ValidationError, FieldDoesNotExist):
+                raise Http404('Неверный курсор')
+        return parsed
+    
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
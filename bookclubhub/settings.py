@@ -37,7 +37,7 @@ INSTALLED_APPS = [
     
     # Third party apps
     'rest_framework',
-    # 'channels',  # Требует Python 3.7+, временно отключено для Python 3.6
+    'channels',
     'mptt',
     'notifications',
     'debug_toolbar',
@@ -49,6 +49,9 @@ INSTALLED_APPS = [
     'books',
     'discussions',
     'notifications_custom',
+    'jobs',
+    'images',
+    'exports',
 ]
 
 MIDDLEWARE = [
@@ -76,13 +79,14 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'bookclubhub.cache.cache_versions',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'bookclubhub.wsgi.application'
-# ASGI_APPLICATION = 'bookclubhub.asgi.application'  # Требует channels, временно отключено
+ASGI_APPLICATION = 'bookclubhub.asgi.application'
 
 
 # Database
@@ -119,6 +123,53 @@ else:
     }
 
 
+# Cache
+# CACHE_BACKEND: locmem (по умолчанию, один процесс), file (несколько воркеров
+# на одном сервере) или redis (несколько серверов, требует django-redis)
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': config('CACHE_REDIS_URL', default='redis://localhost:6379/2'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_FILE_PATH', default=str(BASE_DIR / 'cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'bookclubhub',
+        }
+    }
+
+# Кеш виден всем процессам: только тогда инвалидация (delete, incr) доходит
+# до других воркеров. Для locmem кеширование между запросами по умолчанию выключено
+CACHE_SHARED = CACHE_BACKEND in ('redis', 'file')
+
+# Время жизни кешированных страниц и фрагментов (секунды, 0 - не кешировать).
+# Инвалидация через bump() на locmem не доходит до других воркеров, поэтому
+# без общего кеша страницы по умолчанию не кешируются
+CACHE_PAGE_TIMEOUT = config('CACHE_PAGE_TIMEOUT', default=300 if CACHE_SHARED else 0, cast=int)
+
+# Дерево комментариев: веток на страницу и глубина ответов в одном фрагменте
+COMMENT_THREADS_PER_PAGE = config('COMMENT_THREADS_PER_PAGE', default=20, cast=int)
+COMMENT_TREE_DEPTH = config('COMMENT_TREE_DEPTH', default=3, cast=int)
+# Хранение дерева комментариев: mptt или path (материализованный путь, см. discussions/storage.py)
+COMMENT_TREE_STORAGE = config('COMMENT_TREE_STORAGE', default='mptt')
+
+# Роли пользователя в клубах между запросами (0 - кешировать только в пределах запроса).
+# На locmem сброс после смены роли не дошел бы до других воркеров, поэтому по умолчанию 0
+CLUB_ROLES_CACHE_TIMEOUT = config('CLUB_ROLES_CACHE_TIMEOUT', default=300 if CACHE_SHARED else 0, cast=int)
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -151,11 +202,59 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Хранилище медиа-файлов: local (MEDIA_ROOT) или s3 (S3-совместимый бакет,
+# требует boto3 и django-storages, см. bookclubhub/storage.py). Для локальной
+# проверки подходит MinIO или moto_server: AWS_S3_ENDPOINT_URL=http://localhost:9000,
+# AWS_S3_ADDRESSING_STYLE=path; бакет создает manage.py setup_media_bucket.
+MEDIA_STORAGE = config('MEDIA_STORAGE', default='local')
+
+if MEDIA_STORAGE == 's3':
+    DEFAULT_FILE_STORAGE = 'bookclubhub.storage.MediaStorage'
+    AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME', default='bookclubhub-media')
+    AWS_ACCESS_KEY_ID = config('AWS_ACCESS_KEY_ID', default=None)
+    AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY', default=None)
+    AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default='us-east-1')
+    AWS_S3_ENDPOINT_URL = config('AWS_S3_ENDPOINT_URL', default=None)
+    AWS_S3_ADDRESSING_STYLE = config('AWS_S3_ADDRESSING_STYLE', default=None)
+    AWS_S3_CUSTOM_DOMAIN = config('AWS_S3_CUSTOM_DOMAIN', default=None)
+    # Публичный бакет (или CDN) дает постоянные URL, которые кешируются браузером
+    AWS_QUERYSTRING_AUTH = config('AWS_QUERYSTRING_AUTH', default=False, cast=bool)
+    # Как FileSystemStorage: одноименный файл получает новое имя, а не перезаписывает старый
+    AWS_S3_FILE_OVERWRITE = False
+    AWS_S3_MAX_POOL_CONNECTIONS = config('AWS_S3_MAX_POOL_CONNECTIONS', default=10, cast=int)
+    AWS_S3_MULTIPART_CHUNKSIZE = config('AWS_S3_MULTIPART_CHUNKSIZE', default=8 * 1024 * 1024, cast=int)
+
+# Загружаемые файлы пишутся во временный файл частями по 64 КБ, а не в память;
+# хранилище затем читает их потоком
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+
+# Загрузка изображений браузером прямо в бакет (images/uploads.py), только для MEDIA_STORAGE=s3
+MEDIA_DIRECT_UPLOADS = config('MEDIA_DIRECT_UPLOADS', default=True, cast=bool)
+MEDIA_DIRECT_UPLOAD_MAX_SIZE = config('MEDIA_DIRECT_UPLOAD_MAX_SIZE', default=10 * 1024 * 1024, cast=int)
+MEDIA_DIRECT_UPLOAD_EXPIRES = config('MEDIA_DIRECT_UPLOAD_EXPIRES', default=600, cast=int)
+
+# Копии изображений (images.variants): размеры в CSS-пикселях, 2x строится автоматически
+IMAGE_VARIANTS = {
+    'book_list': {'width': 200, 'height': 300, 'crop': True},
+    'book_detail': {'width': 400, 'height': 600},
+    'club_card': {'width': 400, 'height': 200, 'crop': True},
+    'club_detail': {'width': 800, 'height': 300, 'crop': True},
+    'avatar': {'width': 40, 'height': 40, 'crop': True},
+    'avatar_large': {'width': 150, 'height': 150, 'crop': True},
+}
+# Какие копии строить сразу после загрузки (остальные - при первом запросе)
+IMAGE_FIELD_VARIANTS = {
+    'books.Book.cover': ['book_list', 'book_detail'],
+    'clubs.Club.cover': ['club_card', 'club_detail'],
+    'accounts.UserProfile.avatar': ['avatar', 'avatar_large'],
+}
+IMAGE_FORMATS = config('IMAGE_FORMATS', default='avif,webp', cast=lambda value: [fmt.strip() for fmt in value.split(',') if fmt.strip()])
+
 # WhiteNoise для статических файлов в production
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
-# Для production: хранение медиа-файлов на внешнем хранилище (S3, Cloudinary и т.д.)
-# Media файлы на Render.com не сохраняются между деплоями
+# Для production: MEDIA_STORAGE=s3 (см. выше) -
+# media файлы на Render.com не сохраняются между деплоями
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -179,15 +278,92 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
-# Channels Configuration (требует Python 3.7+)
-# CHANNEL_LAYERS = {
-#     'default': {
-#         'BACKEND': 'channels_redis.core.RedisChannelLayer',
-#         'CONFIG': {
-#             "hosts": [config('REDIS_URL', default='redis://localhost:6379/1')],
-#         },
-#     },
-# }
+# Периодическая сверка счетчиков профилей (accounts.stats), сек
+PROFILE_STATS_RECONCILE_INTERVAL = config('PROFILE_STATS_RECONCILE_INTERVAL', default=3600, cast=int)
+# Пересчет прогнозов темпа чтения в клубах (clubs.pace), сек
+READING_PACE_INTERVAL = config('READING_PACE_INTERVAL', default=3600, cast=int)
+# Инкрементальное обновление рекомендаций книг (books.recommendations), сек
+RECOMMENDATIONS_INTERVAL = config('RECOMMENDATIONS_INTERVAL', default=3600, cast=int)
+RECOMMENDATIONS_TOP_K = config('RECOMMENDATIONS_TOP_K', default=20, cast=int)
+RECOMMENDATIONS_GENRE_WEIGHT = config('RECOMMENDATIONS_GENRE_WEIGHT', default=0.3, cast=float)
+# Экспорт данных (exports): больше EXPORT_SYNC_MAX_ROWS строк - фоновой задачей;
+# готовые выгрузки удаляются через EXPORT_TTL_DAYS дней
+EXPORT_SYNC_MAX_ROWS = config('EXPORT_SYNC_MAX_ROWS', default=50000, cast=int)
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+EXPORT_TTL_DAYS = config('EXPORT_TTL_DAYS', default=7, cast=int)
+EXPORT_CLEANUP_INTERVAL = config('EXPORT_CLEANUP_INTERVAL', default=86400, cast=int)
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-profile-stats': {
+        'task': 'jobs.tasks.enqueue_periodic',
+        'schedule': PROFILE_STATS_RECONCILE_INTERVAL,
+        'args': ('accounts.reconcile_statistics', PROFILE_STATS_RECONCILE_INTERVAL),
+    },
+    'compute-reading-pace': {
+        'task': 'jobs.tasks.enqueue_periodic',
+        'schedule': READING_PACE_INTERVAL,
+        'args': ('clubs.compute_reading_pace', READING_PACE_INTERVAL),
+    },
+    'refresh-recommendations': {
+        'task': 'jobs.tasks.enqueue_periodic',
+        'schedule': RECOMMENDATIONS_INTERVAL,
+        'args': ('books.refresh_recommendations', RECOMMENDATIONS_INTERVAL),
+    },
+    'cleanup-exports': {
+        'task': 'jobs.tasks.enqueue_periodic',
+        'schedule': EXPORT_CLEANUP_INTERVAL,
+        'args': ('exports.cleanup', EXPORT_CLEANUP_INTERVAL),
+    },
+}
+
+# Фоновые задачи (jobs): sync, thread или celery
+JOBS_BACKEND = config('JOBS_BACKEND', default='thread')
+JOBS_THREAD_WORKERS = config('JOBS_THREAD_WORKERS', default=4, cast=int)
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=5, cast=int)
+JOBS_RETRY_BACKOFF = config('JOBS_RETRY_BACKOFF', default=10, cast=int)
+
+# Channels Configuration
+# CHANNEL_LAYER: memory (один ASGI-процесс), database (несколько процессов через
+# PostgreSQL LISTEN/NOTIFY или таблицу SQLite), redis (требует channels-redis)
+CHANNEL_LAYER = config('CHANNEL_LAYER', default='memory')
+
+if CHANNEL_LAYER == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                "hosts": [config('REDIS_URL', default='redis://localhost:6379/1')],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': (
+                'bookclubhub.channel_layers.DatabaseChannelLayer' if CHANNEL_LAYER == 'database'
+                else 'bookclubhub.channel_layers.MemoryChannelLayer'
+            ),
+            'CONFIG': {
+                'capacity': config('CHANNEL_CAPACITY', default=100, cast=int),
+                'group_capacity': config('CHANNEL_GROUP_CAPACITY', default=1000, cast=int),
+                'batch_interval': config('CHANNEL_BATCH_INTERVAL', default=0.02, cast=float),
+            },
+        },
+    }
+
+# Изменения лайков отправляются клиентам не чаще раза в это число секунд на пост
+REALTIME_LIKES_DEBOUNCE = config('REALTIME_LIKES_DEBOUNCE', default=0.1, cast=float)
+
+# Лента активности клуба: последние события для переподключений хранятся в
+# кеше (при нескольких процессах нужен CACHE_BACKEND=redis) - не больше
+# CLUB_STREAM_BUFFER_SIZE на клуб и CLUB_STREAM_GLOBAL_BUFFER_SIZE всего
+CLUB_STREAM_BUFFER_SIZE = config('CLUB_STREAM_BUFFER_SIZE', default=100, cast=int)
+CLUB_STREAM_GLOBAL_BUFFER_SIZE = config('CLUB_STREAM_GLOBAL_BUFFER_SIZE', default=10000, cast=int)
+CLUB_STREAM_EVENT_MAX_BYTES = config('CLUB_STREAM_EVENT_MAX_BYTES', default=16 * 1024, cast=int)
+CLUB_STREAM_TTL = config('CLUB_STREAM_TTL', default=3600, cast=int)
+
+# Сводка прогресса клуба: время жизни снимка в кеше и допуск отставания в процентах
+CLUB_DASHBOARD_TIMEOUT = config('CLUB_DASHBOARD_TIMEOUT', default=600, cast=int)
+CLUB_DASHBOARD_LAGGARD_MARGIN = config('CLUB_DASHBOARD_LAGGARD_MARGIN', default=10, cast=int)
 
 # Django Debug Toolbar
 INTERNAL_IPS = [
@@ -203,10 +379,15 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='BookClub Hub <noreply@bookclubhub.com>')
 
+# Полнотекстовый поиск книг: конфигурация текстового поиска PostgreSQL
+BOOK_SEARCH_CONFIG = config('BOOK_SEARCH_CONFIG', default='simple')
+
 # Notifications
 DJANGO_NOTIFICATIONS_CONFIG = {
     'USE_JSONFIELD': True,
 }
+# Размер порции bulk_create при массовой рассылке уведомлений
+NOTIFICATIONS_BATCH_SIZE = config('NOTIFICATIONS_BATCH_SIZE', default=500, cast=int)
 
 # DRF Configuration
 REST_FRAMEWORK = {
@@ -219,6 +400,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
+# Максимум записей в одном запросе пакетной синхронизации прогресса чтения
+READING_PROGRESS_BATCH_MAX = config('READING_PROGRESS_BATCH_MAX', default=500, cast=int)
 
 # Jazzmin Configuration (Admin UI)
 JAZZMIN_SETTINGS = {
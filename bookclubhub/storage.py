@@ -0,0 +1,81 @@
+"""
+Хранилище медиа-файлов в S3-совместимом бакете (AWS S3, MinIO, Yandex
+Object Storage и т.п.), MEDIA_STORAGE=s3.
+
+Работает поверх django-storages (S3Boto3Storage) и добавляет:
+
+* пул HTTP-соединений: клиент каждого потока держит до
+  AWS_S3_MAX_POOL_CONNECTIONS соединений с keep-alive, поэтому соединения
+  с бакетом переиспользуются между запросами, а не открываются заново;
+* потоковую загрузку: файл уходит в бакет multipart-частями по
+  multipart_chunksize из временного файла загрузки (см. FILE_UPLOAD_HANDLERS),
+  а не собирается целиком в памяти;
+* presigned_post() для загрузки браузером прямо в бакет (images.uploads);
+* заголовки бессрочного кеширования для копий изображений (images.variants).
+
+Модуль импортируется только при MEDIA_STORAGE=s3, поэтому boto3 и
+django-storages нужны лишь в этом режиме.
+"""
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from django.conf import settings
+from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+MB = 1024 * 1024
+
+VARIANTS_PREFIX = 'variants/'
+# mimetypes не во всех версиях Python знает .avif
+VARIANT_CONTENT_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+
+class MediaStorage(S3Boto3Storage):
+    """Медиа-файлы проекта в бакете AWS_STORAGE_BUCKET_NAME"""
+
+    def __init__(self, **settings_overrides):
+        super().__init__(**settings_overrides)
+        self.client_config = self.client_config.merge(Config(
+            max_pool_connections=getattr(settings, 'AWS_S3_MAX_POOL_CONNECTIONS', 10),
+            tcp_keepalive=True,
+            retries={'max_attempts': 3, 'mode': 'standard'},
+        ))
+        if 'transfer_config' not in settings_overrides and not getattr(settings, 'AWS_S3_TRANSFER_CONFIG', None):
+            chunk_size = getattr(settings, 'AWS_S3_MULTIPART_CHUNKSIZE', 8 * MB)
+            self.transfer_config = TransferConfig(
+                multipart_threshold=chunk_size,
+                multipart_chunksize=chunk_size,
+                # Части одного файла грузятся последовательно: воркер не плодит потоки на каждую загрузку
+                use_threads=False,
+            )
+
+    def presigned_post(self, name, content_type, max_size, expires):
+        """
+        Параметры формы для загрузки файла name браузером прямо в бакет.
+
+        Политика ограничивает ключ, тип содержимого (только изображения) и
+        размер файла, так что подписанной формой нельзя загрузить ничего другого.
+        Возвращает {'url': ..., 'fields': {...}}.
+        """
+        key = self._normalize_name(clean_name(name))
+        fields = {'Content-Type': content_type}
+        conditions = [
+            {'Content-Type': content_type},
+            ['starts-with', '$Content-Type', 'image/'],
+            ['content-length-range', 1, max_size],
+        ]
+        if self.default_acl:
+            fields['acl'] = self.default_acl
+            conditions.append({'acl': self.default_acl})
+        return self.bucket.meta.client.generate_presigned_post(
+            self.bucket_name, key, Fields=fields, Conditions=conditions, ExpiresIn=expires,
+        )
+
+    def get_object_parameters(self, name):
+        params = super().get_object_parameters(name)
+        if name.startswith(VARIANTS_PREFIX):
+            # Копии изображений неизменяемы: имя содержит хеш исходника
+            params.setdefault('CacheControl', 'public, max-age=31536000, immutable')
+            fmt = name.rsplit('.', 1)[-1]
+            if fmt in VARIANT_CONTENT_TYPES:
+                params.setdefault('ContentType', VARIANT_CONTENT_TYPES[fmt])
+        return params
@@ -13,6 +13,8 @@ urlpatterns = [
     path('books/', include('books.urls')),
     path('discussions/', include('discussions.urls')),
     path('notifications/', include('notifications.urls')),
+    path('images/', include('images.urls')),
+    path('exports/', include('exports.urls')),
 ]
 
 if settings.DEBUG:
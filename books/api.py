@@ -0,0 +1,22 @@
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .progress import sync_progress
+from .serializers import ProgressBatchSerializer, ProgressSyncResultSerializer
+
+
+class ProgressBatchView(APIView):
+    """
+    Пакетная синхронизация прогресса чтения текущего пользователя.
+
+    POST {"records": [{"book_id": 1, "pages_read": 120, "current_chapter": 5,
+    "is_completed": false, "updated_at": "2024-05-01T10:00:00Z"}, ...]}
+    Ответ содержит статус каждой книги: created, updated, stale (на сервере
+    запись новее) или not_found.
+    """
+
+    def post(self, request):
+        serializer = ProgressBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = sync_progress(request.user, serializer.validated_data['records'])
+        return Response(ProgressSyncResultSerializer(result).data)
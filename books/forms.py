@@ -1,9 +1,13 @@
 from django import forms
+from images.uploads import DirectUploadMixin
+from .isbn import normalize as normalize_isbn
 from .models import Book, ReadingProgress
 
 
-class BookForm(forms.ModelForm):
+class BookForm(DirectUploadMixin, forms.ModelForm):
     """Форма добавления/редактирования книги"""
+    direct_upload_fields = ('cover',)
+
     class Meta:
         model = Book
         fields = ['title', 'author', 'isbn', 'description', 'cover', 'genres', 'pages', 'published_year']
@@ -17,6 +21,12 @@ class BookForm(forms.ModelForm):
             'published_year': forms.NumberInput(attrs={'class': 'form-control'}),
         }
 
+    def clean_isbn(self):
+        try:
+            return normalize_isbn(self.cleaned_data.get('isbn'))
+        except ValueError as error:
+            raise forms.ValidationError(str(error))
+
 
 class ReadingProgressForm(forms.ModelForm):
     """Форма обновления прогресса чтения"""
@@ -0,0 +1,467 @@
+"""
+Массовый импорт каталога книг из CSV, JSONL и ONIX (2.1 и 3.0, reference-теги).
+
+Файл читается потоком (можно сжатый .gz): CSV и JSONL - построчно с учетом
+байтового смещения, ONIX - через iterparse с освобождением разобранных
+элементов, поэтому память не зависит от размера каталога.
+
+Записи копятся пачками по batch_size. Для пачки одним запросом находятся
+уже существующие ISBN (дубли пропускаются, ISBN приводится к ISBN-13),
+книги создаются одним bulk_create, связи с жанрами - одним bulk_create
+промежуточной таблицы, поисковый индекс обновляется для пачки целиком.
+Жанры сопоставляются по slug через словарь в памяти; неизвестные жанры
+создаются.
+
+После каждой зафиксированной пачки позиция в файле сохраняется в файл
+контрольной точки, и прерванный импорт продолжается с нее. Если процесс
+упал между фиксацией пачки и записью точки, пачка прочитается повторно:
+книги с ISBN отсеются как дубли, книги без ISBN добавятся еще раз.
+"""
+import codecs
+import csv
+import gzip
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from xml.etree.ElementTree import iterparse
+
+from django.db import connection, transaction
+from django.utils.text import slugify
+
+from bookclubhub.cache import bump
+from . import isbn
+from .models import Book, Genre
+from .search import get_backend
+
+BATCH_SIZE = 1000
+FORMATS = ('csv', 'jsonl', 'onix')
+
+# Синонимы колонок CSV и ключей JSONL
+ALIASES = {
+    'isbn13': 'isbn',
+    'isbn_13': 'isbn',
+    'name': 'title',
+    'authors': 'author',
+    'annotation': 'description',
+    'page_count': 'pages',
+    'num_pages': 'pages',
+    'year': 'published_year',
+    'genre': 'genres',
+    'subjects': 'genres',
+}
+GENRE_SEPARATORS = re.compile(r'\s*[|;]\s*')
+TITLE_MAX = Book._meta.get_field('title').max_length
+AUTHOR_MAX = Book._meta.get_field('author').max_length
+
+
+class InvalidRecord(ValueError):
+    """Запись нельзя импортировать"""
+
+
+class CheckpointMismatch(ValueError):
+    """Контрольная точка относится к другой версии файла"""
+
+
+def normalize_isbn(value):
+    """ISBN-13 без дефисов (books.isbn.normalize); неверный номер - InvalidRecord"""
+    try:
+        return isbn.normalize(value)
+    except ValueError as error:
+        raise InvalidRecord(str(error))
+
+
+def genre_slug(name):
+    return slugify(name, allow_unicode=True)
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    extension = os.path.splitext(name)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if extension in ('.xml', '.onix'):
+        return 'onix'
+    raise ValueError(f'Не удалось определить формат файла {path}, укажите --format')
+
+
+def open_source(path):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+# Чтение. Читатели выдают пары (запись, позиция): запись - dict или
+# InvalidRecord, позиция - JSON-совместимое значение, с которого чтение
+# продолжается после записи.
+
+class _Lines:
+    """Строки бинарного потока в виде текста с подсчетом байтового смещения"""
+
+    def __init__(self, stream, offset=0):
+        self.stream = stream
+        self.offset = offset
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.stream.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return self.decoder.decode(line)
+
+
+def read_csv(stream, resume=None, delimiter=','):
+    if resume:
+        stream.seek(resume['offset'])
+        lines = _Lines(stream, resume['offset'])
+        header = resume['header']
+        reader = csv.reader(lines, delimiter=delimiter)
+    else:
+        lines = _Lines(stream)
+        reader = csv.reader(lines, delimiter=delimiter)
+        header = [name.strip().lower() for name in next(reader, [])]
+    for row in reader:
+        if not any(row):
+            continue
+        # csv.reader берет строки по мере надобности, поэтому смещение указывает на конец записи
+        yield dict(zip(header, row)), {'offset': lines.offset, 'header': header}
+
+
+def read_jsonl(stream, resume=None, **options):
+    offset = resume['offset'] if resume else 0
+    if offset:
+        stream.seek(offset)
+    lines = _Lines(stream, offset)
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            record = InvalidRecord(f'Некорректный JSON: {error}')
+        if not isinstance(record, (dict, InvalidRecord)):
+            record = InvalidRecord('Ожидался JSON-объект')
+        yield record, {'offset': lines.offset}
+
+
+def _text(element, path):
+    found = element.find(path)
+    if found is None:
+        return ''
+    return ''.join(found.itertext()).strip()
+
+
+def _onix_isbn(product):
+    values = {}
+    for identifier in product.iter('ProductIdentifier'):
+        values.setdefault(identifier.findtext('ProductIDType'), identifier.findtext('IDValue'))
+    # 15 - ISBN-13, 03 - GTIN-13, 02 - ISBN-10
+    return values.get('15') or values.get('03') or values.get('02')
+
+
+def _onix_title(product):
+    for path in ('DescriptiveDetail/TitleDetail/TitleElement', 'Title'):
+        element = product.find(path)
+        if element is None:
+            continue
+        title = _text(element, 'TitleText')
+        if not title:
+            title = ' '.join(filter(None, [_text(element, 'TitlePrefix'), _text(element, 'TitleWithoutPrefix')]))
+        if title:
+            return title
+    return ''
+
+
+def _onix_authors(product):
+    authors = []
+    for contributor in product.iter('Contributor'):
+        if not (contributor.findtext('ContributorRole') or 'A01').startswith('A'):
+            continue
+        name = _text(contributor, 'PersonName') or ' '.join(filter(None, [
+            _text(contributor, 'NamesBeforeKey'), _text(contributor, 'KeyNames'),
+        ])) or _text(contributor, 'CorporateName')
+        if name:
+            authors.append(name)
+    return ', '.join(authors)
+
+
+def _onix_description(product):
+    # ONIX 3.0: TextType 03 - описание, 02 - краткое; ONIX 2.1: TextTypeCode 01/03
+    candidates = {}
+    for content in product.iter('TextContent'):
+        candidates.setdefault(content.findtext('TextType'), _text(content, 'Text'))
+    for content in product.iter('OtherText'):
+        candidates.setdefault(content.findtext('TextTypeCode'), _text(content, 'Text'))
+    return candidates.get('03') or candidates.get('01') or candidates.get('02') or ''
+
+
+def _onix_pages(product):
+    for extent in product.iter('Extent'):
+        if extent.findtext('ExtentType') in ('00', '07', '08') and extent.findtext('ExtentUnit', '03') == '03':
+            return extent.findtext('ExtentValue')
+    return product.findtext('NumberOfPages')
+
+
+def _onix_year(product):
+    for date in product.iter('PublishingDate'):
+        if date.findtext('PublishingDateRole', '01') == '01':
+            return (date.findtext('Date') or '')[:4]
+    return (product.findtext('PublicationDate') or '')[:4]
+
+
+def onix_record(product):
+    """Поля книги из элемента Product"""
+    return {
+        'isbn': _onix_isbn(product),
+        'title': _onix_title(product),
+        'author': _onix_authors(product),
+        'description': _onix_description(product),
+        'pages': _onix_pages(product),
+        'published_year': _onix_year(product),
+        'genres': [text for text in (_text(subject, 'SubjectHeadingText') for subject in product.iter('Subject')) if text],
+    }
+
+
+def read_onix(stream, resume=None, **options):
+    # iterparse не умеет начинать с середины файла: уже импортированные Product пропускаются без разбора полей
+    skip = resume['records'] if resume else 0
+    count = 0
+    root = None
+    for event, element in iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            continue
+        # Пространства имен ONIX 3.0 отбрасываются, чтобы искать по локальным именам
+        element.tag = element.tag.rpartition('}')[2]
+        if element.tag != 'Product':
+            continue
+        count += 1
+        if count > skip:
+            yield onix_record(element), {'records': count}
+        # Разобранные товары больше не нужны
+        root.clear()
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+    'onix': read_onix,
+}
+
+
+# Подготовка записей
+
+def _int(value, minimum, maximum):
+    if value in (None, ''):
+        return None
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return number if minimum <= number <= maximum else None
+
+
+def clean(record):
+    """(поля Book, названия жанров) из записи любого формата"""
+    if isinstance(record, InvalidRecord):
+        raise record
+    record = {ALIASES.get(key, key): value for key, value in record.items()}
+    title = str(record.get('title') or '').strip()
+    author = record.get('author') or ''
+    if isinstance(author, list):
+        author = ', '.join(str(name) for name in author)
+    author = str(author).strip()
+    if not title or not author:
+        raise InvalidRecord('Нет названия или автора')
+
+    genres = record.get('genres') or []
+    if isinstance(genres, str):
+        genres = GENRE_SEPARATORS.split(genres)
+    fields = {
+        'isbn': normalize_isbn(record.get('isbn')),
+        'title': title[:TITLE_MAX],
+        'author': author[:AUTHOR_MAX],
+        'description': str(record.get('description') or '').strip(),
+        'pages': _int(record.get('pages'), 0, 100000) or 0,
+        'published_year': _int(record.get('published_year'), 1, 9999),
+    }
+    return fields, [str(name).strip() for name in genres if str(name).strip()]
+
+
+class GenreMap:
+    """slug -> id жанра; неизвестные жанры создаются при первом появлении"""
+
+    def __init__(self, create=True):
+        self.create = create
+        self.created = 0
+        self.ids = {}
+        for pk, name, slug in Genre.objects.values_list('pk', 'name', 'slug'):
+            self.ids.setdefault(slug, pk)
+            self.ids.setdefault(genre_slug(name), pk)
+
+    def resolve(self, names):
+        ids = []
+        for name in names:
+            slug = genre_slug(name)[:100]
+            if not slug:
+                continue
+            pk = self.ids.get(slug)
+            if pk is None and self.create:
+                genre, created = Genre.objects.get_or_create(slug=slug, defaults={'name': name[:100]})
+                pk = self.ids[slug] = genre.pk
+                self.created += created
+            if pk is not None and pk not in ids:
+                ids.append(pk)
+        return ids
+
+
+# Запись в базу
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    created: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    genres_created: int = 0
+    seconds: float = 0.0
+    # Последние ошибки разбора (номер записи, текст) для отчета
+    errors: list = field(default_factory=list)
+
+    def rate(self):
+        return self.read / self.seconds if self.seconds else 0.0
+
+
+def _create_books(books):
+    """bulk_create с заполнением pk, в том числе на СУБД без RETURNING для пачек"""
+    if connection.features.can_return_rows_from_bulk_insert:
+        Book.objects.bulk_create(books)
+        return
+    Book.objects.bulk_create(books)
+    # Пачка вставлена в транзакции, которая держит блокировку записи, а id
+    # растут монотонно: последние len(books) строк - это она
+    ids = list(Book.objects.order_by('-pk').values_list('pk', flat=True)[:len(books)])
+    for book, pk in zip(books, reversed(ids)):
+        book.pk = pk
+
+
+def write_batch(rows, stats):
+    """Сохраняет пачку [(поля Book, id жанров)], пропуская существующие ISBN"""
+    isbns = [fields['isbn'] for fields, _ in rows if fields['isbn']]
+    existing = set(Book.objects.filter(isbn__in=isbns).values_list('isbn', flat=True)) if isbns else set()
+    books, genre_ids = [], []
+    for fields, ids in rows:
+        isbn = fields['isbn']
+        if isbn:
+            if isbn in existing:
+                stats.duplicates += 1
+                continue
+            existing.add(isbn)
+        books.append(Book(**fields))
+        genre_ids.append(ids)
+    if not books:
+        return
+
+    through = Book.genres.through
+    with transaction.atomic():
+        _create_books(books)
+        through.objects.bulk_create([
+            through(book_id=book.pk, genre_id=genre_id)
+            for book, ids in zip(books, genre_ids)
+            for genre_id in ids
+        ])
+        # bulk_create не вызывает сигналы: индекс обновляется здесь, одной пачкой
+        get_backend().update([book.pk for book in books])
+    stats.created += len(books)
+
+
+class Checkpoint:
+    """Позиция импорта в файле рядом с источником"""
+
+    def __init__(self, path, source):
+        self.path = path
+        info = os.stat(source)
+        self.source = {'path': os.path.abspath(source), 'size': info.st_size, 'mtime': info.st_mtime_ns}
+
+    def load(self):
+        """(позиция, статистика) или None; CheckpointMismatch, если файл изменился"""
+        try:
+            with open(self.path) as checkpoint:
+                data = json.load(checkpoint)
+        except FileNotFoundError:
+            return None
+        if data['source'] != self.source:
+            raise CheckpointMismatch(f'Файл изменился после контрольной точки {self.path}')
+        return data['position'], ImportStats(**data['stats'])
+
+    def save(self, position, stats):
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as checkpoint:
+            json.dump({'source': self.source, 'position': position, 'stats': asdict(stats)}, checkpoint)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def import_books(path, fmt=None, batch_size=BATCH_SIZE, create_genres=True, checkpoint=None,
+                 delimiter=',', progress=None):
+    """
+    Импортирует файл и возвращает ImportStats.
+
+    checkpoint - Checkpoint для продолжения прерванного импорта;
+    progress(stats) вызывается после каждой пачки.
+    """
+    fmt = fmt or detect_format(path)
+    resume, stats = None, ImportStats()
+    if checkpoint is not None:
+        loaded = checkpoint.load()
+        if loaded:
+            resume, stats = loaded
+    genres = GenreMap(create=create_genres)
+    started = time.perf_counter() - stats.seconds
+
+    genres_before = stats.genres_created
+
+    def update_stats():
+        stats.genres_created = genres_before + genres.created
+        stats.seconds = time.perf_counter() - started
+
+    def flush(batch, position):
+        write_batch(batch, stats)
+        update_stats()
+        if checkpoint is not None:
+            checkpoint.save(position, stats)
+        if progress is not None:
+            progress(stats)
+
+    batch = []
+    try:
+        with open_source(path) as stream:
+            for record, position in READERS[fmt](stream, resume, delimiter=delimiter):
+                stats.read += 1
+                try:
+                    fields, names = clean(record)
+                except InvalidRecord as error:
+                    stats.invalid += 1
+                    stats.errors = (stats.errors + [(stats.read, str(error))])[-10:]
+                    continue
+                batch.append((fields, genres.resolve(names)))
+                if len(batch) >= batch_size:
+                    flush(batch, position)
+                    batch = []
+            if batch:
+                flush(batch, position)
+    finally:
+        bump('books')
+    update_stats()
+    if checkpoint is not None:
+        checkpoint.clear()
+    return stats
@@ -0,0 +1,40 @@
+"""
+Приведение ISBN к одному виду.
+
+В базе ISBN хранится как 13 цифр без дефисов: так дубли находятся простым
+сравнением (isbn__in) независимо от того, как номер был введен.
+"""
+import re
+
+
+def _isbn10_valid(digits):
+    total = sum((10 - i) * (10 if digit == 'X' else int(digit)) for i, digit in enumerate(digits))
+    return total % 11 == 0
+
+
+def _isbn13_check(digits):
+    total = sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(digits[:12]))
+    return str((10 - total % 10) % 10)
+
+
+def normalize(value):
+    """
+    ISBN-13 без дефисов и пробелов; ISBN-10 переводится в ISBN-13.
+
+    Пустое значение - None. ValueError при неверной длине или контрольной
+    цифре ISBN-10. Контрольная цифра 13-значных номеров не проверяется: в
+    каталогах встречаются GTIN с нестандартной, их лучше сохранить как есть.
+    """
+    if value is None:
+        return None
+    digits = re.sub(r'[^0-9Xx]', '', str(value)).upper()
+    if not digits:
+        return None
+    if len(digits) == 10 and digits[:9].isdigit() and (digits[9].isdigit() or digits[9] == 'X'):
+        if not _isbn10_valid(digits):
+            raise ValueError(f'Неверная контрольная цифра ISBN: {value}')
+        digits = '978' + digits[:9]
+        return digits + _isbn13_check(digits)
+    if len(digits) == 13 and digits.isdigit():
+        return digits
+    raise ValueError(f'Некорректный ISBN: {value}')
@@ -0,0 +1,92 @@
+"""
+Бенчмарк поиска книг: полнотекстовый индекс против icontains.
+
+Запуск: python manage.py bench_book_search --books 1000000
+Синтетические книги помечаются ISBN с префиксом "bench-" и удаляются
+после замера (если не указан --keep).
+"""
+import itertools
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from books.models import Book
+from books.search import get_backend
+
+WORDS = (
+    'война мир преступление наказание мастер маргарита тихий дон идиот братья карамазовы '
+    'отцы дети мертвые души герой нашего времени обломов анна каренина вишневый сад '
+    'foundation dune neuromancer hyperion solaris roadside picnic snow crash left hand darkness'
+).split()
+AUTHORS = ['Толстой', 'Достоевский', 'Булгаков', 'Шолохов', 'Гоголь', 'Лермонтов', 'Гончаров',
+           'Чехов', 'Asimov', 'Herbert', 'Gibson', 'Simmons', 'Lem', 'Strugatsky', 'Stephenson', 'Le Guin']
+# Словарь для описаний: слова распределены по закону Ципфа, как в реальных текстах
+FILLER = [f'слово{i}' for i in range(20000)]
+FILLER_CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(FILLER))))
+QUERIES = ['война', 'тол', 'мастер маргарита', 'dune', 'карамаз', 'left hand']
+
+
+class Command(BaseCommand):
+    help = 'Измеряет скорость поиска книг на синтетическом каталоге'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1000000, help='Размер синтетического каталога')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5, help='Повторов каждого запроса')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Не удалять синтетические книги')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        self._generate(options['books'], options['batch_size'], random.Random(options['seed']))
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(f'Индексация ({type(backend).__name__}): {time.perf_counter() - start:.1f} с')
+
+        self.stdout.write(f'{"запрос":>20} {"индекс, мс":>12} {"icontains, мс":>14}')
+        for query in QUERIES:
+            indexed = self._time(lambda: list(
+                backend.filter(Book.objects.all(), query).order_by('-search_rank').values_list('pk', flat=True)[:20]
+            ), options['repeat'])
+            scan = self._time(lambda: list(
+                Book.objects.filter(
+                    Q(title__icontains=query) | Q(author__icontains=query) | Q(isbn__icontains=query)
+                ).values_list('pk', flat=True)[:20]
+            ), options['repeat'])
+            self.stdout.write(f'{query:>20} {indexed:12.1f} {scan:14.1f}')
+
+        if not options['keep']:
+            bench_ids = Book.objects.filter(isbn__startswith='bench-').values_list('pk', flat=True)
+            backend.remove(list(bench_ids))
+            Book.objects.filter(isbn__startswith='bench-')._raw_delete(Book.objects.db)
+
+    def _generate(self, count, batch_size, rng):
+        """Создает книги через bulk_create (без сигналов, индекс строится отдельно)"""
+        existing = Book.objects.filter(isbn__startswith='bench-').count()
+        for start in range(existing, count, batch_size):
+            Book.objects.bulk_create([
+                Book(
+                    title=' '.join(rng.sample(WORDS, rng.randint(1, 4))).capitalize(),
+                    author=rng.choice(AUTHORS),
+                    isbn=f'bench-{i}',
+                    description=' '.join(rng.choices(FILLER, cum_weights=FILLER_CUM_WEIGHTS, k=40)),
+                    pages=rng.randint(50, 1500),
+                )
+                for i in range(start, min(start + batch_size, count))
+            ])
+        self.stdout.write(f'Книг в каталоге: {Book.objects.count()}')
+
+    @staticmethod
+    def _time(func, repeat):
+        """Медиана времени выполнения в миллисекундах"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)[len(timings) // 2]
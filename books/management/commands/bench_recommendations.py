@@ -0,0 +1,81 @@
+"""
+Бенчмарк конвейера рекомендаций на синтетических данных.
+
+Запуск: python manage.py bench_recommendations --rows 1000000
+Данные генерируются в памяти (популярность книг по закону Ципфа), база не
+используется: замеряются построение матриц, сходство книг и подбор
+рекомендаций пользователям.
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from books.recommendations import book_neighbors, make_data, neighbor_matrix, user_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время расчета рекомендаций на синтетических данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Строк прогресса чтения')
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--books', type=int, default=50000)
+        parser.add_argument('--genres', type=int, default=40)
+        parser.add_argument('--zipf', type=float, default=1.3, help='Параметр распределения популярности книг')
+        parser.add_argument('--sample-users', type=int, default=20000,
+                            help='Для скольких пользователей считать рекомендации (0 - для всех)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        timings = {}
+
+        generated = self._generate(rng, options)
+        start = time.perf_counter()
+        data = make_data(*generated)
+        timings['матрицы'] = time.perf_counter() - start
+        self.stdout.write(
+            f'Матрица чтения: {data.ratings.shape[0]} x {data.ratings.shape[1]}, '
+            f'непустых {data.ratings.nnz}'
+        )
+
+        start = time.perf_counter()
+        neighbors = book_neighbors(data)
+        timings['похожие книги'] = time.perf_counter() - start
+
+        matrix = neighbor_matrix(data, neighbors)
+        rows = None
+        if options['sample_users'] and options['sample_users'] < len(data.user_ids):
+            rows = np.sort(rng.choice(len(data.user_ids), options['sample_users'], replace=False))
+        start = time.perf_counter()
+        recommendations = user_recommendations(data, matrix, rows)
+        timings['рекомендации'] = time.perf_counter() - start
+
+        self.stdout.write(f'Книг с соседями: {len(neighbors)}, пользователей с рекомендациями: {len(recommendations)}')
+        for stage, seconds in timings.items():
+            self.stdout.write(f'{stage}: {seconds:.2f} с')
+        if rows is not None:
+            per_user = timings['рекомендации'] / len(rows)
+            self.stdout.write(f'Оценка для всех пользователей: {per_user * len(data.user_ids):.1f} с')
+
+    def _generate(self, rng, options):
+        users, books, genres = options['users'], options['books'], options['genres']
+        # Пары (пользователь, книга) без повторов, книги - по Ципфу
+        pairs = np.empty((0, 2), dtype=np.int64)
+        while len(pairs) < options['rows']:
+            size = options['rows'] - len(pairs) + options['rows'] // 10
+            fresh = np.stack([rng.integers(1, users + 1, size), (rng.zipf(options['zipf'], size) - 1) % books + 1], axis=1)
+            pairs = np.unique(np.concatenate([pairs, fresh]), axis=0)
+        pairs = pairs[rng.permutation(len(pairs))[:options['rows']]]
+        completed = rng.random(len(pairs)) < 0.4
+
+        genre_counts = rng.integers(1, 4, books)
+        book_genres = (
+            np.repeat(np.arange(1, books + 1), genre_counts),
+            rng.integers(1, genres + 1, genre_counts.sum()),
+        )
+        fans = rng.choice(np.arange(1, users + 1), users // 3, replace=False)
+        favorite_genres = (np.repeat(fans, 2), rng.integers(1, genres + 1, len(fans) * 2))
+        # Повторы жанров у книги/пользователя схлопываются в make_data суммированием весов
+        return np.arange(1, books + 1), (pairs[:, 0], pairs[:, 1], completed), book_genres, favorite_genres
@@ -0,0 +1,35 @@
+"""
+Пересчитывает рекомендации книг.
+
+Запуск: python manage.py build_recommendations [--full] [--enqueue]
+Без --full пересчитывается только затронутое с прошлого запуска;
+периодически то же делает задача books.refresh_recommendations.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from books.recommendations import refresh
+from jobs.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает похожие книги и персональные рекомендации'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Полный пересчет вместо инкрементального')
+        parser.add_argument('--enqueue', action='store_true', help='Поставить пересчет в очередь jobs')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            enqueue('books.refresh_recommendations', options['full'])
+            self.stdout.write(self.style.SUCCESS('Пересчет поставлен в очередь'))
+            return
+
+        start = time.perf_counter()
+        result = refresh(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Книг: {result["books"]}, пользователей: {result["users"]}, '
+            f'соседей: {result["neighbors"]}, рекомендаций: {result["recommendations"]} '
+            f'за {time.perf_counter() - start:.1f} с'
+        ))
@@ -0,0 +1,72 @@
+"""
+Импортирует каталог книг из CSV, JSONL или ONIX.
+
+Запуск: python manage.py import_books catalog.csv[.gz] [--format csv|jsonl|onix]
+        [--batch-size 1000] [--checkpoint PATH] [--restart] [--no-create-genres]
+
+CSV - заголовок с колонками isbn, title, author, description, pages,
+published_year, genres (жанры через "|" или ";"); JSONL - по объекту с теми
+же ключами на строку (genres может быть списком). Прерванный импорт
+продолжается с контрольной точки (по умолчанию <файл>.checkpoint).
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.importer import BATCH_SIZE, FORMATS, Checkpoint, CheckpointMismatch, detect_format, import_books
+
+
+class Command(BaseCommand):
+    help = 'Массовый импорт книг из CSV/JSONL/ONIX с пропуском дублей по ISBN'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл каталога (можно .gz)')
+        parser.add_argument('--format', choices=FORMATS, help='Формат файла (по умолчанию по расширению)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--delimiter', default=',', help='Разделитель колонок CSV')
+        parser.add_argument('--checkpoint', help='Файл контрольной точки (по умолчанию <файл>.checkpoint)')
+        parser.add_argument('--restart', action='store_true', help='Начать заново, игнорируя контрольную точку')
+        parser.add_argument('--no-create-genres', action='store_true', help='Не создавать неизвестные жанры')
+        parser.add_argument('--report-every', type=float, default=5.0, help='Интервал отчета о скорости, с')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            fmt = options['format'] or detect_format(path)
+            checkpoint = Checkpoint(options['checkpoint'] or f'{path}.checkpoint', path)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        if options['restart']:
+            checkpoint.clear()
+
+        last_report = [time.monotonic()]
+
+        def progress(stats):
+            if time.monotonic() - last_report[0] >= options['report_every']:
+                last_report[0] = time.monotonic()
+                self.stdout.write(self._report(stats))
+
+        try:
+            stats = import_books(
+                path, fmt,
+                batch_size=options['batch_size'],
+                create_genres=not options['no_create_genres'],
+                checkpoint=checkpoint,
+                delimiter=options['delimiter'],
+                progress=progress,
+            )
+        except CheckpointMismatch as error:
+            raise CommandError(f'{error}; запустите с --restart')
+        except KeyboardInterrupt:
+            raise CommandError(f'Импорт прерван; повторный запуск продолжит с {checkpoint.path}')
+
+        for number, message in stats.errors:
+            self.stderr.write(f'Запись {number}: {message}')
+        self.stdout.write(self.style.SUCCESS(self._report(stats)))
+
+    def _report(self, stats):
+        return (
+            f'Прочитано {stats.read}, добавлено {stats.created}, дублей {stats.duplicates}, '
+            f'с ошибками {stats.invalid}, новых жанров {stats.genres_created}; '
+            f'{stats.seconds:.1f} с, {stats.rate():.0f} записей/с'
+        )
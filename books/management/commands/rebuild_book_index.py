@@ -0,0 +1,27 @@
+"""
+Перестраивает полнотекстовый индекс книг.
+
+Запуск: python manage.py rebuild_book_index
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс книг'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        start = time.perf_counter()
+        with transaction.atomic():
+            backend.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс перестроен ({type(backend).__name__}) за {time.perf_counter() - start:.1f} с'
+        ))
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE books_search ('
+            'book_id bigint PRIMARY KEY REFERENCES books_book (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute('CREATE INDEX books_search_document_gin ON books_search USING GIN (document)')
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE books_search USING fts5('
+            "title, author, isbn, description, genres, tokenize='unicode61 remove_diacritics 2')"
+        )
+    else:
+        return
+    
+    # Индексируем уже существующие книги. Запрос к таблицам в том виде, в
+    # каком они есть на момент миграции: код books.search работает с текущей
+    # моделью Book и может с ней не совпасть
+    Book = apps.get_model('books', 'Book')
+    Genre = apps.get_model('books', 'Genre')
+    books = Book._meta.db_table
+    genres = Genre._meta.db_table
+    through = Book._meta.get_field('genres').remote_field.through._meta.db_table
+    if vendor == 'postgresql':
+        cfg = getattr(settings, 'BOOK_SEARCH_CONFIG', 'simple')
+        genre_names = (
+            f"(SELECT string_agg(g.name, ' ') FROM {through} bg JOIN {genres} g ON g.id = bg.genre_id "
+            f"WHERE bg.book_id = b.id)"
+        )
+        schema_editor.execute(
+            f'INSERT INTO books_search (book_id, document) SELECT b.id, '
+            f"setweight(to_tsvector('{cfg}', b.title), 'A') || "
+            f"setweight(to_tsvector('{cfg}', coalesce(b.isbn, '')), 'A') || "
+            f"setweight(to_tsvector('{cfg}', b.author), 'B') || "
+            f"setweight(to_tsvector('{cfg}', coalesce({genre_names}, '')), 'C') || "
+            f"setweight(to_tsvector('{cfg}', b.description), 'D') "
+            f'FROM {books} b'
+        )
+    else:
+        genre_names = (
+            f"(SELECT group_concat(g.name, ' ') FROM {through} bg JOIN {genres} g ON g.id = bg.genre_id "
+            f"WHERE bg.book_id = b.id)"
+        )
+        schema_editor.execute(
+            'INSERT INTO books_search (rowid, title, author, isbn, description, genres) '
+            f"SELECT b.id, b.title, b.author, coalesce(b.isbn, ''), b.description, coalesce({genre_names}, '') "
+            f'FROM {books} b'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute('DROP TABLE IF EXISTS books_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readingprogress',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Обновлено'),
+        ),
+    ]
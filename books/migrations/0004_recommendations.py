@@ -0,0 +1,76 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('books', '0003_readingprogress_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Место')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('computed_at', models.DateTimeField(verbose_name='Рассчитано')),
+            ],
+            options={
+                'verbose_name': 'Похожая книга',
+                'verbose_name_plural': 'Похожие книги',
+                'ordering': ['book', 'rank'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Место')),
+                ('score', models.FloatField(verbose_name='Оценка')),
+                ('computed_at', models.DateTimeField(verbose_name='Рассчитано')),
+            ],
+            options={
+                'verbose_name': 'Рекомендация',
+                'verbose_name_plural': 'Рекомендации',
+                'ordering': ['user', 'rank'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='readingprogress',
+            index=models.Index(fields=['updated_at'], name='reading_progress_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='userrecommendation',
+            name='book',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='books.book', verbose_name='Книга'),
+        ),
+        migrations.AddField(
+            model_name='userrecommendation',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='book_recommendations', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddField(
+            model_name='bookneighbor',
+            name='book',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='books.book', verbose_name='Книга'),
+        ),
+        migrations.AddField(
+            model_name='bookneighbor',
+            name='neighbor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='books.book', verbose_name='Похожая книга'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userrecommendation',
+            unique_together={('user', 'rank')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='bookneighbor',
+            unique_together={('book', 'rank')},
+        ),
+    ]
@@ -0,0 +1,47 @@
+import re
+
+from django.db import migrations
+
+
+def _normalize(value):
+    """Копия books.isbn.normalize на момент миграции; неразборчивое значение - None"""
+    digits = re.sub(r'[^0-9Xx]', '', value or '').upper()
+    if len(digits) == 13 and digits.isdigit():
+        return digits
+    if len(digits) != 10 or not digits[:9].isdigit() or not (digits[9].isdigit() or digits[9] == 'X'):
+        return None
+    if sum((10 - i) * (10 if digit == 'X' else int(digit)) for i, digit in enumerate(digits)) % 11:
+        return None
+    digits = '978' + digits[:9]
+    total = sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(digits))
+    return digits + str((10 - total % 10) % 10)
+
+
+def normalize_isbns(apps, schema_editor):
+    """
+    Приводит сохраненные ISBN к 13 цифрам без дефисов.
+
+    Пустые строки становятся NULL. Если нормализованный номер уже занят
+    другой книгой (дубль в данных), значение остается прежним.
+    """
+    Book = apps.get_model('books', 'Book')
+    Book.objects.filter(isbn='').update(isbn=None)
+    taken = set(Book.objects.exclude(isbn__isnull=True).values_list('isbn', flat=True))
+    for pk, value in Book.objects.exclude(isbn__isnull=True).order_by('pk').values_list('pk', 'isbn').iterator():
+        normalized = _normalize(value)
+        if normalized is None or normalized == value or normalized in taken:
+            continue
+        Book.objects.filter(pk=pk).update(isbn=normalized)
+        taken.discard(value)
+        taken.add(normalized)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_recommendations'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_isbns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:37
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def backfill(apps, schema_editor):
+    """changed_at существующих строк - их updated_at; курсор - время последнего пересчета"""
+    ReadingProgress = apps.get_model('books', 'ReadingProgress')
+    BookNeighbor = apps.get_model('books', 'BookNeighbor')
+    RecommendationRun = apps.get_model('books', 'RecommendationRun')
+    ReadingProgress.objects.update(changed_at=F('updated_at'))
+    last = BookNeighbor.objects.aggregate(last=Max('computed_at'))['last']
+    if last is not None:
+        RecommendationRun.objects.create(pk=1, started_at=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_normalize_isbn'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(verbose_name='Начат')),
+                ('full', models.BooleanField(default=False, verbose_name='Полный')),
+            ],
+            options={
+                'verbose_name': 'Пересчет рекомендаций',
+                'verbose_name_plural': 'Пересчеты рекомендаций',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='readingprogress',
+            name='reading_progress_updated_idx',
+        ),
+        migrations.AddField(
+            model_name='readingprogress',
+            name='changed_at',
+            field=models.DateTimeField(auto_now=True, null=True, verbose_name='Изменено на сервере'),
+        ),
+        migrations.AddIndex(
+            model_name='readingprogress',
+            index=models.Index(fields=['changed_at'], name='reading_progress_changed_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,8 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
+from .isbn import normalize as normalize_isbn
+
 User = get_user_model()
 
 
@@ -47,6 +49,15 @@ class Book(models.Model):
     
     def get_absolute_url(self):
         return reverse('books:detail', kwargs={'pk': self.pk})
+    
+    def save(self, *args, **kwargs):
+        # ISBN хранится в одном виде (13 цифр), чтобы дубли находились сравнением;
+        # неразборчивое значение сохраняется как есть
+        try:
+            self.isbn = normalize_isbn(self.isbn)
+        except ValueError:
+            pass
+        super().save(*args, **kwargs)
 
 
 class ReadingProgress(models.Model):
@@ -58,6 +69,11 @@ class ReadingProgress(models.Model):
     is_completed = models.BooleanField(default=False, verbose_name='Прочитана')
     started_at = models.DateTimeField(auto_now_add=True, verbose_name='Начало чтения')
     completed_at = models.DateTimeField(blank=True, null=True, verbose_name='Завершено')
+    # Время изменения на стороне клиента: при синхронизации побеждает более поздняя запись
+    updated_at = models.DateTimeField(blank=True, null=True, verbose_name='Обновлено')
+    # Время записи на сервере: офлайн-синхронизация приносит старые updated_at,
+    # а инкрементальному пересчету рекомендаций нужен монотонный курсор
+    changed_at = models.DateTimeField(auto_now=True, null=True, verbose_name='Изменено на сервере')
     notes = models.TextField(blank=True, verbose_name='Заметки')
     
     class Meta:
@@ -65,22 +81,24 @@ class ReadingProgress(models.Model):
         verbose_name_plural = _('Прогрессы чтения')
         unique_together = ['user', 'book']
         ordering = ['-started_at']
+        indexes = [
+            # Выборка изменений для инкрементального обновления рекомендаций
+            models.Index(fields=['changed_at'], name='reading_progress_changed_idx'),
+        ]
     
     def __str__(self):
         status = 'Завершено' if self.is_completed else 'В процессе'
         return f'{self.user.username} - {self.book.title} ({status})'
     
     def save(self, *args, **kwargs):
+        from django.utils import timezone
+        self.updated_at = timezone.now()
         if self.is_completed and not self.completed_at:
-            from django.utils import timezone
-            self.completed_at = timezone.now()
+            self.completed_at = self.updated_at
             if self.book.pages > 0:
                 self.pages_read = self.book.pages
         
         super().save(*args, **kwargs)
-        
-        # Обновляем статистику пользователя
-        self.user.profile.update_statistics()
     
     @property
     def progress_percentage(self):
@@ -89,3 +107,52 @@ class ReadingProgress(models.Model):
             return min(100, int((self.pages_read / self.book.pages) * 100))
         return 0
 
+
+
+class BookNeighbor(models.Model):
+    """Похожая книга ("читатели также читали"); заполняет books.recommendations"""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='neighbors', verbose_name='Книга')
+    neighbor = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+', verbose_name='Похожая книга')
+    rank = models.PositiveSmallIntegerField(verbose_name='Место')
+    score = models.FloatField(verbose_name='Сходство')
+    computed_at = models.DateTimeField(verbose_name='Рассчитано')
+    
+    class Meta:
+        verbose_name = _('Похожая книга')
+        verbose_name_plural = _('Похожие книги')
+        ordering = ['book', 'rank']
+        unique_together = ['book', 'rank']
+    
+    def __str__(self):
+        return f'{self.book_id} -> {self.neighbor_id} ({self.score:.3f})'
+
+
+class RecommendationRun(models.Model):
+    """Последний пересчет рекомендаций: курсор инкрементального режима (одна строка)"""
+    started_at = models.DateTimeField(verbose_name='Начат')
+    full = models.BooleanField(default=False, verbose_name='Полный')
+    
+    class Meta:
+        verbose_name = _('Пересчет рекомендаций')
+        verbose_name_plural = _('Пересчеты рекомендаций')
+    
+    def __str__(self):
+        return f'{self.started_at:%Y-%m-%d %H:%M}'
+
+
+class UserRecommendation(models.Model):
+    """Рекомендованная пользователю книга; заполняет books.recommendations"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='book_recommendations', verbose_name='Пользователь')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+', verbose_name='Книга')
+    rank = models.PositiveSmallIntegerField(verbose_name='Место')
+    score = models.FloatField(verbose_name='Оценка')
+    computed_at = models.DateTimeField(verbose_name='Рассчитано')
+    
+    class Meta:
+        verbose_name = _('Рекомендация')
+        verbose_name_plural = _('Рекомендации')
+        ordering = ['user', 'rank']
+        unique_together = ['user', 'rank']
+    
+    def __str__(self):
+        return f'{self.user_id} -> {self.book_id} ({self.score:.3f})'
@@ -0,0 +1,135 @@
+"""
+Пакетная синхронизация прогресса чтения (API для читалок и мобильных клиентов).
+
+Пачка записей пользователя применяется в одной транзакции: существующие
+строки выбираются одним запросом с блокировкой, новые создаются одним
+bulk_create, измененные сохраняются одним bulk_update. Каждая запись несет
+время изменения на клиенте (updated_at); запись, которая не новее уже
+сохраненной, пропускается (last write wins). Серверное время записи
+хранится отдельно в changed_at - по нему рекомендации находят изменения,
+даже если клиент синхронизировал их с опозданием. Счетчик books_read профиля
+сдвигается один раз на пачку.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from accounts import stats
+from clubs import dashboard
+from .models import Book, ReadingProgress
+
+STATUS_CREATED = 'created'
+STATUS_UPDATED = 'updated'
+STATUS_STALE = 'stale'
+STATUS_NOT_FOUND = 'not_found'
+
+UPDATE_FIELDS = ('pages_read', 'current_chapter', 'is_completed', 'completed_at', 'updated_at', 'changed_at')
+
+
+@dataclass
+class ProgressRecord:
+    book_id: int
+    updated_at: datetime
+    pages_read: Optional[int] = None
+    current_chapter: Optional[int] = None
+    is_completed: Optional[bool] = None
+
+
+@dataclass
+class SyncResult:
+    results: list = field(default_factory=list)
+    created: int = 0
+    updated: int = 0
+    stale: int = 0
+    not_found: int = 0
+
+    def add(self, book_id, status):
+        self.results.append({'book_id': book_id, 'status': status})
+        setattr(self, status, getattr(self, status) + 1)
+
+
+def latest_records(records):
+    """Оставляет по одной, самой поздней записи на книгу"""
+    latest = {}
+    for record in records:
+        current = latest.get(record.book_id)
+        if current is None or record.updated_at >= current.updated_at:
+            latest[record.book_id] = record
+    return latest
+
+
+def _apply(progress, record, pages):
+    """Переносит запись в объект; возвращает прежнее значение is_completed"""
+    was_completed = progress.is_completed
+    for name in ('pages_read', 'current_chapter', 'is_completed'):
+        value = getattr(record, name)
+        if value is not None:
+            setattr(progress, name, value)
+    progress.updated_at = record.updated_at
+    # Та же логика, что и в ReadingProgress.save()
+    if progress.is_completed and not progress.completed_at:
+        progress.completed_at = record.updated_at
+        if pages > 0:
+            progress.pages_read = pages
+    return was_completed
+
+
+def sync_progress(user, records):
+    """Применяет пачку записей ProgressRecord пользователя и возвращает SyncResult"""
+    now = timezone.now()
+    for record in records:
+        # Часы клиента могут спешить: запись "из будущего" заблокировала бы последующие
+        record.updated_at = min(record.updated_at, now)
+    latest = latest_records(records)
+
+    try:
+        return _sync(user, latest, now)
+    except IntegrityError:
+        # Параллельный запрос успел создать те же строки; теперь они найдутся как существующие
+        return _sync(user, latest, now)
+
+
+def _sync(user, latest, now):
+    result = SyncResult()
+    with transaction.atomic():
+        pages = dict(Book.objects.filter(pk__in=latest).values_list('pk', 'pages'))
+        existing = {
+            progress.book_id: progress
+            for progress in ReadingProgress.objects.select_for_update().filter(user=user, book_id__in=pages)
+        }
+        to_create, to_update = [], []
+        completed_delta = 0
+        for book_id, record in latest.items():
+            if book_id not in pages:
+                result.add(book_id, STATUS_NOT_FOUND)
+                continue
+            progress = existing.get(book_id)
+            if progress is None:
+                progress = ReadingProgress(user=user, book_id=book_id)
+                to_create.append(progress)
+                status = STATUS_CREATED
+            elif progress.updated_at and record.updated_at <= progress.updated_at:
+                result.add(book_id, STATUS_STALE)
+                continue
+            else:
+                to_update.append(progress)
+                status = STATUS_UPDATED
+            was_completed = _apply(progress, record, pages[book_id])
+            # bulk_update не заполняет auto_now-поля
+            progress.changed_at = now
+            completed_delta += stats.completed_delta(was_completed, progress.is_completed)
+            result.add(book_id, status)
+
+        if to_create:
+            ReadingProgress.objects.bulk_create(to_create)
+        if to_update:
+            ReadingProgress.objects.bulk_update(to_update, UPDATE_FIELDS)
+        # bulk-операции не вызывают сигналы: статистика и сводки клубов обновляются здесь, один раз на пачку
+        stats.adjust(user.pk, books_read=completed_delta)
+        changed = [progress.book_id for progress in to_create + to_update]
+        if changed:
+            transaction.on_commit(lambda: dashboard.progress_changed(user.pk, changed))
+    return result
@@ -0,0 +1,340 @@
+"""
+Рекомендации книг: "читатели также читали" и персональные подборки.
+
+Офлайн-конвейер (задача books.refresh_recommendations, команда
+build_recommendations):
+
+1. Прогресс чтения загружается в разреженную матрицу пользователь x книга
+   (вес прочитанной книги выше начатой), жанры - в матрицу книга x жанр,
+   любимые жанры профилей - в матрицу пользователь x жанр.
+2. Сходство книг - косинус столбцов матрицы чтения (совместное чтение),
+   смешанный с косинусом жанровых векторов на тех же парах. Книги без
+   читателей получают соседей только по жанрам. Считается блоками строк,
+   поэтому память ограничена размером блока, а не квадратом каталога.
+3. Для каждой книги сохраняются RECOMMENDATIONS_TOP_K соседей
+   (BookNeighbor), для каждого пользователя - столько же книг, которые он
+   еще не читал (UserRecommendation): сумма сходств с его книгами плюс
+   совпадение с любимыми жанрами.
+
+Страницы читают готовые таблицы одним запросом по индексу (book, rank)
+или (user, rank).
+
+Инкрементальный режим пересчитывает соседей только книг с новым
+прогрессом (и новых книг), а рекомендации - только пользователей с новым
+прогрессом или измененным профилем. Изменения ищутся по серверному времени
+записи (ReadingProgress.changed_at) после начала прошлого пересчета
+(RecommendationRun). Списки остальных книг могут слегка
+устареть до следующего полного пересчета (--full).
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from .models import Book, BookNeighbor, ReadingProgress, RecommendationRun, UserRecommendation
+
+TOP_K = getattr(settings, 'RECOMMENDATIONS_TOP_K', 20)
+GENRE_WEIGHT = getattr(settings, 'RECOMMENDATIONS_GENRE_WEIGHT', 0.3)
+CHUNK_SIZE = getattr(settings, 'RECOMMENDATIONS_CHUNK_SIZE', 1000)
+COMPLETED_WEIGHT = 2.0
+STARTED_WEIGHT = 1.0
+# Популярность лишь упорядочивает книги с равным сходством
+POPULARITY_WEIGHT = 1e-3
+BATCH_SIZE = 2000
+
+
+@dataclass
+class Data:
+    book_ids: np.ndarray
+    user_ids: np.ndarray
+    ratings: sparse.csr_matrix     # пользователь x книга
+    genres: sparse.csr_matrix      # книга x жанр, строки нормированы
+    favorites: sparse.csr_matrix   # пользователь x жанр, строки нормированы
+    popularity: np.ndarray         # 0..1 по числу читателей
+
+    def book_index(self, ids):
+        return _index(self.book_ids, ids)
+
+    def user_index(self, ids):
+        return _index(self.user_ids, ids)
+
+
+def _index(sorted_ids, ids):
+    """Позиции ids в отсортированном массиве; отсутствующие отбрасываются"""
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(sorted_ids) or not len(ids):
+        return np.array([], dtype=np.int64)
+    positions = np.searchsorted(sorted_ids, ids).clip(0, len(sorted_ids) - 1)
+    return np.unique(positions[sorted_ids[positions] == ids])
+
+
+def _normalize_rows(matrix):
+    matrix = matrix.tocsr().astype(np.float32)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return sparse.diags(inverse.astype(np.float32)) @ matrix
+
+
+def _pairs(ids, values):
+    return np.asarray(ids, dtype=np.int64), np.asarray(values, dtype=np.int64)
+
+
+def make_data(book_ids, progress, book_genres, favorite_genres):
+    """
+    Собирает матрицы из массивов.
+
+    progress - (user_ids, book_ids, is_completed), book_genres и
+    favorite_genres - пары (book_id|user_id, genre_id).
+    """
+    book_ids = np.unique(np.asarray(book_ids, dtype=np.int64))
+    progress_users, progress_books = _pairs(progress[0], progress[1])
+    completed = np.asarray(progress[2], dtype=bool)
+    genre_books, book_genre_ids = _pairs(*book_genres)
+    favorite_users, favorite_genre_ids = _pairs(*favorite_genres)
+
+    user_ids = np.unique(np.concatenate([progress_users, favorite_users]))
+    genre_ids = np.unique(np.concatenate([book_genre_ids, favorite_genre_ids]))
+    shape_users, shape_books, shape_genres = len(user_ids), len(book_ids), len(genre_ids)
+
+    weights = np.where(completed, COMPLETED_WEIGHT, STARTED_WEIGHT).astype(np.float32)
+    ratings = sparse.csr_matrix(
+        (weights, (np.searchsorted(user_ids, progress_users), np.searchsorted(book_ids, progress_books))),
+        shape=(shape_users, shape_books),
+    )
+    # Связи с книгами вне каталога (удалены между запросами) отбрасываются
+    known = np.isin(genre_books, book_ids)
+    genres = sparse.csr_matrix(
+        (np.ones(known.sum(), dtype=np.float32),
+         (np.searchsorted(book_ids, genre_books[known]), np.searchsorted(genre_ids, book_genre_ids[known]))),
+        shape=(shape_books, shape_genres),
+    )
+    favorites = sparse.csr_matrix(
+        (np.ones(len(favorite_users), dtype=np.float32),
+         (np.searchsorted(user_ids, favorite_users), np.searchsorted(genre_ids, favorite_genre_ids))),
+        shape=(shape_users, shape_genres),
+    )
+    readers = ratings.getnnz(axis=0)
+    popularity = np.log1p(readers) / np.log1p(readers.max()) if readers.size and readers.max() else np.zeros(shape_books)
+    return Data(
+        book_ids=book_ids,
+        user_ids=user_ids,
+        ratings=ratings,
+        genres=_normalize_rows(genres),
+        favorites=_normalize_rows(favorites),
+        popularity=popularity.astype(np.float32),
+    )
+
+
+def load_data():
+    """Загружает данные из базы тремя запросами"""
+    from accounts.models import UserProfile
+
+    book_ids = list(Book.objects.order_by().values_list('pk', flat=True))
+    progress = ReadingProgress.objects.order_by().values_list('user_id', 'book_id', 'is_completed')
+    progress = np.array(list(progress), dtype=np.int64).reshape(-1, 3).T
+    book_genres = np.array(list(Book.genres.through.objects.values_list('book_id', 'genre_id')), dtype=np.int64)
+    favorites = UserProfile.favorite_genres.through.objects.values_list('userprofile__user_id', 'genre_id')
+    favorites = np.array(list(favorites), dtype=np.int64)
+    return make_data(
+        book_ids,
+        progress,
+        book_genres.reshape(-1, 2).T,
+        favorites.reshape(-1, 2).T,
+    )
+
+
+def _top_k(matrix, k):
+    """Лучшие k значений в каждой строке CSR: [(строка, столбцы, значения)]"""
+    result = []
+    indptr, indices, values = matrix.indptr, matrix.indices, matrix.data
+    for row in range(matrix.shape[0]):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue
+        row_values, row_indices = values[start:end], indices[start:end]
+        if end - start > k:
+            best = np.argpartition(-row_values, k)[:k]
+            row_values, row_indices = row_values[best], row_indices[best]
+        order = np.argsort(-row_values, kind='stable')
+        result.append((row, row_indices[order], row_values[order]))
+    return result
+
+
+def _pair_similarity(left, left_rows, right, right_rows):
+    """Скалярные произведения строк left[left_rows[i]] и right[right_rows[i]]"""
+    if not len(left_rows):
+        return np.zeros(0, dtype=np.float32)
+    return np.asarray(left[left_rows].multiply(right[right_rows]).sum(axis=1)).ravel()
+
+
+def _chunks(rows, chunk_size):
+    for start in range(0, len(rows), chunk_size):
+        yield rows[start:start + chunk_size]
+
+
+def book_neighbors(data, rows=None, k=TOP_K, genre_weight=GENRE_WEIGHT, chunk_size=CHUNK_SIZE):
+    """Соседи книг с индексами rows (по умолчанию всех): [(книга, соседи, оценки)]"""
+    items = _normalize_rows(data.ratings.T)  # книга x пользователь
+    items_t = items.T.tocsr()
+    has_readers = items.getnnz(axis=1) > 0
+    rows = np.arange(len(data.book_ids)) if rows is None else np.asarray(rows)
+    result = []
+    for chunk in _chunks(rows, chunk_size):
+        warm, cold = chunk[has_readers[chunk]], chunk[~has_readers[chunk]]
+        parts = []
+        if len(warm):
+            # Совместное чтение, смешанное с жанровым сходством тех же пар
+            co = (items[warm] @ items_t).tocoo()
+            genre = _pair_similarity(data.genres, warm[co.row], data.genres, co.col)
+            parts.append((warm, co.row, co.col, (1 - genre_weight) * co.data + genre_weight * genre))
+        if len(cold):
+            # Книги без читателей: только жанры
+            genre = (data.genres[cold] @ data.genres.T).tocoo()
+            parts.append((cold, genre.row, genre.col, genre_weight * genre.data))
+        for books, local_rows, cols, scores in parts:
+            scores = scores + POPULARITY_WEIGHT * data.popularity[cols]
+            keep = cols != books[local_rows]
+            matrix = sparse.csr_matrix(
+                (scores[keep], (local_rows[keep], cols[keep])), shape=(len(books), len(data.book_ids))
+            )
+            result.extend((books[row], cols_, values) for row, cols_, values in _top_k(matrix, k))
+    return result
+
+
+def neighbor_matrix(data, neighbors):
+    """Разреженная матрица книга x книга из результатов book_neighbors"""
+    if not neighbors:
+        return sparse.csr_matrix((len(data.book_ids), len(data.book_ids)), dtype=np.float32)
+    rows = np.concatenate([np.full(len(cols), row) for row, cols, _ in neighbors])
+    cols = np.concatenate([cols for _, cols, _ in neighbors])
+    scores = np.concatenate([scores for _, _, scores in neighbors])
+    return sparse.csr_matrix((scores, (rows, cols)), shape=(len(data.book_ids), len(data.book_ids)))
+
+
+def user_recommendations(data, neighbors, rows=None, k=TOP_K, genre_weight=GENRE_WEIGHT, chunk_size=CHUNK_SIZE):
+    """Рекомендации пользователям с индексами rows: [(пользователь, книги, оценки)]"""
+    rows = np.arange(len(data.user_ids)) if rows is None else np.asarray(rows)
+    has_reads = data.ratings.getnnz(axis=1) > 0
+    genres_t = data.genres.T.tocsr()
+    result = []
+    for chunk in _chunks(rows, chunk_size):
+        warm, cold = chunk[has_reads[chunk]], chunk[~has_reads[chunk]]
+        parts = []
+        if len(warm):
+            ratings = data.ratings[warm]
+            candidates = ratings @ neighbors
+            # Уже читавшиеся книги не рекомендуем
+            candidates = (candidates - candidates.multiply(ratings > 0)).tocsr()
+            candidates.eliminate_zeros()
+            top = candidates.max(axis=1).toarray().ravel()
+            candidates = (sparse.diags(np.divide(1.0, top, out=np.zeros_like(top), where=top > 0)) @ candidates).tocoo()
+            genre = _pair_similarity(data.favorites, warm[candidates.row], data.genres, candidates.col)
+            parts.append((warm, candidates.row, candidates.col, (1 - genre_weight) * candidates.data + genre_weight * genre))
+        if len(cold):
+            # Без прочитанных книг: популярные книги любимых жанров
+            genre = (data.favorites[cold] @ genres_t).tocoo()
+            parts.append((cold, genre.row, genre.col, genre_weight * genre.data))
+        for users, local_rows, cols, scores in parts:
+            scores = scores + POPULARITY_WEIGHT * data.popularity[cols]
+            matrix = sparse.csr_matrix((scores, (local_rows, cols)), shape=(len(users), len(data.book_ids)))
+            result.extend((users[row], cols_, values) for row, cols_, values in _top_k(matrix, k))
+    return result
+
+
+def _objects(model, owner_field, owner_ids, related_field, related_ids, results, now):
+    """Строки таблицы из результатов [(владелец, связанные, оценки)] с индексами вместо id"""
+    return [
+        model(**{
+            f'{owner_field}_id': int(owner_ids[owner]),
+            f'{related_field}_id': int(related_ids[related]),
+            'rank': rank,
+            'score': float(score),
+            'computed_at': now,
+        })
+        for owner, related, scores in results
+        for rank, (related, score) in enumerate(zip(related, scores), start=1)
+    ]
+
+
+def save_results(data, neighbors, recommendations, book_rows, user_rows, now, batch_size=BATCH_SIZE):
+    """Заменяет соседей книг book_rows и рекомендации пользователей user_rows"""
+    book_objects = _objects(BookNeighbor, 'book', data.book_ids, 'neighbor', data.book_ids, neighbors, now)
+    user_objects = _objects(UserRecommendation, 'user', data.user_ids, 'book', data.book_ids, recommendations, now)
+    with transaction.atomic():
+        for model, field, ids in (
+            (BookNeighbor, 'book_id', data.book_ids[book_rows]),
+            (UserRecommendation, 'user_id', data.user_ids[user_rows]),
+        ):
+            for batch in _chunks(ids.tolist(), batch_size):
+                model.objects.filter(**{f'{field}__in': batch}).delete()
+        BookNeighbor.objects.bulk_create(book_objects, batch_size=batch_size)
+        UserRecommendation.objects.bulk_create(user_objects, batch_size=batch_size)
+    return len(book_objects), len(user_objects)
+
+
+def stored_neighbor_matrix(data):
+    """Матрица соседей из таблицы BookNeighbor (для инкрементального режима)"""
+    rows = np.array(list(BookNeighbor.objects.values_list('book_id', 'neighbor_id', 'score')), dtype=np.float64)
+    rows = rows.reshape(-1, 3)
+    book_ids, neighbor_ids = rows[:, 0].astype(np.int64), rows[:, 1].astype(np.int64)
+    known = np.isin(book_ids, data.book_ids) & np.isin(neighbor_ids, data.book_ids)
+    return sparse.csr_matrix(
+        (rows[known, 2].astype(np.float32),
+         (np.searchsorted(data.book_ids, book_ids[known]), np.searchsorted(data.book_ids, neighbor_ids[known]))),
+        shape=(len(data.book_ids), len(data.book_ids)),
+    )
+
+
+def changes_since(since):
+    """Книги и пользователи, затронутые изменениями после since"""
+    from accounts.models import UserProfile
+
+    changed = list(ReadingProgress.objects.filter(changed_at__gt=since).values_list('user_id', 'book_id'))
+    book_ids = {book_id for _, book_id in changed}
+    book_ids.update(Book.objects.filter(created_at__gt=since).values_list('pk', flat=True))
+    user_ids = {user_id for user_id, _ in changed}
+    user_ids.update(UserProfile.objects.filter(updated_at__gt=since).values_list('user_id', flat=True))
+    return book_ids, user_ids
+
+
+def refresh(full=False):
+    """
+    Пересчитывает рекомендации; без full - только затронутое с прошлого запуска.
+
+    Возвращает словарь со счетчиками пересчитанных книг и пользователей.
+    """
+    now = timezone.now()
+    last_run = None if full else RecommendationRun.objects.order_by('-started_at').first()
+    since = last_run.started_at if last_run else None
+    if since is not None:
+        book_ids, user_ids = changes_since(since)
+        if not book_ids and not user_ids:
+            return {'books': 0, 'users': 0, 'neighbors': 0, 'recommendations': 0}
+
+    data = load_data()
+    if since is None:
+        book_rows, user_rows = np.arange(len(data.book_ids)), np.arange(len(data.user_ids))
+    else:
+        book_rows, user_rows = data.book_index(sorted(book_ids)), data.user_index(sorted(user_ids))
+
+    neighbors = book_neighbors(data, book_rows)
+    if since is None:
+        matrix = neighbor_matrix(data, neighbors)
+    else:
+        # Соседи остальных книг берутся из таблицы, пересчитанных - из памяти
+        keep = np.ones(len(data.book_ids), dtype=np.float32)
+        keep[book_rows] = 0
+        matrix = (sparse.diags(keep) @ stored_neighbor_matrix(data) + neighbor_matrix(data, neighbors)).tocsr()
+    recommendations = user_recommendations(data, matrix, user_rows)
+    neighbor_count, recommendation_count = save_results(data, neighbors, recommendations, book_rows, user_rows, now)
+    # Курсор - начало этого пересчета: изменения, записанные во время него, попадут в следующий
+    RecommendationRun.objects.update_or_create(pk=1, defaults={'started_at': now, 'full': since is None})
+    return {
+        'books': len(book_rows),
+        'users': len(user_rows),
+        'neighbors': neighbor_count,
+        'recommendations': recommendation_count,
+    }
@@ -0,0 +1,203 @@
+"""
+Полнотекстовый поиск по книгам.
+
+Индекс хранится в отдельной таблице books_search, которую создает миграция
+books.0002 в зависимости от СУБД:
+
+- PostgreSQL: tsvector с весами полей и GIN-индексом;
+- SQLite: виртуальная таблица FTS5 (rowid = id книги).
+
+Для остальных СУБД используется прежний поиск через icontains.
+Индекс обновляется сигналами books/signals.py при сохранении книги,
+изменении ее жанров и переименовании жанра.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+
+from .models import Book
+
+INDEX_TABLE = 'books_search'
+CHUNK_SIZE = 2000
+
+_token_re = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    """Разбивает поисковый запрос на слова"""
+    return _token_re.findall(query.lower())
+
+
+def iter_documents(book_ids=None, chunk_size=CHUNK_SIZE):
+    """
+    Возвращает документы для индекса порциями.
+
+    Жанры каждой порции загружаются одним запросом к промежуточной таблице.
+    """
+    queryset = Book.objects.order_by('pk')
+    if book_ids is not None:
+        queryset = queryset.filter(pk__in=list(book_ids))
+    through = Book.genres.through
+    
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk)
+            .values_list('pk', 'title', 'author', 'isbn', 'description')[:chunk_size]
+        )
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        
+        genres = {}
+        for book_id, name in through.objects.filter(book_id__in=[row[0] for row in rows]).values_list('book_id', 'genre__name'):
+            genres.setdefault(book_id, []).append(name)
+        
+        for pk, title, author, isbn, description in rows:
+            yield pk, title, author, isbn or '', description, ' '.join(genres.get(pk, []))
+
+
+class BaseSearchBackend:
+    """Общий интерфейс поисковых бэкендов"""
+    
+    def update(self, book_ids):
+        """Переиндексирует указанные книги"""
+        self.remove(book_ids)
+        self._insert(iter_documents(book_ids))
+    
+    def rebuild(self, chunk_size=CHUNK_SIZE):
+        """Полностью перестраивает индекс"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {INDEX_TABLE}')
+        batch = []
+        for document in iter_documents(chunk_size=chunk_size):
+            batch.append(document)
+            if len(batch) >= chunk_size:
+                self._insert(batch)
+                batch = []
+        if batch:
+            self._insert(batch)
+    
+    def remove(self, book_ids):
+        book_ids = list(book_ids)
+        if not book_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(book_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE {self.id_column} IN ({placeholders})', book_ids)
+    
+    def filter(self, queryset, query):
+        """Оставляет в queryset совпадения с запросом и добавляет search_rank (больше - лучше)"""
+        raise NotImplementedError
+    
+    def _insert(self, documents):
+        raise NotImplementedError
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """tsvector + GIN, ранжирование ts_rank_cd"""
+    id_column = 'book_id'
+    
+    def __init__(self):
+        self.config = getattr(settings, 'BOOK_SEARCH_CONFIG', 'simple')
+    
+    def _insert(self, documents):
+        rows = [(pk, title, isbn, author, genres, description) for pk, title, author, isbn, description, genres in documents]
+        if not rows:
+            return
+        cfg = self.config
+        with connection.cursor() as cursor:
+            for row in rows:
+                cursor.execute(
+                    f'INSERT INTO {INDEX_TABLE} (book_id, document) VALUES (%s, '
+                    f"setweight(to_tsvector('{cfg}', %s), 'A') || setweight(to_tsvector('{cfg}', %s), 'A') || "
+                    f"setweight(to_tsvector('{cfg}', %s), 'B') || setweight(to_tsvector('{cfg}', %s), 'C') || "
+                    f"setweight(to_tsvector('{cfg}', %s), 'D'))",
+                    row,
+                )
+    
+    def filter(self, queryset, query):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+        # Каждое слово ищется как префикс: "толс" найдет "Толстой"
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return queryset.extra(
+            tables=[INDEX_TABLE],
+            where=[
+                f'{INDEX_TABLE}.book_id = {Book._meta.db_table}.id',
+                f"{INDEX_TABLE}.document @@ to_tsquery('{self.config}', %s)",
+            ],
+            params=[tsquery],
+            select={'search_rank': f"ts_rank_cd({INDEX_TABLE}.document, to_tsquery('{self.config}', %s))"},
+            select_params=[tsquery],
+        )
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5, ранжирование bm25 с весами колонок"""
+    id_column = 'rowid'
+    # Веса колонок: title, author, isbn, description, genres
+    weights = (10.0, 5.0, 10.0, 1.0, 3.0)
+    
+    def _insert(self, documents):
+        documents = list(documents)
+        if not documents:
+            return
+        with connection.cursor() as cursor:
+            for row in documents:
+                cursor.execute(
+                    f'INSERT INTO {INDEX_TABLE} (rowid, title, author, isbn, description, genres) '
+                    'VALUES (%s, %s, %s, %s, %s, %s)',
+                    row,
+                )
+    
+    def filter(self, queryset, query):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return queryset.extra(
+            tables=[INDEX_TABLE],
+            where=[
+                f'{INDEX_TABLE}.rowid = {Book._meta.db_table}.id',
+                f'{INDEX_TABLE} MATCH %s',
+            ],
+            params=[match],
+            # bm25 возвращает отрицательные значения: чем меньше, тем релевантнее
+            select={'search_rank': f'-bm25({INDEX_TABLE}, {weights})'},
+        )
+
+
+class FallbackSearchBackend(BaseSearchBackend):
+    """Поиск через icontains для СУБД без полнотекстового индекса"""
+    
+    def update(self, book_ids):
+        pass
+    
+    def rebuild(self, chunk_size=CHUNK_SIZE):
+        pass
+    
+    def remove(self, book_ids):
+        pass
+    
+    def filter(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(author__icontains=query) |
+            Q(isbn__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_backend():
+    """Бэкенд поиска для текущей СУБД"""
+    return BACKENDS.get(connection.vendor, FallbackSearchBackend)()
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+
+from .progress import ProgressRecord
+
+PROGRESS_BATCH_MAX = getattr(settings, 'READING_PROGRESS_BATCH_MAX', 500)
+
+
+class ProgressRecordSerializer(serializers.Serializer):
+    """Одна запись прогресса; отсутствующие поля не меняются"""
+    book_id = serializers.IntegerField(min_value=1)
+    pages_read = serializers.IntegerField(min_value=0, required=False)
+    current_chapter = serializers.IntegerField(min_value=1, required=False)
+    is_completed = serializers.BooleanField(required=False)
+    updated_at = serializers.DateTimeField(required=False, help_text='Время изменения на клиенте')
+
+    def to_internal_value(self, data):
+        values = super().to_internal_value(data)
+        values.setdefault('updated_at', timezone.now())
+        return ProgressRecord(**values)
+
+
+class ProgressBatchSerializer(serializers.Serializer):
+    records = ProgressRecordSerializer(many=True, allow_empty=False, max_length=PROGRESS_BATCH_MAX)
+
+
+class ProgressResultSerializer(serializers.Serializer):
+    book_id = serializers.IntegerField()
+    status = serializers.CharField()
+
+
+class ProgressSyncResultSerializer(serializers.Serializer):
+    results = ProgressResultSerializer(many=True)
+    created = serializers.IntegerField()
+    updated = serializers.IntegerField()
+    stale = serializers.IntegerField()
+    not_found = serializers.IntegerField()
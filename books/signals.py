@@ -1,10 +1,101 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import ReadingProgress
+from accounts import stats
+from jobs.queue import job, enqueue
+from bookclubhub.cache import bump
+from .models import Book, Genre, ReadingProgress
+from .search import get_backend
+
+
+@receiver(post_init, sender=ReadingProgress)
+def remember_completed(sender, instance, **kwargs):
+    """Запоминает is_completed, чтобы учитывать только смену состояния"""
+    instance._stats_completed = instance.__dict__.get('is_completed')
 
 
 @receiver(post_save, sender=ReadingProgress)
-def update_user_statistics(sender, instance, **kwargs):
-    """Обновляет статистику пользователя при изменении прогресса чтения"""
-    instance.user.profile.update_statistics()
+def update_user_statistics(sender, instance, created, **kwargs):
+    """Обновляет books_read при завершении книги или снятии отметки"""
+    previous = False if created else instance._stats_completed
+    current = instance.__dict__.get('is_completed')
+    if previous is None or current is None:
+        # Поле было отложено (defer): переход неизвестен, исправит сверка
+        return
+    instance._stats_completed = current
+    stats.adjust(instance.user_id, books_read=stats.completed_delta(previous, current))
+
+
+@receiver(post_delete, sender=ReadingProgress)
+def discount_deleted_progress(sender, instance, **kwargs):
+    if instance.__dict__.get('is_completed'):
+        stats.adjust(instance.user_id, books_read=-1)
+
+
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, **kwargs):
+    """Обновляет поисковый индекс книги"""
+    get_backend().update([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def unindex_book(sender, instance, **kwargs):
+    """Удаляет книгу из поискового индекса"""
+    get_backend().remove([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.genres.through)
+def reindex_book_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    """Переиндексирует книги при изменении их жанров"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        get_backend().update([instance.pk])
+    elif pk_set:
+        get_backend().update(pk_set)
+    elif action == 'post_clear':
+        # genre.books.clear(): затронутые книги уже не известны, пересобираем в фоне
+        enqueue('books.rebuild_search_index')
+
+
+@receiver(post_save, sender=Genre)
+def reindex_genre_books(sender, instance, created, **kwargs):
+    """Переиндексирует книги жанра после его переименования"""
+    if not created:
+        enqueue('books.reindex_genre', instance.pk)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_books_cache(sender, **kwargs):
+    """Сбрасывает кеш страниц со списками книг (и карточек клубов с текущей книгой)"""
+    bump('books')
+
+
+@receiver(m2m_changed, sender=Book.genres.through)
+def invalidate_books_cache_on_genres(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump('books')
+
+
+@job('books.reindex_genre')
+def reindex_genre(genre_id):
+    """Переиндексирует все книги жанра"""
+    backend = get_backend()
+    book_ids = list(Book.genres.through.objects.filter(genre_id=genre_id).values_list('book_id', flat=True))
+    for start in range(0, len(book_ids), 1000):
+        backend.update(book_ids[start:start + 1000])
+
+
+@job('books.rebuild_search_index')
+def rebuild_search_index():
+    """Полностью перестраивает поисковый индекс книг"""
+    get_backend().rebuild()
+
 
+@job('books.refresh_recommendations')
+def refresh_recommendations(full=False):
+    """Пересчитывает похожие книги и персональные рекомендации"""
+    from .recommendations import refresh
+    refresh(full=full)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'books'
 
@@ -8,5 +8,6 @@ urlpatterns = [
     path('<int:pk>/', views.BookDetailView.as_view(), name='detail'),
     path('add/', views.add_book, name='add'),
     path('<int:book_id>/progress/', views.update_reading_progress, name='update_progress'),
+    path('api/progress/batch/', api.ProgressBatchView.as_view(), name='api_progress_batch'),
 ]
 
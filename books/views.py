@@ -3,40 +3,69 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
-from .models import Book, Genre, ReadingProgress
+from django.utils.decorators import method_decorator
+from .models import Book, BookNeighbor, Genre, ReadingProgress
 from .forms import BookForm, ReadingProgressForm
+from bookclubhub.pagination import CursorPaginationMixin
+from bookclubhub.cache import cache_page
+from bookclubhub.facets import filter_m2m, facet_counts, MODE_AND, MODE_OR
+from .search import get_backend as get_search_backend
 
+SIMILAR_BOOKS_SHOWN = 6
 
-class BookListView(ListView):
+
+@method_decorator(cache_page(['books']), name='dispatch')
+class BookListView(CursorPaginationMixin, ListView):
     """Список всех книг"""
     model = Book
     template_name = 'books/list.html'
     context_object_name = 'books'
     paginate_by = 20
+    cursor_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
-        queryset = Book.objects.select_related().prefetch_related('genres')
+        queryset = Book.objects.prefetch_related('genres')
         search_query = self.request.GET.get('search', '')
-        genre_slug = self.request.GET.get('genre', '')
+        genre_mode = self.get_genre_mode()
         
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(author__icontains=search_query) |
-                Q(isbn__icontains=search_query)
-            )
+            queryset = get_search_backend().filter(queryset, search_query)
+        
+        # Несколько жанров: ?genre=a&genre=b&genre_mode=and|or
+        filtered = filter_m2m(queryset, 'genres', self.get_selected_genres(), mode=genre_mode)
         
-        if genre_slug:
-            queryset = queryset.filter(genres__slug=genre_slug)
+        # Фасет считается по найденным книгам, как у постов клуба: в режиме "или"
+        # до фильтра по жанрам (сколько книг добавит жанр), в режиме "и" - после
+        # (сколько останется, если добавить жанр)
+        self.genre_counts = facet_counts(filtered if genre_mode == MODE_AND else queryset, 'genres')
         
-        return queryset.distinct()
+        if search_query:
+            # Результаты полнотекстового поиска сортируются по релевантности
+            filtered = filtered.order_by('-search_rank', '-created_at')
+        return filtered
+    
+    def get_selected_genres(self):
+        return [slug for slug in self.request.GET.getlist('genre') if slug]
+    
+    def get_genre_mode(self):
+        return MODE_AND if self.request.GET.get('genre_mode') == MODE_AND else MODE_OR
+    
+    def get_cursor_ordering(self):
+        # Результаты поиска сортируются по релевантности - обычная пагинация
+        if self.request.GET.get('search'):
+            return None
+        return super().get_cursor_ordering()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['genres'] = Genre.objects.all()
+        # Количество книг каждого жанра (см. get_queryset) - один запрос с GROUP BY
+        genres = list(Genre.objects.all())
+        for genre in genres:
+            genre.facet_count = self.genre_counts.get(genre.slug, 0)
+        context['genres'] = genres
         context['search_query'] = self.request.GET.get('search', '')
-        context['selected_genre'] = self.request.GET.get('genre', '')
+        context['selected_genres'] = self.get_selected_genres()
+        context['genre_mode'] = self.get_genre_mode()
         return context
 
 
@@ -53,6 +82,11 @@ class BookDetailView(DetailView):
                 user=self.request.user,
                 book=self.object
             ).first()
+        # Читатели также читали: готовый список из books.recommendations
+        context['similar_books'] = [
+            neighbor.neighbor
+            for neighbor in BookNeighbor.objects.filter(book=self.object).select_related('neighbor')[:SIMILAR_BOOKS_SHOWN]
+        ]
         return context
 
 
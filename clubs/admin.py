@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Club, ClubMembership, ClubInvitation
+from .models import Club, ClubMembership, ClubInvitation, ReadingPace
 
 
 class ClubMembershipInline(admin.TabularInline):
@@ -32,3 +32,11 @@ class ClubInvitationAdmin(admin.ModelAdmin):
     search_fields = ('club__name', 'email', 'invited_by__username')
     readonly_fields = ('created_at', 'accepted_at')
 
+
+
+@admin.register(ReadingPace)
+class ReadingPaceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'club', 'pages_per_day', 'projected_finish', 'days_late', 'risk', 'computed_at')
+    list_filter = ('computed_at',)
+    search_fields = ('user__username', 'club__name')
+    raw_id_fields = ('club', 'user', 'book')
@@ -0,0 +1,111 @@
+import json
+from collections import deque
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.db import database_sync_to_async
+
+from . import stream
+from .models import Club
+
+
+class ClubStreamConsumer(AsyncWebsocketConsumer):
+    """
+    WebSocket consumer ленты активности клуба.
+
+    Клиент может передать ?since=<seq> - номер последнего полученного
+    события; пропущенные события досылаются из общего кеша
+    (clubs.stream.since) без обращения к базе. Повторы (событие пришло и из
+    кеша, и из группы) отбрасываются, а опоздавшее событие, после которого
+    клиент уже получил более позднее, вызывает resync.
+    """
+
+    async def connect(self):
+        self.club_id = self.scope['url_route']['kwargs']['club_id']
+        if not await self.can_view():
+            await self.close()
+            return
+
+        self.room_group_name = stream.group_name(self.club_id)
+        # Клиент уже получил все события до floor включительно и события из sent
+        self.floor = None
+        self.sent = deque(maxlen=stream.BUFFER_SIZE)
+
+        # Подписываемся до досылки, чтобы не потерять события между ними
+        await self.channel_layer.group_add(
+            self.room_group_name,
+            self.channel_name
+        )
+
+        await self.accept()
+
+        since = self.get_since()
+        if since is not None:
+            await self.replay(since)
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'room_group_name'):
+            await self.channel_layer.group_discard(
+                self.room_group_name,
+                self.channel_name
+            )
+
+    async def receive(self, text_data):
+        # Клиент может только проверить соединение
+        try:
+            message = json.loads(text_data)
+        except ValueError:
+            return
+        if isinstance(message, dict) and message.get('type') == 'ping':
+            await self.send(text_data=json.dumps({'event': 'pong'}))
+
+    async def club_event(self, event):
+        await self.send_event(event['seq'], event['text'])
+
+    async def send_event(self, seq, text):
+        # Событие могло прийти и из кеша, и из группы
+        if (self.floor is not None and seq <= self.floor) or seq in self.sent:
+            return
+        if self.sent and seq < self.sent[-1]:
+            # Порядок у клиента уже не восстановить: пусть перезагрузит состояние
+            await self.resync(floor=self.sent[-1])
+            return
+        self.sent.append(seq)
+        await self.send(text_data=text)
+
+    async def resync(self, floor=None):
+        self.floor = floor
+        self.sent.clear()
+        await self.send(text_data=json.dumps({'event': stream.EVENT_RESYNC}))
+
+    async def replay(self, since):
+        # Кеш (Redis) читается в потоке, чтобы не блокировать цикл событий
+        missed, complete = await sync_to_async(stream.since)(self.club_id, since)
+        if not complete:
+            # Часть событий недоступна: клиент должен перезагрузить состояние
+            await self.resync()
+            return
+        self.floor = since
+        for seq, text in missed:
+            await self.send_event(seq, text)
+
+    def get_since(self):
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        try:
+            return int(query['since'][0])
+        except (KeyError, ValueError):
+            return None
+
+    @database_sync_to_async
+    def can_view(self):
+        """Публичный клуб доступен всем, приватный - только участникам"""
+        try:
+            self.club_id = int(self.club_id)
+            club = Club.objects.get(pk=self.club_id)
+        except (ValueError, Club.DoesNotExist):
+            return False
+        if not club.is_private:
+            return True
+        user = self.scope.get('user')
+        return user is not None and club.is_member(user)
@@ -0,0 +1,192 @@
+"""
+Сводка прогресса клуба по текущей книге.
+
+Снимок прогресса участников строится одним запросом: ClubMembership с
+LEFT JOIN ReadingProgress по текущей книге (FilteredRelation). Снимок
+хранится в кеше и обновляется точечно: изменение прогресса, вступление
+или выход участника правят одну запись снимка, не перестраивая его.
+Смена текущей книги сбрасывает снимок.
+
+Гистограмма, медиана и отстающие считаются из снимка при показе, потому
+что ожидаемый прогресс зависит от текущей даты и дат чтения клуба.
+"""
+import statistics
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import FilteredRelation, Q
+from django.utils import timezone
+
+from books.models import ReadingProgress
+from .models import ClubMembership
+
+TIMEOUT = getattr(settings, 'CLUB_DASHBOARD_TIMEOUT', 600)
+LAGGARD_MARGIN = getattr(settings, 'CLUB_DASHBOARD_LAGGARD_MARGIN', 10)
+BUCKET_SIZE = 10
+
+
+def _key(club_id):
+    return f'club-dashboard:{club_id}'
+
+
+def build_snapshot(club):
+    """{'book_id': id, 'members': {user_id: [username, pages_read|None, is_completed]}}"""
+    rows = (
+        ClubMembership.objects.filter(club=club)
+        .annotate(progress=FilteredRelation(
+            'user__reading_progresses',
+            condition=Q(user__reading_progresses__book_id=club.current_book_id),
+        ))
+        .values_list('user_id', 'user__username', 'progress__pages_read', 'progress__is_completed')
+    )
+    return {
+        'book_id': club.current_book_id,
+        'members': {
+            user_id: [username, pages, bool(completed)]
+            for user_id, username, pages, completed in rows
+        },
+    }
+
+
+def get_snapshot(club):
+    snapshot = cache.get(_key(club.pk))
+    if snapshot is None or snapshot['book_id'] != club.current_book_id:
+        snapshot = build_snapshot(club)
+        cache.set(_key(club.pk), snapshot, TIMEOUT)
+    return snapshot
+
+
+def _update(club_id, book_id, change):
+    """
+    Правит закешированный снимок; если снимка нет, его построит следующий показ.
+
+    Чтение и запись снимка не атомарны: при одновременных изменениях одно
+    из них может потеряться до истечения TIMEOUT, что для сводки допустимо.
+    """
+    snapshot = cache.get(_key(club_id))
+    if snapshot is None or (book_id is not None and snapshot['book_id'] != book_id):
+        return
+    change(snapshot['members'])
+    cache.set(_key(club_id), snapshot, TIMEOUT)
+
+
+def invalidate(club_id):
+    cache.delete(_key(club_id))
+
+
+def progress_changed(user_id, book_ids):
+    """Обновляет снимки клубов пользователя, где одна из book_ids - текущая книга"""
+    clubs = list(
+        ClubMembership.objects.filter(user_id=user_id, club__current_book_id__in=book_ids)
+        .values_list('club_id', 'club__current_book_id')
+    )
+    if not clubs:
+        return
+    rows = ReadingProgress.objects.filter(
+        user_id=user_id, book_id__in={book_id for _, book_id in clubs}
+    ).values_list('book_id', 'pages_read', 'is_completed')
+    progress = {book_id: (pages, completed) for book_id, pages, completed in rows}
+    for club_id, book_id in clubs:
+        pages, completed = progress.get(book_id, (None, False))
+
+        def change(members, pages=pages, completed=completed):
+            if user_id in members:
+                members[user_id][1:] = [pages, completed]
+
+        _update(club_id, book_id, change)
+
+
+def member_joined(membership):
+    def change(members):
+        row = ReadingProgress.objects.filter(
+            user_id=membership.user_id, book__active_clubs=membership.club_id
+        ).values_list('pages_read', 'is_completed').first()
+        pages, completed = row or (None, False)
+        members[membership.user_id] = [membership.user.username, pages, completed]
+
+    _update(membership.club_id, None, change)
+
+
+def member_left(membership):
+    _update(membership.club_id, None, lambda members: members.pop(membership.user_id, None))
+
+
+@dataclass
+class Dashboard:
+    members: int = 0
+    started: int = 0
+    completed: int = 0
+    not_started: int = 0
+    median_pages: Optional[float] = None
+    expected_percent: Optional[int] = None
+    # [(подпись, число участников, доля в % для ширины столбца)]
+    histogram: list = field(default_factory=list)
+    # [{'user_id', 'username', 'pages_read', 'percent'}] от самых отстающих
+    laggards: list = field(default_factory=list)
+
+
+def expected_percent(club, today=None):
+    """Какую часть книги к сегодняшнему дню нужно прочитать по датам клуба"""
+    if not club.reading_end_date:
+        return None
+    today = today or timezone.localdate()
+    start = club.reading_start_date
+    if today >= club.reading_end_date:
+        return 100
+    if not start or today <= start:
+        return 0
+    return int((today - start).days * 100 / (club.reading_end_date - start).days)
+
+
+def percent(pages, completed, total_pages):
+    if completed:
+        return 100
+    if not pages or total_pages <= 0:
+        return 0
+    return min(100, int(pages * 100 / total_pages))
+
+
+def summarize(club, snapshot, today=None):
+    """Строит сводку из снимка; club.current_book должна быть задана"""
+    total_pages = club.current_book.pages
+    dashboard = Dashboard(members=len(snapshot['members']))
+    buckets = [0] * (100 // BUCKET_SIZE)
+    pages_started = []
+    rows = []
+    for user_id, (username, pages, completed) in snapshot['members'].items():
+        if pages is None and not completed:
+            dashboard.not_started += 1
+            value = 0
+        else:
+            dashboard.started += 1
+            value = percent(pages, completed, total_pages)
+            pages_started.append(pages or 0)
+            if completed:
+                dashboard.completed += 1
+            else:
+                buckets[min(value // BUCKET_SIZE, len(buckets) - 1)] += 1
+        rows.append({'user_id': user_id, 'username': username, 'pages_read': pages or 0, 'percent': value})
+
+    if pages_started:
+        dashboard.median_pages = statistics.median(pages_started)
+
+    counts = [('Не начали', dashboard.not_started)]
+    counts += [(f'{i * BUCKET_SIZE}–{(i + 1) * BUCKET_SIZE - 1}%', count) for i, count in enumerate(buckets)]
+    counts.append(('Прочитали', dashboard.completed))
+    largest = max((count for _, count in counts), default=0) or 1
+    dashboard.histogram = [(label, count, count * 100 // largest) for label, count in counts]
+
+    dashboard.expected_percent = expected_percent(club, today)
+    if dashboard.expected_percent is not None:
+        threshold = dashboard.expected_percent - LAGGARD_MARGIN
+        dashboard.laggards = sorted(
+            (row for row in rows if row['percent'] < threshold),
+            key=lambda row: (row['percent'], row['username']),
+        )
+    return dashboard
+
+
+def get_dashboard(club, today=None):
+    return summarize(club, get_snapshot(club), today)
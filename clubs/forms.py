@@ -1,9 +1,12 @@
 from django import forms
+from images.uploads import DirectUploadMixin
 from .models import Club, ClubInvitation
 
 
-class ClubForm(forms.ModelForm):
+class ClubForm(DirectUploadMixin, forms.ModelForm):
     """Форма создания/редактирования клуба"""
+    direct_upload_fields = ('cover',)
+
     class Meta:
         model = Club
         fields = ['name', 'description', 'cover', 'is_private']
@@ -0,0 +1,104 @@
+"""
+Генерирует синтетические данные для нагрузочного тестирования.
+
+Запуск: python manage.py generate_load_data [--scale 20] [--seed 1] [--workers 8]
+        [--users N] [--books N] [--clubs N] [--posts N] [--comments N] [--likes N] [--reading N]
+        [--anchor 2026-01-01] [--no-index]
+
+--scale умножает объемы по умолчанию (scale=1 - около 600 тыс. строк,
+scale=20 - около 10 млн); явно заданные объемы не масштабируются.
+Одинаковые --seed и --anchor на пустой базе дают одинаковый набор данных,
+независимо от --workers. Пользователи создаются с именами <prefix><n> и
+паролем --password. Запускать на отдельной базе: после `flush` или на
+свежей после `migrate`. На SQLite запись выполняется в одном процессе.
+"""
+import os
+import time
+from datetime import datetime, time as day_start
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from accounts import stats
+from accounts.models import User
+from bookclubhub import loadgen
+from bookclubhub.cache import bump
+
+
+class Command(BaseCommand):
+    help = 'Создает синтетических пользователей, клубы, книги, посты, комментарии, лайки и прогресс чтения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='Множитель объемов по умолчанию')
+        for name, value in loadgen.DEFAULTS.items():
+            parser.add_argument(f'--{name}', type=int, help=f'Количество (по умолчанию {value} x scale)')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--anchor', help='Дата "сейчас" для данных, ГГГГ-ММ-ДД (по умолчанию сегодня)')
+        parser.add_argument('--days', type=int, default=730, help='Период активности до anchor, дней')
+        parser.add_argument('--max-depth', type=int, default=loadgen.MAX_DEPTH, help='Глубина деревьев комментариев')
+        parser.add_argument('--club-size-alpha', type=float, default=1.3,
+                            help='Показатель Парето для размеров клубов (меньше - тяжелее хвост)')
+        parser.add_argument('--prefix', default='load', help='Префикс имен пользователей')
+        parser.add_argument('--password', default='loadtest', help='Пароль всех пользователей')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=loadgen.BATCH_SIZE)
+        parser.add_argument('--no-index', action='store_true', help='Не перестраивать поисковые индексы')
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(
+                f'Пользователи с префиксом "{options["prefix"]}" уже есть; очистите базу (flush) или задайте --prefix'
+            )
+        try:
+            anchor = datetime.strptime(options['anchor'], '%Y-%m-%d').date() if options['anchor'] else timezone.localdate()
+        except ValueError:
+            raise CommandError('--anchor должен быть в формате ГГГГ-ММ-ДД')
+
+        workers = max(1, options['workers'])
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stderr.write('SQLite не допускает параллельной записи: используется один процесс')
+            workers = 1
+
+        volumes = {
+            name: options[name] if options[name] is not None else int(value * options['scale'])
+            for name, value in loadgen.DEFAULTS.items()
+        }
+        try:
+            plan = loadgen.build_plan(
+                options['seed'],
+                timezone.make_aware(datetime.combine(anchor, day_start())),
+                days=options['days'],
+                prefix=options['prefix'],
+                password=options['password'],
+                max_depth=options['max_depth'],
+                club_size_alpha=options['club_size_alpha'],
+                **volumes,
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(
+            f'План: {plan.users} пользователей, {plan.books} книг, {plan.clubs} клубов '
+            f'(до {plan.club_sizes.max(initial=0)} участников), {plan.posts} постов, '
+            f'{int(plan.post_comments.sum())} комментариев, процессов: {workers}'
+        )
+
+        def progress(phase, counts, seconds):
+            rows = sum(counts.values())
+            details = ', '.join(f'{label} {count}' for label, count in counts.items())
+            self.stdout.write(f'{phase}: {rows} строк за {seconds:.1f} с ({rows / max(seconds, 1e-6):.0f}/с) - {details}')
+
+        start = time.monotonic()
+        totals = loadgen.generate(plan, workers=workers, batch_size=options['batch_size'], progress=progress)
+
+        # Сигналы при bulk_create не срабатывают: производные данные обновляются здесь
+        self.stdout.write(f'Статистика профилей: исправлено {stats.reconcile()}')
+        if not options['no_index']:
+            call_command('rebuild_book_index', stdout=self.stdout)
+            call_command('rebuild_discussion_index', stdout=self.stdout)
+        bump('books', 'clubs')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {sum(totals.values())} за {time.monotonic() - start:.1f} с'
+        ))
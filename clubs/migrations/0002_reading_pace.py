@@ -0,0 +1,45 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('books', '0003_readingprogress_updated_at'),
+        ('clubs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingPace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pages_read', models.IntegerField(default=0, verbose_name='Прочитано страниц')),
+                ('pages_per_day', models.FloatField(default=0, verbose_name='Страниц в день')),
+                ('required_pages_per_day', models.FloatField(default=0, verbose_name='Нужно страниц в день')),
+                ('projected_finish', models.DateField(blank=True, null=True, verbose_name='Прогноз окончания')),
+                ('days_late', models.IntegerField(blank=True, null=True, verbose_name='Опоздание, дней')),
+                ('risk', models.FloatField(default=0, verbose_name='Риск не успеть')),
+                ('computed_at', models.DateTimeField(verbose_name='Рассчитано')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='books.book', verbose_name='Книга')),
+                ('club', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reading_paces', to='clubs.club', verbose_name='Клуб')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reading_paces', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Прогноз чтения',
+                'verbose_name_plural': 'Прогнозы чтения',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='readingpace',
+            index=models.Index(fields=['user', 'risk'], name='reading_pace_user_risk_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='readingpace',
+            unique_together={('club', 'user')},
+        ),
+    ]
@@ -5,9 +5,17 @@ from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 import uuid
 
+from . import roles
+
 User = get_user_model()
 
 
+class ClubQuerySet(models.QuerySet):
+    def with_member_count(self):
+        """Добавляет member_count, посчитанный в основном запросе"""
+        return self.annotate(member_count=models.Count('memberships', distinct=True))
+
+
 class Club(models.Model):
     """Книжный клуб"""
     ROLE_CHOICES = [
@@ -29,6 +37,8 @@ class Club(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
     
+    objects = ClubQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('Клуб')
         verbose_name_plural = _('Клубы')
@@ -46,16 +56,11 @@ class Club(models.Model):
     
     def is_member(self, user):
         """Проверяет, является ли пользователь участником"""
-        if not user.is_authenticated:
-            return False
-        return ClubMembership.objects.filter(club=self, user=user).exists()
+        return self.get_user_role(user) is not None
     
     def get_user_role(self, user):
         """Возвращает роль пользователя в клубе"""
-        if not self.is_member(user):
-            return None
-        membership = ClubMembership.objects.get(club=self, user=user)
-        return membership.role
+        return roles.get_role(user, self.pk)
     
     def can_manage(self, user):
         """Проверяет, может ли пользователь управлять клубом"""
@@ -105,3 +110,32 @@ class ClubInvitation(models.Model):
         status = 'Принято' if self.is_accepted else 'Ожидает'
         return f'{self.email} - {self.club.name} ({status})'
 
+
+
+class ReadingPace(models.Model):
+    """Прогноз темпа чтения участника по текущей книге клуба (пересчитывает clubs.pace)"""
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='reading_paces', verbose_name='Клуб')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reading_paces', verbose_name='Пользователь')
+    book = models.ForeignKey('books.Book', on_delete=models.CASCADE, related_name='+', verbose_name='Книга')
+    pages_read = models.IntegerField(default=0, verbose_name='Прочитано страниц')
+    pages_per_day = models.FloatField(default=0, verbose_name='Страниц в день')
+    required_pages_per_day = models.FloatField(default=0, verbose_name='Нужно страниц в день')
+    projected_finish = models.DateField(blank=True, null=True, verbose_name='Прогноз окончания')
+    days_late = models.IntegerField(blank=True, null=True, verbose_name='Опоздание, дней')
+    risk = models.FloatField(default=0, verbose_name='Риск не успеть')
+    computed_at = models.DateTimeField(verbose_name='Рассчитано')
+    
+    class Meta:
+        verbose_name = _('Прогноз чтения')
+        verbose_name_plural = _('Прогнозы чтения')
+        unique_together = ['club', 'user']
+        indexes = [
+            models.Index(fields=['user', 'risk'], name='reading_pace_user_risk_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.user_id} - {self.club_id}: {self.pages_per_day:.1f} стр./день'
+    
+    @property
+    def is_at_risk(self):
+        return self.days_late is not None and self.days_late > 0
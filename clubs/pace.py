@@ -0,0 +1,124 @@
+"""
+Прогноз темпа чтения участников активных клубов.
+
+Активный клуб - с текущей книгой и датой окончания чтения не раньше
+сегодняшней. Прогресс всех участников всех активных клубов выбирается
+одним запросом (ClubMembership LEFT JOIN ReadingProgress по текущей книге),
+после чего темп, прогноз окончания и риск считаются векторно в NumPy
+сразу по всем строкам. Результат целиком заменяет таблицу ReadingPace,
+которую страница клуба и уведомления читают по индексу (club, user).
+
+Темп - прочитанные страницы за дни с начала чтения (позднее из дат
+начала чтения клубом и начала чтения участником). Риск - недостающая доля
+темпа: 0, если текущего темпа хватает, 1, если участник стоит на месте.
+"""
+from datetime import date
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, FilteredRelation, Q
+from django.utils import timezone
+
+from .models import ClubMembership, ReadingPace
+
+BATCH_SIZE = 1000
+
+
+def load_rows(today):
+    """
+    Строки (club_id, user_id, book_id, pages, pages_read, is_completed, club_start, started_at, end).
+
+    Участники, еще не начавшие книгу, тоже попадают в выборку: у них
+    pages_read, is_completed и started_at равны None.
+    """
+    return list(
+        ClubMembership.objects.filter(
+            club__current_book__isnull=False,
+            club__reading_end_date__gte=today,
+        ).annotate(progress=FilteredRelation(
+            'user__reading_progresses',
+            condition=Q(user__reading_progresses__book=F('club__current_book')),
+        )).values_list(
+            'club_id', 'user_id', 'club__current_book_id', 'club__current_book__pages',
+            'progress__pages_read', 'progress__is_completed',
+            'club__reading_start_date', 'progress__started_at', 'club__reading_end_date',
+        ).order_by()
+    )
+
+
+def project(rows, today):
+    """
+    Векторный расчет по строкам load_rows().
+
+    Возвращает словарь массивов: pages_per_day, required, finish_days
+    (дней от today до окончания, NaN - не дочитает при нулевом темпе),
+    days_late и risk.
+    """
+    origin = today.toordinal()
+    pages = np.array([row[3] for row in rows], dtype=float)
+    # Не начавший книгу участник: 0 страниц, темп 0, риск 1
+    read = np.array([row[4] or 0 for row in rows], dtype=float)
+    completed = np.array([bool(row[5]) for row in rows], dtype=bool)
+    club_start = np.array([row[6].toordinal() if row[6] else origin for row in rows], dtype=float)
+    user_start = np.array([timezone.localtime(row[7]).toordinal() if row[7] else 0 for row in rows], dtype=float)
+    end = np.array([row[8].toordinal() for row in rows], dtype=float)
+
+    read = np.where(completed, np.maximum(read, pages), read)
+    remaining = np.maximum(pages - read, 0)
+    start = np.maximum(club_start, user_start)
+    elapsed = np.maximum(origin - start, 1)
+    pace = read / elapsed
+    days_left = np.maximum(end - origin, 1)
+    required = remaining / days_left
+
+    done = remaining <= 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        finish_days = np.where(done, 0, np.ceil(remaining / pace))
+        risk = np.where(done, 0, np.clip(1 - pace / required, 0, 1))
+    finish_days[~np.isfinite(finish_days)] = np.nan
+    days_late = finish_days - (end - origin)
+    return {
+        'pages_read': read,
+        'pages_per_day': pace,
+        'required': required,
+        'finish_days': finish_days,
+        'days_late': days_late,
+        'risk': risk,
+    }
+
+
+def compute(today=None, batch_size=BATCH_SIZE):
+    """Пересчитывает таблицу ReadingPace; возвращает число строк"""
+    today = today or timezone.localdate()
+    now = timezone.now()
+    rows = load_rows(today)
+    paces = []
+    if rows:
+        result = project(rows, today)
+        origin = today.toordinal()
+        for i, row in enumerate(rows):
+            finish = result['finish_days'][i]
+            paces.append(ReadingPace(
+                club_id=row[0],
+                user_id=row[1],
+                book_id=row[2],
+                pages_read=int(result['pages_read'][i]),
+                pages_per_day=round(float(result['pages_per_day'][i]), 2),
+                required_pages_per_day=round(float(result['required'][i]), 2),
+                projected_finish=None if np.isnan(finish) else date.fromordinal(origin + int(finish)),
+                days_late=None if np.isnan(finish) else int(result['days_late'][i]),
+                risk=round(float(result['risk'][i]), 3),
+                computed_at=now,
+            ))
+
+    with transaction.atomic():
+        ReadingPace.objects.all().delete()
+        ReadingPace.objects.bulk_create(paces, batch_size=batch_size)
+    return len(paces)
+
+
+def at_risk(user):
+    """Прогнозы пользователя, по которым он не успевает к сроку"""
+    return ReadingPace.objects.filter(user=user, risk__gt=0).filter(
+        Q(days_late__gt=0) | Q(days_late__isnull=True)
+    ).select_related('club', 'book')
@@ -0,0 +1,58 @@
+"""
+Кеш ролей пользователя в клубах.
+
+Все членства пользователя загружаются одним запросом и хранятся на объекте
+пользователя до конца запроса (request.user один на весь запрос), поэтому
+is_member/get_user_role/can_manage для любых клубов больше не ходят в базу.
+Между запросами словарь ролей хранится в общем кеше на
+CLUB_ROLES_CACHE_TIMEOUT секунд (0 - только в пределах запроса) и
+удаляется сигналами при изменении членств. Без общего кеша (locmem)
+удаление не дошло бы до других процессов, поэтому там по умолчанию 0.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+ROLES_TIMEOUT = getattr(settings, 'CLUB_ROLES_CACHE_TIMEOUT', 0)
+ATTR = '_club_roles'
+
+
+def _cache_key(user_id):
+    return f'club-roles:{user_id}'
+
+
+def load_roles(user_id):
+    """Словарь {club_id: role} из базы"""
+    from .models import ClubMembership
+    return dict(ClubMembership.objects.filter(user_id=user_id).values_list('club_id', 'role'))
+
+
+def get_roles(user):
+    """Роли пользователя во всех его клубах"""
+    if not user.is_authenticated:
+        return {}
+    roles = getattr(user, ATTR, None)
+    if roles is not None:
+        return roles
+    
+    if ROLES_TIMEOUT:
+        key = _cache_key(user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            roles = load_roles(user.pk)
+            cache.set(key, roles, ROLES_TIMEOUT)
+    else:
+        roles = load_roles(user.pk)
+    setattr(user, ATTR, roles)
+    return roles
+
+
+def get_role(user, club_id):
+    return get_roles(user).get(club_id)
+
+
+def invalidate(user_id, user=None):
+    """Сбрасывает кеш ролей; user - объект, на котором может лежать кеш запроса"""
+    if ROLES_TIMEOUT:
+        cache.delete(_cache_key(user_id))
+    if user is not None and getattr(user, ATTR, None) is not None:
+        setattr(user, ATTR, None)
@@ -1,7 +1,13 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from notifications.signals import notify
+from notifications_custom.fanout import bulk_notify
+from accounts import stats as profile_stats
+from jobs.queue import job, enqueue
+from bookclubhub.cache import bump
+from books.models import ReadingProgress
+from . import dashboard, pace, roles, stream
 from .models import Club, ClubMembership
 
 User = get_user_model()
@@ -9,21 +15,112 @@ User = get_user_model()
 
 @receiver(post_save, sender=ClubMembership)
 def notify_new_member(sender, instance, created, **kwargs):
-    """Отправляет уведомление о новом участнике клуба"""
+    """Ставит в очередь уведомление о новом участнике клуба"""
+    if created:
+        enqueue('clubs.notify_new_member', instance.pk, key=f'notify_new_member:{instance.pk}')
+
+
+@receiver(post_save, sender=Club)
+@receiver(post_delete, sender=Club)
+@receiver(post_save, sender=ClubMembership)
+@receiver(post_delete, sender=ClubMembership)
+def invalidate_clubs_cache(sender, **kwargs):
+    """Сбрасывает кеш страниц со списками клубов"""
+    bump('clubs')
+
+
+@receiver(post_save, sender=ClubMembership)
+@receiver(post_delete, sender=ClubMembership)
+def invalidate_member_roles(sender, instance, **kwargs):
+    """Сбрасывает кеш ролей участника"""
+    user = instance.user if ClubMembership.user.field.is_cached(instance) else None
+    roles.invalidate(instance.user_id, user)
+
+
+@receiver(post_save, sender=ClubMembership)
+def count_membership(sender, instance, created, **kwargs):
+    """Ведет UserProfile.clubs_count"""
+    if created:
+        profile_stats.adjust(instance.user_id, clubs_count=1)
+
+
+@receiver(post_delete, sender=ClubMembership)
+def discount_membership(sender, instance, **kwargs):
+    profile_stats.adjust(instance.user_id, clubs_count=-1)
+
+
+@receiver(post_save, sender=ReadingProgress)
+@receiver(post_delete, sender=ReadingProgress)
+def refresh_dashboard_progress(sender, instance, **kwargs):
+    """Обновляет запись участника в сводках клубов, читающих эту книгу"""
+    transaction.on_commit(lambda: dashboard.progress_changed(instance.user_id, [instance.book_id]))
+
+
+@receiver(post_save, sender=ClubMembership)
+def refresh_dashboard_members(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: dashboard.member_joined(instance))
+
+
+@receiver(post_delete, sender=ClubMembership)
+def remove_dashboard_member(sender, instance, **kwargs):
+    transaction.on_commit(lambda: dashboard.member_left(instance))
+
+
+@receiver(post_save, sender=ClubMembership)
+def publish_member_joined(sender, instance, created, **kwargs):
+    """Публикует вступление в ленту активности клуба"""
+    if created:
+        stream.member_joined(instance)
+
+
+@receiver(post_delete, sender=ClubMembership)
+def publish_member_left(sender, instance, **kwargs):
+    stream.member_left(instance)
+
+
+@receiver(post_init, sender=Club)
+def remember_book_state(sender, instance, **kwargs):
+    """Запоминает текущую книгу, чтобы публиковать только ее смену"""
+    instance._stream_book_state = stream.book_state(instance)
+
+
+@receiver(post_save, sender=Club)
+def publish_book_changed(sender, instance, created, **kwargs):
+    """Публикует смену текущей книги или дат чтения"""
+    previous = getattr(instance, '_stream_book_state', {})
+    current = stream.book_state(instance)
+    instance._stream_book_state = current
     if created:
-        # Уведомляем администраторов и модераторов клуба
-        admins_and_mods = ClubMembership.objects.filter(
-            club=instance.club,
-            role__in=['admin', 'moderator']
-        ).exclude(user=instance.user)
-        
-        for membership in admins_and_mods:
-            notify.send(
-                instance.user,
-                recipient=membership.user,
-                verb='присоединился к клубу',
-                action_object=instance,
-                target=instance.club,
-                description=f'{instance.user.username} присоединился к клубу "{instance.club.name}"'
-            )
+        return
+    if any(field in previous and previous[field] != value for field, value in current.items()):
+        stream.book_changed(instance)
+
+
+@job('clubs.notify_new_member')
+def send_new_member_notifications(membership_id):
+    """Отправляет уведомление о новом участнике клуба"""
+    membership = ClubMembership.objects.select_related('user', 'club').filter(pk=membership_id).first()
+    if membership is None:
+        return
+    
+    # Уведомляем администраторов и модераторов клуба
+    admins_and_mods = User.objects.filter(
+        club_memberships__club=membership.club,
+        club_memberships__role__in=['admin', 'moderator']
+    ).exclude(pk=membership.user_id)
+    
+    bulk_notify(
+        membership.user,
+        admins_and_mods,
+        verb='присоединился к клубу',
+        action_object=membership,
+        target=membership.club,
+        description=f'{membership.user.username} присоединился к клубу "{membership.club.name}"'
+    )
+
 
+@job('clubs.compute_reading_pace')
+def compute_reading_pace():
+    """Пересчитывает прогнозы темпа чтения во всех активных клубах"""
+    pace.compute()
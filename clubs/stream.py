@@ -0,0 +1,187 @@
+"""
+Лента активности клуба в реальном времени.
+
+События клуба (новый пост, вступление и выход участника, смена текущей
+книги) публикуются после фиксации транзакции в группу club_<id>. Каждое
+событие получает номер seq, растущий в пределах клуба; номера выдаются
+атомарным cache.incr в том же кеше, где хранятся события.
+
+Публикующий процесс сам кладет событие в тот же кеш (на CLUB_STREAM_TTL
+секунд), поэтому события сохраняются, даже если в этот момент у клуба нет
+ни одного подключенного клиента. Память ограничена двумя кольцами:
+
+- общее кольцо из CLUB_STREAM_GLOBAL_BUFFER_SIZE слотов хранит тексты
+  событий всех клубов, слот - общий номер события по модулю размера, так
+  что новое событие затирает самое старое;
+- кольцо клуба из CLUB_STREAM_BUFFER_SIZE слотов (seq по модулю размера)
+  хранит только номера слотов общего кольца.
+
+Переподключившийся клиент передает последний полученный seq и получает
+пропущенные события из кеша без запросов к базе. Если нужных событий в
+кольцах уже нет, клиент получает событие resync и перезагружает страницу.
+
+Несколько процессов (CHANNEL_LAYER=database или redis) требуют общего
+кеша: CACHE_BACKEND=redis (на file счетчик не атомарен между процессами).
+"""
+import json
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = getattr(settings, 'CLUB_STREAM_BUFFER_SIZE', 100)
+EVENT_MAX_BYTES = getattr(settings, 'CLUB_STREAM_EVENT_MAX_BYTES', 16 * 1024)
+TTL = getattr(settings, 'CLUB_STREAM_TTL', 3600)
+GLOBAL_BUFFER_SIZE = getattr(settings, 'CLUB_STREAM_GLOBAL_BUFFER_SIZE', 10000)
+GLOBAL_SEQ_KEY = 'club-stream-seq'
+
+EVENT_POST_CREATED = 'post_created'
+EVENT_MEMBER_JOINED = 'member_joined'
+EVENT_MEMBER_LEFT = 'member_left'
+EVENT_BOOK_CHANGED = 'book_changed'
+EVENT_RESYNC = 'resync'
+
+
+def group_name(club_id):
+    return f'club_{club_id}'
+
+
+def _seq_key(club_id):
+    return f'club-stream-seq:{club_id}'
+
+
+def _slot_key(club_id, seq):
+    return f'club-stream-slot:{club_id}:{seq % BUFFER_SIZE}'
+
+
+def _event_key(slot):
+    return f'club-stream-event:{slot}'
+
+
+def current_seq(club_id):
+    """Номер последнего опубликованного события клуба (None, если событий не было)"""
+    return cache.get(_seq_key(club_id))
+
+
+def next_seq(club_id):
+    """Следующий номер события клуба"""
+    return _incr(_seq_key(club_id))
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Счетчика нет (первое событие или вытеснение): начинаем со времени в мс,
+        # чтобы номера не пошли назад относительно уже выданных
+        cache.add(key, int(time.time() * 1000), None)
+        return cache.incr(key)
+
+
+def encode(seq, event, data):
+    return json.dumps({'seq': seq, 'event': event, 'data': data})
+
+
+def send(club_id, event, data):
+    """Нумерует событие, сохраняет его для досылки и отправляет в группу клуба"""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        seq = next_seq(club_id)
+        text = encode(seq, event, data)
+        # Слишком большое событие не сохраняется: переподключившийся клиент получит resync
+        if len(text) <= EVENT_MAX_BYTES:
+            store(club_id, seq, text)
+        async_to_sync(layer.group_send)(group_name(club_id), {
+            'type': 'club_event',
+            'seq': seq,
+            'text': text,
+        })
+    except Exception:
+        logger.exception('Не удалось отправить событие %s клуба %s', event, club_id)
+
+
+def store(club_id, seq, text):
+    """Кладет событие в общее кольцо и ссылку на него - в кольцо клуба"""
+    slot = _incr(GLOBAL_SEQ_KEY) % GLOBAL_BUFFER_SIZE
+    cache.set_many({
+        _event_key(slot): (int(club_id), seq, text),
+        _slot_key(club_id, seq): slot,
+    }, TTL)
+
+
+def publish(club_id, event, data):
+    """Отправляет событие после фиксации текущей транзакции"""
+    transaction.on_commit(lambda: send(club_id, event, data))
+
+
+def post_created(post):
+    publish(post.club_id, EVENT_POST_CREATED, {
+        'id': post.pk,
+        'title': post.title,
+        'author': post.author.username,
+        'url': post.get_absolute_url(),
+    })
+
+
+def member_joined(membership):
+    publish(membership.club_id, EVENT_MEMBER_JOINED, {
+        'user': membership.user.username,
+        'role': membership.role,
+    })
+
+
+def member_left(membership):
+    publish(membership.club_id, EVENT_MEMBER_LEFT, {'user_id': membership.user_id})
+
+
+BOOK_STATE_FIELDS = ('current_book_id', 'reading_start_date', 'reading_end_date')
+
+
+def book_state(club):
+    """Текущая книга и даты чтения; отложенные (defer) поля не читаются"""
+    return {field: club.__dict__[field] for field in BOOK_STATE_FIELDS if field in club.__dict__}
+
+
+def book_changed(club):
+    book = club.current_book
+    publish(club.pk, EVENT_BOOK_CHANGED, {
+        'book_id': book.pk if book else None,
+        'title': book.title if book else None,
+        'reading_start_date': str(club.reading_start_date) if club.reading_start_date else None,
+        'reading_end_date': str(club.reading_end_date) if club.reading_end_date else None,
+    })
+
+
+def since(club_id, seq):
+    """
+    События после seq из общего кеша и признак полноты.
+
+    Полнота не гарантирована, если после seq опубликовано больше
+    BUFFER_SIZE событий клуба, часть из них истекла, вытеснена или затерта
+    в общем кольце, или счетчик клуба сброшен.
+    """
+    current = current_seq(club_id)
+    if current is None or seq > current:
+        return [], False
+    if current == seq:
+        return [], True
+    if current - seq > BUFFER_SIZE:
+        return [], False
+    seqs = range(seq + 1, current + 1)
+    slots = cache.get_many([_slot_key(club_id, event_seq) for event_seq in seqs])
+    events = cache.get_many([_event_key(slot) for slot in set(slots.values())])
+    missed = []
+    for event_seq in seqs:
+        stored = events.get(_event_key(slots.get(_slot_key(club_id, event_seq))))
+        # Слот мог быть затерт событием другого клуба или более поздним событием этого
+        matches = stored is not None and tuple(stored[:2]) == (int(club_id), event_seq)
+        missed.append((event_seq, stored[2] if matches else None))
+    return missed, all(text is not None for _, text in missed)
@@ -12,5 +12,6 @@ urlpatterns = [
     path('clubs/<int:club_id>/leave/', views.leave_club, name='leave'),
     path('clubs/<int:club_id>/invite/', views.invite_member, name='invite'),
     path('clubs/<int:club_id>/set-book/', views.set_current_book, name='set_book'),
+    path('clubs/<int:club_id>/dashboard/', views.club_dashboard, name='dashboard'),
 ]
 
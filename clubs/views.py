@@ -5,9 +5,13 @@ from django.views.generic import ListView, DetailView, CreateView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import Q, Count
 from django.urls import reverse_lazy
-from .models import Club, ClubMembership, ClubInvitation
+from django.utils.decorators import method_decorator
+from .models import Club, ClubMembership, ClubInvitation, ReadingPace
 from .forms import ClubForm, ClubInvitationForm
-from books.models import Book, ReadingProgress
+from . import dashboard
+from books.models import Book, ReadingProgress, UserRecommendation
+from bookclubhub.pagination import CursorPaginationMixin
+from bookclubhub.cache import cache_page, cached, PAGE_TIMEOUT
 
 
 class HomeView(TemplateView):
@@ -17,23 +21,41 @@ class HomeView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Статистика для главной страницы
-        context['total_clubs'] = Club.objects.filter(is_private=False).count()
-        context['total_books'] = Book.objects.count()
-        context['recent_clubs'] = Club.objects.filter(is_private=False).order_by('-created_at')[:6]
+        context['total_clubs'] = cached('home-total-clubs', ['clubs'], Club.objects.filter(is_private=False).count)
+        context['total_books'] = cached('home-total-books', ['books'], Book.objects.count)
+        # Блок новых клубов кешируется в шаблоне, запрос выполняется только при промахе
+        context['cache_timeout'] = PAGE_TIMEOUT
+        context['recent_clubs'] = (
+            Club.objects.filter(is_private=False)
+            .select_related('current_book')
+            .with_member_count()
+            .order_by('-created_at')[:6]
+        )
         if self.request.user.is_authenticated:
-            context['user_clubs'] = Club.objects.filter(members=self.request.user)[:5]
+            context['user_clubs'] = (
+                Club.objects.filter(pk__in=ClubMembership.objects.filter(user=self.request.user).values('club'))
+                .select_related('current_book')
+                .with_member_count()
+                .order_by('-created_at')[:5]
+            )
+            context['recommended_books'] = [
+                recommendation.book
+                for recommendation in UserRecommendation.objects.filter(user=self.request.user).select_related('book')[:6]
+            ]
         return context
 
 
-class ClubListView(ListView):
+@method_decorator(cache_page(['clubs', 'books']), name='dispatch')
+class ClubListView(CursorPaginationMixin, ListView):
     """Список всех клубов"""
     model = Club
     template_name = 'clubs/list.html'
     context_object_name = 'clubs'
     paginate_by = 20
+    cursor_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
-        queryset = Club.objects.select_related('created_by', 'current_book').prefetch_related('members')
+        queryset = Club.objects.select_related('created_by', 'current_book').with_member_count()
         search_query = self.request.GET.get('search', '')
         is_private = self.request.GET.get('is_private', '')
         
@@ -52,7 +74,8 @@ class ClubListView(ListView):
         if not self.request.user.is_authenticated:
             queryset = queryset.filter(is_private=False)
         
-        return queryset.distinct()
+        # Фильтры не соединяют таблицы участников, поэтому distinct не нужен
+        return queryset
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -84,6 +107,11 @@ class ClubDetailView(DetailView):
                     user=user,
                     book=self.object.current_book
                 ).first()
+                context['user_pace'] = ReadingPace.objects.filter(
+                    club=self.object,
+                    user=user,
+                    book=self.object.current_book,
+                ).first()
         else:
             context['is_member'] = False
             context['user_role'] = None
@@ -226,3 +254,22 @@ def set_current_book(request, club_id):
     books = Book.objects.all().order_by('title')
     return render(request, 'clubs/set_book.html', {'club': club, 'books': books})
 
+
+@login_required
+def club_dashboard(request, club_id):
+    """Сводка прогресса участников по текущей книге"""
+    club = get_object_or_404(Club.objects.select_related('current_book'), pk=club_id)
+    
+    if not club.can_manage(request.user):
+        messages.error(request, 'Сводка прогресса доступна только администраторам и модераторам.')
+        return redirect('clubs:detail', pk=club.pk)
+    
+    if not club.current_book:
+        messages.info(request, 'У клуба нет текущей книги.')
+        return redirect('clubs:detail', pk=club.pk)
+    
+    return render(request, 'clubs/dashboard.html', {
+        'club': club,
+        'dashboard': dashboard.get_dashboard(club),
+    })
+
@@ -12,11 +12,11 @@ class PostTagAdmin(admin.ModelAdmin):
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('title', 'club', 'author', 'post_type', 'is_pinned', 'is_locked', 'created_at')
+    list_display = ('title', 'club', 'author', 'post_type', 'is_pinned', 'is_locked', 'likes_count', 'comments_count', 'created_at')
     list_filter = ('post_type', 'is_pinned', 'is_locked', 'created_at', 'club')
     search_fields = ('title', 'content', 'author__username', 'club__name')
     filter_horizontal = ('tags', 'likes')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('likes_count', 'comments_count', 'created_at', 'updated_at')
     date_hierarchy = 'created_at'
 
 
@@ -30,10 +30,6 @@ class CommentAdmin(MPTTModelAdmin):
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = 'Содержание'
-    
-    def likes_count(self, obj):
-        return obj.likes.count()
-    likes_count.short_description = 'Лайков'
 
 
 @admin.register(PostReport)
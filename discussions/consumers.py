@@ -3,46 +3,65 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 
+from .events import group_name
+from .models import Post
+
 User = get_user_model()
 
 
 class PostConsumer(AsyncWebsocketConsumer):
-    """WebSocket consumer для обновления постов в реальном времени"""
-    
+    """
+    WebSocket consumer для обновления постов в реальном времени.
+
+    Только доставляет события, опубликованные сервером (discussions.events);
+    сообщения клиентов не пересылаются в группу.
+    """
+
     async def connect(self):
         self.post_id = self.scope['url_route']['kwargs']['post_id']
-        self.room_group_name = f'post_{self.post_id}'
-        
+        if not await self.can_view():
+            await self.close()
+            return
+
+        self.room_group_name = group_name(self.post_id)
+
         # Присоединяемся к группе
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
-        
+
         await self.accept()
-    
+
     async def disconnect(self, close_code):
         # Покидаем группу
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
-    
-    async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
-        message_type = text_data_json.get('type')
-        
-        if message_type == 'new_comment':
-            # Отправляем новое сообщение в группу
-            await self.channel_layer.group_send(
+        if hasattr(self, 'room_group_name'):
+            await self.channel_layer.group_discard(
                 self.room_group_name,
-                {
-                    'type': 'comment_message',
-                    'message': text_data_json
-                }
+                self.channel_name
             )
-    
-    async def comment_message(self, event):
-        # Отправляем сообщение в WebSocket
-        await self.send(text_data=json.dumps(event['message']))
 
+    async def receive(self, text_data):
+        # Клиент может только проверить соединение
+        try:
+            message = json.loads(text_data)
+        except ValueError:
+            return
+        if isinstance(message, dict) and message.get('type') == 'ping':
+            await self.send(text_data=json.dumps({'event': 'pong'}))
+
+    async def post_event(self, event):
+        # Отправляем событие в WebSocket
+        await self.send(text_data=json.dumps({'event': event['event'], 'data': event['data']}))
+
+    @database_sync_to_async
+    def can_view(self):
+        """Пост существует, а приватный клуб доступен только участникам"""
+        try:
+            post = Post.objects.select_related('club').get(pk=int(self.post_id))
+        except (ValueError, Post.DoesNotExist):
+            return False
+        if not post.club.is_private:
+            return True
+        user = self.scope.get('user')
+        return user is not None and post.club.is_member(user)
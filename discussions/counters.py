@@ -0,0 +1,84 @@
+"""
+Денормализованные счетчики лайков и комментариев.
+
+Post.likes_count, Post.comments_count и Comment.likes_count обновляются
+атомарными UPDATE ... SET x = x + n из сигналов, чтобы списки постов и
+комментариев не выполняли COUNT(*) на каждую строку. recount() пересчитывает
+счетчики с нуля, если они разошлись с данными.
+"""
+from collections import Counter
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Post, Comment
+
+
+def apply_deltas(model, field, deltas):
+    """Применяет изменения счетчика {pk: delta} минимальным числом UPDATE"""
+    by_delta = {}
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(pk)
+    for delta, pks in by_delta.items():
+        model.objects.filter(pk__in=pks).update(**{field: F(field) + delta})
+
+
+def like_links(through, owner_field, instance, reverse, pk_set=None):
+    """Id объектов, которых касается изменение M2M likes (с повторами)"""
+    own, other = (owner_field, 'user_id') if not reverse else ('user_id', owner_field)
+    links = through.objects.filter(**{own: instance.pk})
+    if pk_set is not None:
+        links = links.filter(**{f'{other}__in': pk_set})
+    return list(links.values_list(owner_field, flat=True))
+
+
+def likes_changed(model, through, owner_field, instance, action, reverse, pk_set):
+    """
+    Обработчик m2m_changed для поля likes у Post и Comment.
+
+    Возвращает примененные изменения счетчика {pk: delta}.
+    """
+    pending = instance.__dict__.setdefault('_pending_like_removals', {})
+    deltas = {}
+    
+    if action in ('pre_remove', 'pre_clear'):
+        # До удаления запоминаем связи, которые действительно существуют
+        pending[through] = like_links(through, owner_field, instance, reverse, pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        removed = Counter(pending.pop(through, []))
+        deltas = {pk: -n for pk, n in removed.items()}
+    elif action == 'post_add' and pk_set:
+        # Для post_add Django передает только реально добавленные id
+        if reverse:
+            deltas = dict(Counter(pk_set))
+        else:
+            deltas = {instance.pk: len(pk_set)}
+    apply_deltas(model, 'likes_count', deltas)
+    return deltas
+
+
+def _count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount():
+    """Пересчитывает все счетчики; возвращает число обновленных постов и комментариев"""
+    posts = Post.objects.update(
+        likes_count=_count_subquery(Post.likes.through, 'post'),
+        comments_count=_count_subquery(Comment, 'post'),
+    )
+    comments = Comment.objects.update(
+        likes_count=_count_subquery(Comment.likes.through, 'comment'),
+    )
+    return posts, comments
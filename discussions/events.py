@@ -0,0 +1,131 @@
+"""
+События обсуждений в реальном времени.
+
+Сервер публикует в группу поста (post_<id>) только зафиксированные
+изменения: все публикации идут через transaction.on_commit, поэтому
+откатившиеся записи клиенты не видят. Клиенты ничего не пересылают друг
+другу, PostConsumer только доставляет события.
+
+Изменения лайков копятся по посту и отправляются одним сообщением раз в
+REALTIME_LIKES_DEBOUNCE секунд с актуальными значениями счетчиков, так что
+популярный пост не порождает сообщение на каждый клик.
+
+Формат сообщения клиенту: {"event": <тип>, "data": {...}}.
+"""
+import logging
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+LIKES_DEBOUNCE = getattr(settings, 'REALTIME_LIKES_DEBOUNCE', 0.1)
+
+EVENT_COMMENT_CREATED = 'comment_created'
+EVENT_COMMENT_DELETED = 'comment_deleted'
+EVENT_LIKES = 'likes'
+EVENT_POST_UPDATED = 'post_updated'
+
+POST_STATE_FIELDS = ('is_pinned', 'is_locked')
+
+
+def group_name(post_id):
+    return f'post_{post_id}'
+
+
+def send(post_id, event, data, coalesce=None):
+    """Отправляет событие в группу поста немедленно"""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    message = {'type': 'post_event', 'event': event, 'data': data}
+    if coalesce is not None:
+        message['coalesce'] = coalesce
+    try:
+        async_to_sync(layer.group_send)(group_name(post_id), message)
+    except Exception:
+        # Реальное время не должно ломать запись в базу
+        logger.exception('Не удалось отправить событие %s поста %s', event, post_id)
+
+
+def publish(post_id, event, data):
+    """Отправляет событие после фиксации текущей транзакции"""
+    transaction.on_commit(lambda: send(post_id, event, data))
+
+
+def comment_created(comment):
+    publish(comment.post_id, EVENT_COMMENT_CREATED, {
+        'id': comment.pk,
+        'parent_id': comment.parent_id,
+        'author': comment.author.username,
+        'content': comment.content,
+        'created_at': comment.created_at.isoformat(),
+    })
+
+
+def comment_deleted(comment):
+    publish(comment.post_id, EVENT_COMMENT_DELETED, {'id': comment.pk})
+
+
+def post_state(post):
+    """Закрепление и блокировка поста; отложенные (defer) поля не читаются"""
+    return {field: post.__dict__[field] for field in POST_STATE_FIELDS if field in post.__dict__}
+
+
+def post_updated(post, changed):
+    """changed - {поле: новое значение} для is_pinned/is_locked"""
+    publish(post.pk, EVENT_POST_UPDATED, dict(changed, id=post.pk))
+
+
+class LikeDebouncer:
+    """Копит изменения лайков по посту и отправляет их раз в interval секунд"""
+
+    def __init__(self, interval=LIKES_DEBOUNCE):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def add(self, post_id, post_delta=0, comment_deltas=None):
+        with self.lock:
+            entry = self.pending.get(post_id)
+            if entry is None:
+                entry = self.pending[post_id] = {'post': 0, 'comments': {}}
+                timer = threading.Timer(self.interval, self.flush, args=(post_id,))
+                timer.daemon = True
+                timer.start()
+            entry['post'] += post_delta
+            for comment_id, delta in (comment_deltas or {}).items():
+                entry['comments'][comment_id] = entry['comments'].get(comment_id, 0) + delta
+
+    def flush(self, post_id):
+        from .models import Post, Comment
+
+        with self.lock:
+            entry = self.pending.pop(post_id, None)
+        if entry is None:
+            return
+        try:
+            data = {'post_id': post_id, 'post_delta': entry['post']}
+            if entry['post']:
+                data['likes_count'] = Post.objects.filter(pk=post_id).values_list('likes_count', flat=True).first()
+            if entry['comments']:
+                counts = dict(Comment.objects.filter(pk__in=entry['comments']).values_list('pk', 'likes_count'))
+                data['comments'] = {
+                    str(comment_id): {'delta': delta, 'likes_count': counts.get(comment_id)}
+                    for comment_id, delta in entry['comments'].items()
+                }
+            send(post_id, EVENT_LIKES, data, coalesce=f'likes:{post_id}')
+        finally:
+            # Таймер выполняется в отдельном потоке со своим соединением
+            connections.close_all()
+
+
+debouncer = LikeDebouncer()
+
+
+def likes_changed(post_id, post_delta=0, comment_deltas=None):
+    """Регистрирует изменение лайков после фиксации транзакции"""
+    transaction.on_commit(lambda: debouncer.add(post_id, post_delta, comment_deltas))
@@ -1,4 +1,5 @@
 from django import forms
+from . import storage
 from .models import Post, Comment, PostReport
 
 
@@ -25,6 +26,12 @@ class CommentForm(forms.ModelForm):
             'content': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
             'parent': forms.HiddenInput(),
         }
+    
+    def clean_parent(self):
+        parent = self.cleaned_data.get('parent')
+        if parent is not None and parent.level >= storage.MAX_LEVEL:
+            raise forms.ValidationError('Ветка обсуждения слишком глубокая: ответьте на комментарий выше.')
+        return parent
 
 
 class PostReportForm(forms.ModelForm):
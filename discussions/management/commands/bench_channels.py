@@ -0,0 +1,192 @@
+"""
+Нагрузочный тест обновлений постов в реальном времени.
+
+Запускает несколько ASGI-воркеров (daphne), подключает к ним тысячи
+WebSocket-клиентов из нескольких процессов, после чего рассылает сообщения
+в группу поста через слой каналов и замеряет, сколько доставок дошло и с
+какой задержкой.
+
+Запуск:
+    CHANNEL_LAYER=database python manage.py bench_channels --workers 4 --clients 2000 --messages 50
+
+Сообщения отправляются из процесса команды, поэтому нужен межпроцессный
+слой (CHANNEL_LAYER=database или redis). Для тысяч соединений может понадобиться поднять ulimit -n.
+Требуется пакет websockets (requirements-dev.txt).
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from clubs.models import Club
+from discussions.events import group_name
+from discussions.models import Post
+
+User = get_user_model()
+
+
+def _raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def _run_clients(urls, count, ready, results, stop):
+    """Процесс с count клиентами; отчитывается о подключении и полученных задержках"""
+    import websockets
+
+    _raise_fd_limit()
+    latencies = []
+    connected = 0
+
+    async def client(url):
+        nonlocal connected
+        try:
+            async with websockets.connect(url, origin='http://localhost', open_timeout=60) as ws:
+                connected += 1
+                while True:
+                    raw = await ws.recv()
+                    data = json.loads(raw).get('data') or {}
+                    if 'sent_at' in data:
+                        latencies.append((time.time() - data['sent_at']) * 1000)
+        except (asyncio.CancelledError, websockets.ConnectionClosed, OSError):
+            pass
+
+    async def main():
+        tasks = [asyncio.ensure_future(client(urls[i % len(urls)])) for i in range(count)]
+        # Ждем подключений, затем сообщаем о готовности
+        deadline = time.monotonic() + 60
+        while connected < count and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        ready.put(connected)
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(main())
+    results.put(latencies)
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест WebSocket-обновлений постов на нескольких ASGI-воркерах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='ASGI-воркеров (процессов daphne)')
+        parser.add_argument('--clients', type=int, default=2000, help='WebSocket-клиентов всего')
+        parser.add_argument('--client-processes', type=int, default=4, help='Процессов с клиентами')
+        parser.add_argument('--messages', type=int, default=50, help='Сообщений в группу поста')
+        parser.add_argument('--rate', type=float, default=20, help='Сообщений в секунду')
+        parser.add_argument('--port', type=int, default=8700, help='Первый порт воркеров')
+        parser.add_argument('--settle', type=float, default=3, help='Ожидание доставки после отправки, сек')
+
+    def handle(self, *args, **options):
+        if getattr(settings, 'CHANNEL_LAYER', 'memory') == 'memory':
+            # Сообщения отправляются из этого процесса, а клиенты подключены к воркерам
+            raise CommandError('Нужен межпроцессный слой: CHANNEL_LAYER=database или redis')
+
+        author, _ = User.objects.get_or_create(username='bench_channels', defaults={'email': 'bench_channels@example.com'})
+        club = Club.objects.create(name='Бенчмарк каналов', description='-', created_by=author)
+        post = Post.objects.create(club=club, author=author, title='Бенчмарк каналов', content='-')
+        connections.close_all()
+
+        workers = []
+        try:
+            ports = [options['port'] + i for i in range(options['workers'])]
+            for port in ports:
+                workers.append(subprocess.Popen(
+                    [sys.executable, '-m', 'daphne', '-b', '127.0.0.1', '-p', str(port), 'bookclubhub.asgi:application'],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=os.environ.copy(),
+                ))
+            for port in ports:
+                self._wait_port(port)
+            self._run(post, ports, options)
+        finally:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.wait()
+            club.delete()
+
+    def _wait_port(self, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'Воркер на порту {port} не запустился')
+
+    def _run(self, post, ports, options):
+        urls = [f'ws://127.0.0.1:{port}/ws/discussions/post/{post.pk}/' for port in ports]
+        processes = options['client_processes']
+        per_process = [options['clients'] // processes + (1 if i < options['clients'] % processes else 0)
+                       for i in range(processes)]
+
+        ready = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        stop = multiprocessing.Event()
+        clients = [
+            multiprocessing.Process(target=_run_clients, args=(urls, count, ready, results, stop))
+            for count in per_process if count
+        ]
+        for process in clients:
+            process.start()
+
+        start = time.perf_counter()
+        connected = sum(ready.get() for _ in clients)
+        connect_s = time.perf_counter() - start
+        self.stdout.write(f'Подключено клиентов: {connected} из {options["clients"]} за {connect_s:.1f} с')
+
+        layer = get_channel_layer()
+        group = group_name(post.pk)
+        interval = 1 / options['rate'] if options['rate'] else 0
+        start = time.perf_counter()
+        for seq in range(options['messages']):
+            async_to_sync(layer.group_send)(group, {
+                'type': 'post_event',
+                'event': 'bench',
+                'data': {'seq': seq, 'sent_at': time.time()},
+            })
+            if interval:
+                time.sleep(interval)
+        if hasattr(layer, 'drain'):
+            layer.drain()
+        send_s = time.perf_counter() - start
+
+        time.sleep(options['settle'])
+        stop.set()
+        latencies = []
+        for _ in clients:
+            latencies.extend(results.get())
+        for process in clients:
+            process.join()
+
+        expected = connected * options['messages']
+        received = len(latencies)
+        latencies.sort()
+        self.stdout.write(f'Отправлено сообщений: {options["messages"]} за {send_s:.1f} с')
+        self.stdout.write(f'Доставок: {received} из {expected} ({received / expected * 100 if expected else 0:.1f}%)')
+        if latencies:
+            self.stdout.write(
+                f'Задержка, мс: p50 {statistics.median(latencies):.1f}, '
+                f'p95 {latencies[int(received * 0.95) - 1]:.1f}, '
+                f'p99 {latencies[int(received * 0.99) - 1]:.1f}, max {latencies[-1]:.1f}'
+            )
+        if hasattr(layer, 'stats'):
+            self.stdout.write(f'Слой каналов (отправитель): {dict(layer.stats)}')
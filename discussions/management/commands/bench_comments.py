@@ -0,0 +1,126 @@
+"""
+Бенчмарк параллельной записи комментариев в один пост для режимов
+хранения дерева mptt и path.
+
+N потоков-писателей (у каждого свое соединение с базой) добавляют ответы
+к случайным комментариям одной ветки обсуждения. После замера проверяется
+целостность дерева: в режиме mptt - что lft/rght каждого дерева образуют
+последовательность 1..2n, в режиме path - что путь каждого узла равен
+пути родителя плюс собственный сегмент.
+
+Запуск: python manage.py bench_comments --writers 1 4 16 --per-writer 50
+На SQLite запись сериализуется самой базой, показательные цифры дает PostgreSQL.
+Созданные данные удаляются после замера.
+"""
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections, OperationalError
+from django.test.utils import override_settings
+
+from clubs.models import Club
+from discussions import storage
+from discussions.models import Post, Comment
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает параллельную запись комментариев в режимах mptt и path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', nargs='+', type=int, default=[1, 4, 16],
+                            help='Количество параллельных писателей')
+        parser.add_argument('--per-writer', type=int, default=50,
+                            help='Комментариев на писателя')
+        parser.add_argument('--seed', type=int, default=200,
+                            help='Комментариев в посте до начала замера')
+        parser.add_argument('--modes', nargs='+', default=[storage.STORAGE_MPTT, storage.STORAGE_PATH],
+                            choices=[storage.STORAGE_MPTT, storage.STORAGE_PATH])
+
+    def handle(self, *args, **options):
+        author, _ = User.objects.get_or_create(username='bench_comments', defaults={'email': 'bench_comments@example.com'})
+        club = Club.objects.create(name='Бенчмарк комментариев', description='-', created_by=author)
+        try:
+            self.stdout.write(
+                f'{"режим":>6} {"писатели":>9} {"вставок":>8} {"ошибок":>7} {"в сек":>8} '
+                f'{"p50, мс":>8} {"p95, мс":>8} {"дерево":>7}'
+            )
+            for mode in options['modes']:
+                for writers in options['writers']:
+                    with override_settings(COMMENT_TREE_STORAGE=mode):
+                        row = self._measure(club, author, mode, writers, options['per_writer'], options['seed'])
+                    self.stdout.write(row)
+        finally:
+            club.delete()
+            author.delete()
+
+    def _measure(self, club, author, mode, writers, per_writer, seed):
+        post = Post.objects.create(club=club, author=author, title=f'Бенчмарк {mode} {writers}', content='-')
+        parents = [None]
+        for i in range(seed):
+            parent = random.choice(parents)
+            comment = Comment.objects.create(post=post, author=author, content=f'seed {i}',
+                                             parent_id=parent)
+            parents.append(comment.pk)
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def write(worker):
+            rng = random.Random(worker)
+            local = []
+            failed = 0
+            try:
+                for i in range(per_writer):
+                    parent_id = rng.choice(parents)
+                    parent = Comment.objects.get(pk=parent_id) if parent_id else None
+                    start = time.perf_counter()
+                    try:
+                        Comment.objects.create(post_id=post.pk, author_id=author.pk,
+                                               content=f'writer {worker} #{i}', parent=parent)
+                    except OperationalError:
+                        failed += 1
+                        continue
+                    local.append((time.perf_counter() - start) * 1000)
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(local)
+                errors.append(failed)
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(writers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        intact = self._check_tree(post, mode)
+        inserted = len(latencies)
+        latencies.sort()
+        p50 = statistics.median(latencies) if latencies else 0
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        rate = inserted / elapsed if elapsed else 0
+        return (
+            f'{mode:>6} {writers:>9} {inserted:>8} {sum(errors):>7} {rate:8.1f} '
+            f'{p50:8.1f} {p95:8.1f} {"ok" if intact else "BROKEN":>7}'
+        )
+
+    def _check_tree(self, post, mode):
+        comments = Comment.objects.filter(post=post)
+        if mode == storage.STORAGE_PATH:
+            rows = comments.values_list('pk', 'path', 'parent__path')
+            return all(path == (parent_path or '') + storage.encode(pk) for pk, path, parent_path in rows)
+
+        edges = defaultdict(list)
+        for tree_id, lft, rght in comments.values_list('tree_id', 'lft', 'rght'):
+            edges[tree_id].extend((lft, rght))
+        return all(sorted(values) == list(range(1, len(values) + 1)) for values in edges.values())
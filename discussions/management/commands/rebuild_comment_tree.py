@@ -0,0 +1,33 @@
+"""
+Перестраивает представление дерева комментариев при смене режима хранения.
+
+Запуск: python manage.py rebuild_comment_tree [--paths] [--mptt]
+Без флагов пересчитываются только пути.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from discussions.models import Comment
+from discussions.storage import rebuild_paths, rebuild_mptt
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает дерево комментариев (пути и/или поля MPTT) при смене COMMENT_TREE_STORAGE'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--paths', action='store_true', help='Пересчитать материализованные пути')
+        parser.add_argument('--mptt', action='store_true', help='Пересчитать lft/rght/tree_id (возврат в режим mptt)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        do_paths = options['paths'] or not options['mptt']
+        do_mptt = options['mptt']
+        
+        if do_mptt:
+            with transaction.atomic():
+                rebuild_mptt(Comment)
+            self.stdout.write(self.style.SUCCESS('Поля MPTT перестроены'))
+        if do_paths:
+            with transaction.atomic():
+                total = rebuild_paths(Comment, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Пути перестроены: {total} комментариев'))
@@ -0,0 +1,24 @@
+"""
+Перестраивает полнотекстовый индекс постов и комментариев.
+
+Запуск: python manage.py rebuild_discussion_index
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from discussions.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс обсуждений'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        start = time.perf_counter()
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс перестроен ({type(backend).__name__}) за {time.perf_counter() - start:.1f} с'
+        ))
@@ -0,0 +1,18 @@
+"""
+Пересчитывает денормализованные счетчики лайков и комментариев.
+
+Запуск: python manage.py recount
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from discussions.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает likes_count и comments_count у постов и комментариев'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            posts, comments = recount()
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано постов: {posts}, комментариев: {comments}'))
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE discussions_search ('
+            'kind varchar(10) NOT NULL, '
+            'object_id bigint NOT NULL, '
+            'post_id bigint NOT NULL, '
+            'club_id bigint NOT NULL, '
+            'title text NOT NULL, '
+            'content text NOT NULL, '
+            'document tsvector NOT NULL, '
+            'PRIMARY KEY (kind, object_id))'
+        )
+        schema_editor.execute('CREATE INDEX discussions_search_document_gin ON discussions_search USING GIN (document)')
+        schema_editor.execute('CREATE INDEX discussions_search_club ON discussions_search (club_id)')
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE discussions_search USING fts5('
+            'kind UNINDEXED, object_id UNINDEXED, post_id UNINDEXED, club_id UNINDEXED, '
+            "title, content, tokenize='unicode61 remove_diacritics 2')"
+        )
+    else:
+        return
+    
+    # Индексируем уже существующие посты и комментарии запросом к таблицам в
+    # том виде, в каком они есть на момент миграции (не через текущие модели)
+    posts = apps.get_model('discussions', 'Post')._meta.db_table
+    comments = apps.get_model('discussions', 'Comment')._meta.db_table
+    sources = [
+        f"SELECT 'post', p.id, p.id, p.club_id, p.title, p.content FROM {posts} p",
+        f"SELECT 'comment', c.id, c.post_id, p.club_id, '', c.content FROM {comments} c JOIN {posts} p ON p.id = c.post_id",
+    ]
+    for source in sources:
+        if vendor == 'postgresql':
+            cfg = getattr(settings, 'BOOK_SEARCH_CONFIG', 'simple')
+            schema_editor.execute(
+                'INSERT INTO discussions_search (kind, object_id, post_id, club_id, title, content, document) '
+                f"SELECT kind, object_id, post_id, club_id, title, content, "
+                f"setweight(to_tsvector('{cfg}', title), 'A') || setweight(to_tsvector('{cfg}', content), 'D') "
+                f'FROM ({source}) AS source (kind, object_id, post_id, club_id, title, content)'
+            )
+        else:
+            schema_editor.execute(
+                f'INSERT INTO discussions_search (kind, object_id, post_id, club_id, title, content) {source}'
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute('DROP TABLE IF EXISTS discussions_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('discussions', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
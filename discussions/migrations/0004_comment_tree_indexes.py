@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('discussions', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'level', 'tree_id'], name='comment_post_level_tree_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['tree_id', 'lft'], name='comment_tree_lft_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+# Копия кодировки discussions.storage на момент миграции
+SEGMENT_WIDTH = 7
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BATCH_SIZE = 1000
+
+
+def _encode(pk):
+    digits = []
+    while pk:
+        pk, rest = divmod(pk, 36)
+        digits.append(DIGITS[rest])
+    return ''.join(reversed(digits)).rjust(SEGMENT_WIDTH, '0')
+
+
+def fill_paths(apps, schema_editor):
+    """Строит материализованные пути по существующему дереву MPTT, уровень за уровнем"""
+    Comment = apps.get_model('discussions', 'Comment')
+    level = 0
+    while True:
+        rows = Comment.objects.filter(level=level).order_by('pk').values_list('pk', 'parent__path')
+        batch = [Comment(pk=pk, path=(parent_path or '') + _encode(pk)) for pk, parent_path in rows.iterator(chunk_size=BATCH_SIZE)]
+        if not batch:
+            return
+        Comment.objects.bulk_update(batch, ['path'], batch_size=BATCH_SIZE)
+        level += 1
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('discussions', '0004_comment_tree_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Путь'),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ),
+    ]
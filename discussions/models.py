@@ -1,11 +1,22 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from mptt.models import MPTTModel, TreeForeignKey
 
+from . import storage
+
 User = get_user_model()
 
+# Денормализованные счетчики: меняются только атомарными UPDATE (signals.py, counters.py)
+COUNTER_FIELDS = ('likes_count', 'comments_count')
+
+
+def _exclude_counters(instance, kwargs, field_names):
+    """Сохранение со старыми значениями счетчиков в памяти не должно их перезаписывать"""
+    if not instance._state.adding and kwargs.get('update_fields') is None:
+        kwargs['update_fields'] = [name for name in field_names if name not in COUNTER_FIELDS]
+
 
 class PostTag(models.Model):
     """Теги для постов"""
@@ -41,6 +52,9 @@ class Post(models.Model):
     is_pinned = models.BooleanField(default=False, verbose_name='Закреплен')
     is_locked = models.BooleanField(default=False, verbose_name='Закрыт')
     likes = models.ManyToManyField(User, blank=True, related_name='liked_posts', verbose_name='Лайки')
+    # Денормализованные счетчики, поддерживаются сигналами (см. discussions/signals.py)
+    likes_count = models.IntegerField(default=0, editable=False, verbose_name='Лайков')
+    comments_count = models.IntegerField(default=0, editable=False, verbose_name='Комментариев')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
     
@@ -58,13 +72,9 @@ class Post(models.Model):
     def get_absolute_url(self):
         return reverse('discussions:post_detail', kwargs={'pk': self.pk})
     
-    @property
-    def likes_count(self):
-        return self.likes.count()
-    
-    @property
-    def comments_count(self):
-        return self.comments.count()
+    def save(self, *args, **kwargs):
+        _exclude_counters(self, kwargs, [field.name for field in self._meta.concrete_fields if not field.primary_key])
+        super().save(*args, **kwargs)
 
 
 class Comment(MPTTModel):
@@ -74,6 +84,8 @@ class Comment(MPTTModel):
     content = models.TextField(verbose_name='Содержание')
     parent = TreeForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies', verbose_name='Родительский комментарий')
     likes = models.ManyToManyField(User, blank=True, related_name='liked_comments', verbose_name='Лайки')
+    likes_count = models.IntegerField(default=0, editable=False, verbose_name='Лайков')
+    path = models.CharField(max_length=storage.PATH_MAX_LENGTH, blank=True, default='', editable=False, verbose_name='Путь')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
     
@@ -84,13 +96,34 @@ class Comment(MPTTModel):
         verbose_name = _('Комментарий')
         verbose_name_plural = _('Комментарии')
         ordering = ['tree_id', 'lft']
+        indexes = [
+            # Страницы веток поста и диапазоны поддеревьев. Имена заданы явно:
+            # поля MPTT добавляются позже Meta
+            models.Index(fields=['post', 'level', 'tree_id'], name='comment_post_level_tree_idx'),
+            models.Index(fields=['tree_id', 'lft'], name='comment_tree_lft_idx'),
+            # То же для режима хранения path
+            models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ]
     
     def __str__(self):
         return f'Комментарий от {self.author.username} к посту "{self.post.title}"'
     
-    @property
-    def likes_count(self):
-        return self.likes.count()
+    def save(self, *args, **kwargs):
+        """
+        В режиме path новый комментарий вставляется без сдвига дерева MPTT.
+
+        INSERT и запись path выполняются в одной транзакции: комментарий
+        без пути не должен остаться в базе, если UPDATE не прошел.
+        """
+        adding = self._state.adding
+        # Поля дерева MPTT тоже не перезаписываются: их меняют вставки соседей
+        _exclude_counters(self, kwargs, self._get_user_field_names())
+        with transaction.atomic():
+            if adding and storage.is_path_mode():
+                storage.prepare_insert(self)
+            super().save(*args, **kwargs)
+            if adding:
+                storage.assign_path(self)
 
 
 class PostReport(models.Model):
@@ -0,0 +1,256 @@
+"""
+Полнотекстовый поиск по обсуждениям клуба (посты и комментарии).
+
+Каждый пост и комментарий - отдельный документ в таблице discussions_search
+(создается миграцией discussions.0003 под конкретную СУБД, как и индекс книг
+в books/search.py). Документы обновляются по одному из сигналов
+discussions/signals.py, полная пересборка нужна только после восстановления
+из резервной копии.
+
+Поиск всегда ограничен клубом и может фильтроваться по главе, тегу и типу
+поста. Результаты сортируются по релевантности и содержат фрагмент текста
+с подсвеченными совпадениями.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from books.search import tokenize
+from bookclubhub.facets import filter_m2m, MODE_AND, MODE_OR
+from .models import Post, Comment
+
+INDEX_TABLE = 'discussions_search'
+CHUNK_SIZE = 2000
+SEARCH_LIMIT = getattr(settings, 'DISCUSSION_SEARCH_LIMIT', 200)
+
+KIND_POST = 'post'
+KIND_COMMENT = 'comment'
+
+# Маркеры подсветки: заменяются на <mark> после экранирования HTML
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+SearchHit = namedtuple('SearchHit', ['post', 'comment', 'snippet', 'rank'])
+
+
+def highlight(snippet):
+    """Экранирует фрагмент и превращает маркеры в <mark>"""
+    return mark_safe(
+        escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+    )
+
+
+def _post_documents(post_ids=None):
+    queryset = Post.objects.order_by('pk')
+    if post_ids is not None:
+        queryset = queryset.filter(pk__in=list(post_ids))
+    for pk, club_id, title, content in queryset.values_list('pk', 'club_id', 'title', 'content').iterator(chunk_size=CHUNK_SIZE):
+        yield KIND_POST, pk, pk, club_id, title, content
+
+
+def _comment_documents(comment_ids=None):
+    queryset = Comment.objects.order_by('pk')
+    if comment_ids is not None:
+        queryset = queryset.filter(pk__in=list(comment_ids))
+    rows = queryset.values_list('pk', 'post_id', 'post__club_id', 'content').iterator(chunk_size=CHUNK_SIZE)
+    for pk, post_id, club_id, content in rows:
+        yield KIND_COMMENT, pk, post_id, club_id, '', content
+
+
+class BaseSearchBackend:
+    """Общий интерфейс поиска по обсуждениям"""
+    
+    def index_posts(self, post_ids):
+        self.remove(KIND_POST, post_ids)
+        self._insert(_post_documents(post_ids))
+    
+    def index_comments(self, comment_ids):
+        self.remove(KIND_COMMENT, comment_ids)
+        self._insert(_comment_documents(comment_ids))
+    
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {INDEX_TABLE}')
+        for documents in (_post_documents(), _comment_documents()):
+            batch = []
+            for document in documents:
+                batch.append(document)
+                if len(batch) >= CHUNK_SIZE:
+                    self._insert(batch)
+                    batch = []
+            self._insert(batch)
+    
+    def remove(self, kind, object_ids):
+        object_ids = list(object_ids)
+        if not object_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(object_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {INDEX_TABLE} WHERE kind = %s AND object_id IN ({placeholders})',
+                [kind] + object_ids,
+            )
+    
+    def search(self, club_id, query, post_type=None, tag_slugs=(), tag_mode=MODE_OR, chapter=None, limit=SEARCH_LIMIT):
+        """Список SearchHit по убыванию релевантности"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        
+        where = [f'{INDEX_TABLE}.club_id = %s']
+        params = [club_id]
+        if post_type:
+            where.append('p.post_type = %s')
+            params.append(post_type)
+        if chapter is not None:
+            where.append('p.chapter = %s')
+            params.append(chapter)
+        tag_slugs = [slug for slug in tag_slugs if slug]
+        if tag_mode == MODE_AND:
+            # Режим "все теги": отдельный EXISTS на каждый тег
+            tag_groups = [[slug] for slug in tag_slugs]
+        else:
+            tag_groups = [tag_slugs] if tag_slugs else []
+        for slugs in tag_groups:
+            placeholders = ', '.join(['%s'] * len(slugs))
+            where.append(
+                'EXISTS (SELECT 1 FROM discussions_post_tags pt '
+                'JOIN discussions_posttag t ON t.id = pt.posttag_id '
+                f'WHERE pt.post_id = p.id AND t.slug IN ({placeholders}))'
+            )
+            params.extend(slugs)
+        
+        with connection.cursor() as cursor:
+            cursor.execute(*self._search_sql(terms, where, params, limit))
+            rows = cursor.fetchall()
+        return self._hits(rows)
+    
+    def _hits(self, rows):
+        """Загружает посты и комментарии результатов двумя запросами"""
+        post_ids = {post_id for kind, object_id, post_id, rank, snippet in rows}
+        comment_ids = {object_id for kind, object_id, post_id, rank, snippet in rows if kind == KIND_COMMENT}
+        posts = Post.objects.select_related('author').prefetch_related('tags').in_bulk(post_ids)
+        comments = Comment.objects.select_related('author').in_bulk(comment_ids)
+        
+        hits = []
+        for kind, object_id, post_id, rank, snippet in rows:
+            post = posts.get(post_id)
+            if post is None:
+                continue
+            comment = comments.get(object_id) if kind == KIND_COMMENT else None
+            if kind == KIND_COMMENT and comment is None:
+                continue
+            hits.append(SearchHit(post, comment, highlight(snippet), rank))
+        return hits
+    
+    def _insert(self, documents):
+        raise NotImplementedError
+    
+    def _search_sql(self, terms, where, params, limit):
+        raise NotImplementedError
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """tsvector + GIN, подсветка ts_headline"""
+    
+    def __init__(self):
+        self.config = getattr(settings, 'BOOK_SEARCH_CONFIG', 'simple')
+    
+    def _insert(self, documents):
+        documents = list(documents)
+        if not documents:
+            return
+        cfg = self.config
+        with connection.cursor() as cursor:
+            for document in documents:
+                cursor.execute(
+                    f'INSERT INTO {INDEX_TABLE} (kind, object_id, post_id, club_id, title, content, document) '
+                    f"VALUES (%s, %s, %s, %s, %s, %s, "
+                    f"setweight(to_tsvector('{cfg}', %s), 'A') || setweight(to_tsvector('{cfg}', %s), 'D'))",
+                    document + (document[4], document[5]),
+                )
+    
+    def _search_sql(self, terms, where, params, limit):
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        options = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=10'
+        sql = (
+            f'SELECT {INDEX_TABLE}.kind, {INDEX_TABLE}.object_id, {INDEX_TABLE}.post_id, '
+            f'ts_rank_cd({INDEX_TABLE}.document, q) AS rank, '
+            f"ts_headline('{self.config}', {INDEX_TABLE}.title || ' ' || {INDEX_TABLE}.content, q, %s) "
+            f"FROM {INDEX_TABLE} JOIN discussions_post p ON p.id = {INDEX_TABLE}.post_id, "
+            f"to_tsquery('{self.config}', %s) q "
+            f'WHERE {INDEX_TABLE}.document @@ q AND ' + ' AND '.join(where) +
+            ' ORDER BY rank DESC LIMIT %s'
+        )
+        return sql, [options, tsquery] + params + [limit]
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5, подсветка snippet()"""
+    
+    def _insert(self, documents):
+        documents = list(documents)
+        if not documents:
+            return
+        with connection.cursor() as cursor:
+            for row in documents:
+                cursor.execute(
+                    f'INSERT INTO {INDEX_TABLE} (kind, object_id, post_id, club_id, title, content) '
+                    'VALUES (%s, %s, %s, %s, %s, %s)',
+                    row,
+                )
+    
+    def _search_sql(self, terms, where, params, limit):
+        match = ' '.join(f'"{term}"*' for term in terms)
+        sql = (
+            f'SELECT {INDEX_TABLE}.kind, {INDEX_TABLE}.object_id, {INDEX_TABLE}.post_id, '
+            f'-bm25({INDEX_TABLE}, 0, 0, 0, 0, 5.0, 1.0) AS rank, '
+            f"snippet({INDEX_TABLE}, -1, %s, %s, '…', 24) "
+            f'FROM {INDEX_TABLE} JOIN discussions_post p ON p.id = {INDEX_TABLE}.post_id '
+            f'WHERE {INDEX_TABLE} MATCH %s AND ' + ' AND '.join(where) +
+            ' ORDER BY rank DESC LIMIT %s'
+        )
+        return sql, [MARK_START, MARK_END, match] + params + [limit]
+
+
+class FallbackSearchBackend(BaseSearchBackend):
+    """Поиск через icontains по постам для СУБД без полнотекстового индекса"""
+    
+    def index_posts(self, post_ids):
+        pass
+    
+    def index_comments(self, comment_ids):
+        pass
+    
+    def rebuild(self):
+        pass
+    
+    def remove(self, kind, object_ids):
+        pass
+    
+    def search(self, club_id, query, post_type=None, tag_slugs=(), tag_mode=MODE_OR, chapter=None, limit=SEARCH_LIMIT):
+        posts = Post.objects.filter(club_id=club_id).filter(
+            Q(title__icontains=query) | Q(content__icontains=query)
+        ).select_related('author').prefetch_related('tags')
+        if post_type:
+            posts = posts.filter(post_type=post_type)
+        if chapter is not None:
+            posts = posts.filter(chapter=chapter)
+        posts = filter_m2m(posts, 'tags', tag_slugs, mode=tag_mode)
+        return [SearchHit(post, None, highlight(Truncator(post.content).words(30)), 0.0) for post in posts[:limit]]
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_backend():
+    """Бэкенд поиска для текущей СУБД"""
+    return BACKENDS.get(connection.vendor, FallbackSearchBackend)()
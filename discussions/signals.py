@@ -1,52 +1,210 @@
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from notifications.signals import notify
+from notifications_custom.fanout import bulk_notify
+from jobs.queue import job, enqueue
+from bookclubhub.cache import bump
+from clubs import stream as club_stream
 from .models import Post, Comment
+from .counters import likes_changed
+from . import events
+from .search import get_backend as get_search_backend, KIND_POST, KIND_COMMENT
 
 User = get_user_model()
 
 
 @receiver(post_save, sender=Post)
 def notify_new_post(sender, instance, created, **kwargs):
-    """Отправляет уведомление участникам клуба о новом посте"""
+    """Ставит в очередь уведомление участников клуба о новом посте"""
     if created:
-        # Уведомляем всех участников клуба, кроме автора
-        members = instance.club.members.exclude(pk=instance.author.pk)
-        for member in members:
-            notify.send(
-                instance.author,
-                recipient=member,
-                verb='создал новый пост',
-                action_object=instance,
-                target=instance.club,
-                description=f'Новый пост в клубе "{instance.club.name}": {instance.title}'
-            )
+        enqueue('discussions.notify_new_post', instance.pk, key=f'notify_new_post:{instance.pk}')
 
 
 @receiver(post_save, sender=Comment)
 def notify_new_comment(sender, instance, created, **kwargs):
-    """Отправляет уведомление автору поста о новом комментарии"""
+    """Ставит в очередь уведомление о новом комментарии"""
     if created:
-        # Уведомляем автора поста, если это не его комментарий
-        if instance.post.author != instance.author:
-            notify.send(
-                instance.author,
-                recipient=instance.post.author,
-                verb='оставил комментарий',
-                action_object=instance,
-                target=instance.post,
-                description=f'Новый комментарий к посту "{instance.post.title}"'
-            )
-        
-        # Уведомляем автора родительского комментария, если есть ответ
-        if instance.parent and instance.parent.author != instance.author:
-            notify.send(
-                instance.author,
-                recipient=instance.parent.author,
-                verb='ответил на ваш комментарий',
-                action_object=instance,
-                target=instance.post,
-                description=f'Ответ на ваш комментарий к посту "{instance.post.title}"'
-            )
+        enqueue('discussions.notify_new_comment', instance.pk, key=f'notify_new_comment:{instance.pk}')
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    """Обновляет документ поста в поисковом индексе обсуждений"""
+    if update_fields is not None and not {'title', 'content'} & set(update_fields):
+        return
+    get_search_backend().index_posts([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, update_fields=None, **kwargs):
+    """Обновляет документ комментария в поисковом индексе обсуждений"""
+    if update_fields is not None and 'content' not in update_fields:
+        return
+    get_search_backend().index_comments([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    """Удаляет пост из поискового индекса обсуждений"""
+    get_search_backend().remove(KIND_POST, [instance.pk])
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    """Удаляет комментарий из поискового индекса обсуждений"""
+    get_search_backend().remove(KIND_COMMENT, [instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_count(sender, instance, created, **kwargs):
+    """Увеличивает счетчик комментариев поста"""
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(comments_count=F('comments_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(sender, instance, **kwargs):
+    """Уменьшает счетчик комментариев поста (в том числе при каскадном удалении ответов)"""
+    Post.objects.filter(pk=instance.post_id).update(comments_count=F('comments_count') - 1)
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def update_post_likes_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """Поддерживает Post.likes_count"""
+    deltas = likes_changed(Post, sender, 'post_id', instance, action, reverse, pk_set)
+    for post_id, delta in deltas.items():
+        if delta:
+            events.likes_changed(post_id, post_delta=delta)
+
+
+@receiver(m2m_changed, sender=Comment.likes.through)
+def update_comment_likes_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """Поддерживает Comment.likes_count"""
+    deltas = {pk: delta for pk, delta in likes_changed(Comment, sender, 'comment_id', instance, action, reverse, pk_set).items() if delta}
+    if not deltas:
+        return
+    if not reverse:
+        events.likes_changed(instance.post_id, comment_deltas=deltas)
+        return
+    by_post = {}
+    for comment_id, post_id in Comment.objects.filter(pk__in=deltas).values_list('pk', 'post_id'):
+        by_post.setdefault(post_id, {})[comment_id] = deltas[comment_id]
+    for post_id, comment_deltas in by_post.items():
+        events.likes_changed(post_id, comment_deltas=comment_deltas)
+
+
+@receiver(post_init, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    """Запоминает закрепление и блокировку, чтобы публиковать только их изменения"""
+    instance._realtime_state = events.post_state(instance)
+
+
+@receiver(post_save, sender=Post)
+def publish_post_updated(sender, instance, created, **kwargs):
+    """Публикует закрепление/блокировку поста"""
+    previous = getattr(instance, '_realtime_state', {})
+    current = events.post_state(instance)
+    instance._realtime_state = current
+    if created:
+        return
+    changed = {field: value for field, value in current.items() if field in previous and previous[field] != value}
+    if changed:
+        events.post_updated(instance, changed)
+
+
+@receiver(post_save, sender=Post)
+def publish_post_created(sender, instance, created, **kwargs):
+    """Публикует новый пост в ленту активности клуба"""
+    if created:
+        club_stream.post_created(instance)
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment_created(sender, instance, created, **kwargs):
+    """Публикует новый комментарий участникам, открывшим пост"""
+    if created:
+        events.comment_created(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def publish_comment_deleted(sender, instance, **kwargs):
+    events.comment_deleted(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_posts_cache(sender, instance, **kwargs):
+    """Сбрасывает кеш списка постов клуба"""
+    bump(f'posts:{instance.club_id}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_posts_cache_on_comment(sender, instance, **kwargs):
+    """Счетчик комментариев показывается в списке постов"""
+    club_id = Post.objects.filter(pk=instance.post_id).values_list('club_id', flat=True).first()
+    if club_id is not None:
+        bump(f'posts:{club_id}')
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def invalidate_posts_cache_on_like(sender, instance, action, reverse, pk_set, **kwargs):
+    """Счетчик лайков показывается в списке постов"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bump(f'posts:{instance.club_id}')
+    else:
+        club_ids = Post.objects.filter(pk__in=pk_set or ()).values_list('club_id', flat=True).distinct()
+        bump(*[f'posts:{club_id}' for club_id in club_ids])
+
+
+@job('discussions.notify_new_post')
+def send_new_post_notifications(post_id):
+    """Отправляет уведомление участникам клуба о новом посте"""
+    post = Post.objects.select_related('author', 'club').filter(pk=post_id).first()
+    if post is None:
+        return
+    
+    # Уведомляем всех участников клуба, кроме автора
+    members = post.club.members.exclude(pk=post.author_id)
+    bulk_notify(
+        post.author,
+        members,
+        verb='создал новый пост',
+        action_object=post,
+        target=post.club,
+        description=f'Новый пост в клубе "{post.club.name}": {post.title}'
+    )
+
 
+@job('discussions.notify_new_comment')
+def send_new_comment_notifications(comment_id):
+    """Отправляет уведомление автору поста и автору родительского комментария"""
+    comment = Comment.objects.select_related('author', 'post__author', 'parent__author').filter(pk=comment_id).first()
+    if comment is None:
+        return
+    
+    # Уведомляем автора поста, если это не его комментарий
+    if comment.post.author != comment.author:
+        notify.send(
+            comment.author,
+            recipient=comment.post.author,
+            verb='оставил комментарий',
+            action_object=comment,
+            target=comment.post,
+            description=f'Новый комментарий к посту "{comment.post.title}"'
+        )
+    
+    # Уведомляем автора родительского комментария, если есть ответ
+    if comment.parent and comment.parent.author != comment.author:
+        notify.send(
+            comment.author,
+            recipient=comment.parent.author,
+            verb='ответил на ваш комментарий',
+            action_object=comment,
+            target=comment.post,
+            description=f'Ответ на ваш комментарий к посту "{comment.post.title}"'
+        )
@@ -0,0 +1,113 @@
+"""
+Режимы хранения дерева комментариев.
+
+mptt - стандартный режим django-mptt: вставка ответа сдвигает lft/rght
+предков и соседей справа, поэтому параллельные комментарии к одному
+горячему посту конкурируют за одни и те же строки.
+
+path - материализованный путь: у каждого комментария поле path из
+id предков и собственного id в base36 фиксированной ширины. Вставка
+ответа - это INSERT и UPDATE собственной строки, остальные строки не
+трогаются. Поля MPTT у таких комментариев заполняются заглушками
+(tree_id = 0, lft = 1, rght = 2), level остается верным. Обратный переход
+в режим mptt требует `rebuild_comment_tree --mptt`.
+
+Поле path поддерживается в обоих режимах, поэтому переключение в режим
+path не требует перестроения.
+"""
+from django.conf import settings
+
+STORAGE_MPTT = 'mptt'
+STORAGE_PATH = 'path'
+
+SEGMENT_WIDTH = 7  # 36**7 ~ 7.8e10 id на уровень
+PATH_MAX_LENGTH = 255  # до 36 уровней вложенности
+# Наибольший level комментария: глубже path не помещается в поле (в обоих режимах)
+MAX_LEVEL = PATH_MAX_LENGTH // SEGMENT_WIDTH - 1
+PATH_END = '~'  # больше любого символа base36, закрывает диапазон поддерева
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def get_storage():
+    """Текущий режим; читается при каждом вызове, чтобы его можно было переключить в бенчмарке"""
+    return getattr(settings, 'COMMENT_TREE_STORAGE', STORAGE_MPTT)
+
+
+def is_path_mode():
+    return get_storage() == STORAGE_PATH
+
+
+def encode(pk):
+    """Сегмент пути: id в base36, дополненный нулями слева"""
+    digits = []
+    while pk:
+        pk, rest = divmod(pk, 36)
+        digits.append(DIGITS[rest])
+    return ''.join(reversed(digits)).rjust(SEGMENT_WIDTH, '0')
+
+
+def prefix_length(level):
+    """Длина пути узла уровня level"""
+    return (level + 1) * SEGMENT_WIDTH
+
+
+def subtree_range(path):
+    """Границы path для потомков узла: path < x < path + PATH_END"""
+    return path, path + PATH_END
+
+
+def prepare_insert(comment):
+    """
+    Заполняет поля MPTT заглушками до вставки в режиме path.
+
+    Если lft и rght заданы, MPTTModel.save() считает узел уже размещенным
+    и не сдвигает дерево.
+    """
+    parent = comment.parent
+    comment.level = parent.level + 1 if parent is not None else 0
+    comment.tree_id = 0
+    comment.lft = 1
+    comment.rght = 2
+
+
+def assign_path(comment):
+    """Записывает path только что вставленного комментария"""
+    parent = comment.parent
+    prefix = parent.path if parent is not None else ''
+    comment.path = prefix + encode(comment.pk)
+    type(comment).objects.filter(pk=comment.pk).update(path=comment.path)
+
+
+def rebuild_paths(model, batch_size=1000):
+    """
+    Пересчитывает path всех комментариев по связи parent.
+
+    Уровни обрабатываются по очереди, так что путь родителя к моменту
+    обработки ребенка уже записан. Работает и с данными MPTT, и с
+    комментариями, созданными в режиме path. Возвращает число узлов.
+    """
+    total = 0
+    level = 0
+    while True:
+        rows = model.objects.filter(level=level).order_by('pk').values_list('pk', 'parent__path').iterator(chunk_size=batch_size)
+        batch = []
+        found = False
+        for pk, parent_path in rows:
+            found = True
+            batch.append(model(pk=pk, path=(parent_path or '') + encode(pk)))
+            if len(batch) >= batch_size:
+                model.objects.bulk_update(batch, ['path'])
+                total += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['path'])
+            total += len(batch)
+        if not found:
+            return total
+        level += 1
+
+
+def rebuild_mptt(model):
+    """Пересчитывает lft/rght/tree_id для возврата в режим mptt"""
+    model.objects.rebuild()
@@ -0,0 +1,171 @@
+"""
+Постраничная загрузка дерева комментариев.
+
+Каждая ветка (корневой комментарий с ответами) в MPTT - отдельное дерево
+со своим tree_id, поэтому страница веток - это диапазон tree_id, а
+поддерево комментария - диапазон lft/rght внутри одного tree_id. Глубина
+ограничивается по level; у узлов на границе глубины число скрытых ответов
+считается по (rght - lft - 1) / 2 без дополнительных запросов.
+
+В режиме хранения path (см. storage) ветки нумеруются id корня, поддерево -
+это диапазон path, а скрытые ответы считаются одним запросом с группировкой
+по префиксу пути.
+
+На фрагмент выполняется постоянное число запросов: корни, узлы с авторами,
+лайки текущего пользователя и (в режиме path) счетчик скрытых ответов.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import Substr
+
+from . import storage
+from .models import Comment
+
+THREADS_PER_PAGE = getattr(settings, 'COMMENT_THREADS_PER_PAGE', 20)
+MAX_DEPTH = getattr(settings, 'COMMENT_TREE_DEPTH', 3)
+
+ThreadPage = namedtuple('ThreadPage', ['threads', 'next_after'])
+
+
+def _attach(nodes, post, user, depth_limit, hidden=None):
+    """
+    Собирает список узлов (в порядке обхода дерева) в дерево.
+
+    Каждому узлу добавляются children, hidden_replies (ответы глубже
+    depth_limit) и is_liked, а пост подставляется без запроса.
+    hidden - {path: число скрытых ответов} для режима path; без него
+    число считается по lft/rght. Возвращает узлы верхнего уровня.
+    """
+    liked = set()
+    if user is not None and user.is_authenticated and nodes:
+        liked = set(
+            Comment.likes.through.objects
+            .filter(user_id=user.pk, comment_id__in=[node.pk for node in nodes])
+            .values_list('comment_id', flat=True)
+        )
+
+    by_id = {}
+    top = []
+    for node in nodes:
+        node.post = post
+        node.children = []
+        node.is_liked = node.pk in liked
+        if node.level < depth_limit:
+            node.hidden_replies = 0
+        elif hidden is not None:
+            node.hidden_replies = hidden.get(node.path, 0)
+        else:
+            node.hidden_replies = (node.rght - node.lft - 1) // 2
+        by_id[node.pk] = node
+        parent = by_id.get(node.parent_id)
+        if parent is None:
+            top.append(node)
+        else:
+            parent.children.append(node)
+    return top
+
+
+def _nodes():
+    return Comment.objects.select_related('author')
+
+
+def _hidden_counts(post_id, low, high, depth_limit):
+    """Число ответов глубже depth_limit в диапазоне путей, по предкам уровня depth_limit"""
+    rows = (
+        Comment.objects
+        .filter(post_id=post_id, level__gt=depth_limit, path__gte=low, path__lt=high)
+        .annotate(prefix=Substr('path', 1, storage.prefix_length(depth_limit)))
+        .order_by()
+        .values('prefix')
+        .annotate(total=Count('pk'))
+        .values_list('prefix', 'total')
+    )
+    return dict(rows)
+
+
+def _load_threads_by_path(post, user, after, limit, depth):
+    roots = Comment.objects.filter(post=post, level=0)
+    if after is not None:
+        roots = roots.filter(pk__gt=after)
+    root_ids = list(roots.order_by('pk').values_list('pk', flat=True)[:limit + 1])
+
+    next_after = None
+    if len(root_ids) > limit:
+        root_ids = root_ids[:limit]
+        next_after = root_ids[-1]
+
+    if not root_ids:
+        return ThreadPage([], None)
+
+    # Пути корней упорядочены так же, как id, поэтому ветки страницы - один диапазон
+    low = storage.encode(root_ids[0])
+    high = storage.encode(root_ids[-1]) + storage.PATH_END
+    nodes = list(
+        _nodes()
+        .filter(post=post, level__lte=depth, path__gte=low, path__lt=high)
+        .order_by('path')
+    )
+    hidden = _hidden_counts(post.pk, low, high, depth)
+    return ThreadPage(_attach(nodes, post, user, depth, hidden), next_after)
+
+
+def load_threads(post, user=None, after=None, limit=THREADS_PER_PAGE, depth=MAX_DEPTH):
+    """
+    Страница веток обсуждения поста.
+
+    after - tree_id (в режиме path - id) последней показанной ветки,
+    depth - сколько уровней ответов загружать под корнем.
+    """
+    if storage.is_path_mode():
+        return _load_threads_by_path(post, user, after, limit, depth)
+
+    roots = Comment.objects.filter(post=post, level=0)
+    if after is not None:
+        roots = roots.filter(tree_id__gt=after)
+    tree_ids = list(roots.order_by('tree_id').values_list('tree_id', flat=True)[:limit + 1])
+
+    next_after = None
+    if len(tree_ids) > limit:
+        tree_ids = tree_ids[:limit]
+        next_after = tree_ids[-1]
+
+    if not tree_ids:
+        return ThreadPage([], None)
+
+    nodes = list(_nodes().filter(tree_id__in=tree_ids, level__lte=depth).order_by('tree_id', 'lft'))
+    return ThreadPage(_attach(nodes, post, user, depth), next_after)
+
+
+def load_replies(comment, user=None, depth=MAX_DEPTH):
+    """
+    Ответы на комментарий до глубины depth относительно него.
+
+    Выборка ограничена диапазоном lft/rght (или path) комментария, поэтому
+    ее стоимость зависит только от размера поддерева.
+    """
+    depth_limit = comment.level + depth
+    if storage.is_path_mode():
+        low, high = storage.subtree_range(comment.path)
+        nodes = list(
+            _nodes()
+            .filter(post_id=comment.post_id, path__gt=low, path__lt=high, level__lte=depth_limit)
+            .order_by('path')
+        )
+        hidden = _hidden_counts(comment.post_id, low, high, depth_limit)
+        return _attach(nodes, comment.post, user, depth_limit, hidden)
+
+    if comment.is_leaf_node():
+        return []
+    nodes = list(
+        _nodes()
+        .filter(
+            tree_id=comment.tree_id,
+            lft__gt=comment.lft,
+            rght__lt=comment.rght,
+            level__lte=depth_limit,
+        )
+        .order_by('lft')
+    )
+    return _attach(nodes, comment.post, user, depth_limit)
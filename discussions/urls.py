@@ -8,6 +8,8 @@ urlpatterns = [
     path('post/<int:pk>/', views.PostDetailView.as_view(), name='post_detail'),
     path('club/<int:club_id>/create/', views.create_post, name='create_post'),
     path('post/<int:post_id>/comment/', views.add_comment, name='add_comment'),
+    path('post/<int:post_id>/comments/', views.comment_threads, name='comment_threads'),
+    path('comment/<int:pk>/replies/', views.comment_replies, name='comment_replies'),
     path('post/<int:post_id>/like/', views.toggle_like_post, name='toggle_like'),
     path('post/<int:post_id>/report/', views.report_post, name='report_post'),
 ]
@@ -4,53 +4,94 @@ from django.contrib import messages
 from django.views.generic import ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import JsonResponse
-from django.db.models import Q
+from django.utils.decorators import method_decorator
 from .models import Post, Comment, PostTag, PostReport
 from .forms import PostForm, CommentForm, PostReportForm
+from .search import get_backend as get_search_backend
+from . import tree
 from clubs.models import Club
+from bookclubhub.pagination import CursorPaginationMixin
+from bookclubhub.cache import cache_page
+from bookclubhub.facets import filter_m2m, facet_counts, MODE_AND, MODE_OR
 
 
-class PostListView(ListView):
+def post_list_namespaces(request, club_id, **kwargs):
+    return [f'posts:{club_id}', 'clubs']
+
+
+@method_decorator(cache_page(post_list_namespaces), name='dispatch')
+class PostListView(CursorPaginationMixin, ListView):
     """Список постов клуба"""
     model = Post
     template_name = 'discussions/post_list.html'
     context_object_name = 'posts'
     paginate_by = 20
+    cursor_ordering = ('-is_pinned', '-created_at', '-id')
     
     def get_queryset(self):
-        club_id = self.kwargs.get('club_id')
-        club = get_object_or_404(Club, pk=club_id)
+        self.club = get_object_or_404(Club, pk=self.kwargs.get('club_id'))
         
-        queryset = Post.objects.filter(club=club).select_related('author', 'club').prefetch_related('tags', 'likes')
+        queryset = Post.objects.filter(club=self.club).select_related('author', 'club').prefetch_related('tags')
         
         # Фильтры
         post_type = self.request.GET.get('type', '')
-        tag_slug = self.request.GET.get('tag', '')
+        tag_slugs = self.get_selected_tags()
+        tag_mode = self.get_tag_mode()
+        chapter = self.get_chapter()
         search_query = self.request.GET.get('search', '')
         
+        if search_query:
+            hits = get_search_backend().search(
+                self.club.pk, search_query, post_type=post_type, tag_slugs=tag_slugs, tag_mode=tag_mode, chapter=chapter
+            )
+            return self.group_hits(hits)
+        
         if post_type:
             queryset = queryset.filter(post_type=post_type)
         
-        if tag_slug:
-            queryset = queryset.filter(tags__slug=tag_slug)
+        if chapter is not None:
+            queryset = queryset.filter(chapter=chapter)
         
-        if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(content__icontains=search_query)
-            )
+        # Фасет считается до фильтра по тегам: счетчики показывают, сколько постов даст выбор тега
+        self.tag_counts = facet_counts(queryset, 'tags')
         
-        return queryset.distinct()
+        return filter_m2m(queryset, 'tags', tag_slugs, mode=tag_mode)
+    
+    def get_selected_tags(self):
+        return [slug for slug in self.request.GET.getlist('tag') if slug]
+    
+    def get_tag_mode(self):
+        return MODE_AND if self.request.GET.get('tag_mode') == MODE_AND else MODE_OR
+    
+    def get_chapter(self):
+        chapter = self.request.GET.get('chapter', '')
+        return int(chapter) if chapter.isdigit() else None
+    
+    @staticmethod
+    def group_hits(hits):
+        """Один пост на результат: с фрагментом лучшего совпадения (в посте или комментарии)"""
+        posts = {}
+        for hit in hits:
+            if hit.post.pk not in posts:
+                hit.post.search_snippet = hit.snippet
+                hit.post.search_comment = hit.comment
+                posts[hit.post.pk] = hit.post
+        return list(posts.values())
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        club_id = self.kwargs.get('club_id')
-        club = get_object_or_404(Club, pk=club_id)
+        club = self.club
         context['club'] = club
-        context['tags'] = PostTag.objects.all()
+        tags = list(PostTag.objects.all())
+        tag_counts = getattr(self, 'tag_counts', None)
+        for tag in tags:
+            tag.facet_count = tag_counts.get(tag.slug, 0) if tag_counts is not None else None
+        context['tags'] = tags
         context['post_types'] = Post.POST_TYPE_CHOICES
         context['selected_type'] = self.request.GET.get('type', '')
-        context['selected_tag'] = self.request.GET.get('tag', '')
+        context['selected_tags'] = self.get_selected_tags()
+        context['tag_mode'] = self.get_tag_mode()
+        context['selected_chapter'] = self.get_chapter()
         context['search_query'] = self.request.GET.get('search', '')
         
         # Проверка прав
@@ -70,9 +111,15 @@ class PostDetailView(DetailView):
     template_name = 'discussions/post_detail.html'
     context_object_name = 'post'
     
+    def get_queryset(self):
+        return Post.objects.select_related('author', 'club').prefetch_related('tags')
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['comments'] = Comment.objects.filter(post=self.object).select_related('author')
+        # Первая страница веток; остальное догружается comment_threads/comment_replies
+        page = tree.load_threads(self.object, self.request.user)
+        context['comment_threads'] = page.threads
+        context['next_threads_after'] = page.next_after
         context['comment_form'] = CommentForm()
         
         if self.request.user.is_authenticated:
@@ -134,6 +181,30 @@ def add_comment(request, post_id):
     return render(request, 'discussions/add_comment.html', {'form': form, 'post': post})
 
 
+def comment_threads(request, post_id):
+    """Следующая страница веток обсуждения (HTML-фрагмент)"""
+    post = get_object_or_404(Post, pk=post_id)
+    try:
+        after = int(request.GET.get('after', ''))
+    except ValueError:
+        after = None
+    page = tree.load_threads(post, request.user, after=after)
+    return render(request, 'discussions/includes/comment_threads.html', {
+        'post': post,
+        'threads': page.threads,
+        'next_after': page.next_after,
+    })
+
+
+def comment_replies(request, pk):
+    """Скрытые ответы на комментарий (HTML-фрагмент)"""
+    comment = get_object_or_404(Comment.objects.select_related('post'), pk=pk)
+    return render(request, 'discussions/includes/comment_threads.html', {
+        'post': comment.post,
+        'threads': tree.load_replies(comment, request.user),
+    })
+
+
 @login_required
 def toggle_like_post(request, post_id):
     """Лайк/дизлайк поста"""
@@ -149,9 +220,12 @@ def toggle_like_post(request, post_id):
         post.likes.add(request.user)
         is_liked = True
     
+    # Счетчик обновлен сигналом m2m_changed
+    post.refresh_from_db(fields=['likes_count'])
+    
     return JsonResponse({
         'is_liked': is_liked,
-        'likes_count': post.likes.count()
+        'likes_count': post.likes_count
     })
 
 
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Export
+
+
+@admin.register(Export)
+class ExportAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'format', 'club', 'status', 'rows', 'size', 'created_at', 'finished_at')
+    list_filter = ('kind', 'format', 'status', 'created_at')
+    search_fields = ('user__username', 'club__name')
+    raw_id_fields = ('user', 'club')
+    readonly_fields = ('created_at', 'finished_at')
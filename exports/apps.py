@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ExportsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'exports'
+    verbose_name = 'Экспорт данных'
+    
+    def ready(self):
+        import exports.signals
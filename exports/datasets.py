@@ -0,0 +1,121 @@
+"""
+Наборы данных для экспорта.
+
+Набор - таблица с фиксированными колонками, строки которой читаются из
+одного или нескольких querysets через values_list().iterator(chunk_size):
+на PostgreSQL это серверный курсор, на SQLite - выборка порциями, поэтому
+память не зависит от размера клуба или истории. Модели не создаются,
+связанные поля берутся тем же запросом через JOIN.
+"""
+import posixpath
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from django.conf import settings
+
+from books.models import Book, ReadingProgress
+from discussions.models import Comment, Post
+
+CHUNK_SIZE = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+@dataclass
+class Dataset:
+    name: str
+    columns: tuple
+    # [(queryset values_list, функция строка -> строка в порядке columns)]
+    sources: list
+    # Функция, возвращающая [(имя в архиве, имя файла в хранилище)] для ZIP
+    covers: Optional[Callable] = None
+    written: int = field(default=0, init=False)
+
+    def count(self):
+        return sum(queryset.count() for queryset, _ in self.sources)
+
+    def rows(self):
+        for queryset, convert in self.sources:
+            for row in queryset.iterator(chunk_size=CHUNK_SIZE):
+                self.written += 1
+                yield convert(row)
+
+    def filename(self, fmt):
+        return f'{self.name}.{fmt}'
+
+
+def _cover_name(prefix, file_name):
+    return f'covers/{prefix}{posixpath.splitext(file_name)[1].lower()}'
+
+
+DISCUSSION_COLUMNS = (
+    'type', 'id', 'post_id', 'parent_id', 'created_at', 'author', 'title',
+    'post_type', 'chapter', 'content', 'likes_count', 'comments_count',
+)
+
+
+def club_discussions(club):
+    """Посты клуба, затем комментарии, сгруппированные по постам"""
+    posts = Post.objects.filter(club=club).order_by('pk').values_list(
+        'pk', 'created_at', 'author__username', 'title', 'post_type', 'chapter',
+        'content', 'likes_count', 'comments_count',
+    )
+    comments = Comment.objects.filter(post__club=club).order_by('post_id', 'pk').values_list(
+        'pk', 'post_id', 'parent_id', 'created_at', 'author__username', 'content', 'likes_count',
+    )
+
+    def post_row(row):
+        pk, created_at, author, title, post_type, chapter, content, likes, comments_count = row
+        return ('post', pk, pk, None, created_at, author, title, post_type, chapter, content, likes, comments_count)
+
+    def comment_row(row):
+        pk, post_id, parent_id, created_at, author, content, likes = row
+        return ('comment', pk, post_id, parent_id, created_at, author, '', '', None, content, likes, None)
+
+    def covers():
+        if club.cover:
+            yield _cover_name('club', club.cover.name), club.cover.name
+        if club.current_book_id:
+            cover = Book.objects.filter(pk=club.current_book_id).values_list('cover', flat=True).first()
+            if cover:
+                yield _cover_name(f'book-{club.current_book_id}', cover), cover
+
+    return Dataset(
+        name=f'club-{club.pk}-discussions',
+        columns=DISCUSSION_COLUMNS,
+        sources=[(posts, post_row), (comments, comment_row)],
+        covers=covers,
+    )
+
+
+READING_COLUMNS = (
+    'book_id', 'title', 'author', 'isbn', 'pages', 'pages_read', 'current_chapter',
+    'is_completed', 'started_at', 'completed_at', 'updated_at', 'notes',
+)
+
+
+def reading_history(user):
+    progress = ReadingProgress.objects.filter(user=user).order_by('started_at', 'pk').values_list(
+        'book_id', 'book__title', 'book__author', 'book__isbn', 'book__pages', 'pages_read',
+        'current_chapter', 'is_completed', 'started_at', 'completed_at', 'updated_at', 'notes',
+    )
+
+    def covers():
+        books = (
+            Book.objects.filter(reading_progresses__user=user).exclude(cover='').exclude(cover__isnull=True)
+            .order_by('pk').values_list('pk', 'cover')
+        )
+        for pk, cover in books.iterator(chunk_size=CHUNK_SIZE):
+            yield _cover_name(f'book-{pk}', cover), cover
+
+    return Dataset(
+        name=f'reading-history-{user.username}',
+        columns=READING_COLUMNS,
+        sources=[(progress, tuple)],
+        covers=covers,
+    )
+
+
+def for_export(export):
+    """Набор данных для записи Export"""
+    if export.kind == export.KIND_CLUB:
+        return club_discussions(export.club)
+    return reading_history(export.user)
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clubs', '0002_reading_pace'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Export',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('club', 'Обсуждения клуба'), ('reading', 'История чтения')], max_length=20, verbose_name='Данные')),
+                ('format', models.CharField(choices=[('csv', 'CSV'), ('jsonl', 'JSONL'), ('zip', 'ZIP с обложками')], max_length=10, verbose_name='Формат')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Готовится'), ('done', 'Готова'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('file', models.FileField(blank=True, upload_to='exports/', verbose_name='Файл')),
+                ('rows', models.PositiveIntegerField(default=0, verbose_name='Строк')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Размер, байт')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Готова')),
+                ('club', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='exports', to='clubs.club', verbose_name='Клуб')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exports', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Экспорт',
+                'verbose_name_plural': 'Экспорты',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='export',
+            index=models.Index(fields=['user', '-created_at'], name='exports_exp_user_id_422185_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class Export(models.Model):
+    """Выгрузка данных, подготовленная фоновой задачей"""
+    KIND_CLUB = 'club'
+    KIND_READING = 'reading'
+    KIND_CHOICES = [
+        (KIND_CLUB, 'Обсуждения клуба'),
+        (KIND_READING, 'История чтения'),
+    ]
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('jsonl', 'JSONL'),
+        ('zip', 'ZIP с обложками'),
+    ]
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Готовится'),
+        (STATUS_DONE, 'Готова'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='exports', verbose_name='Пользователь')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name='Данные')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, verbose_name='Формат')
+    club = models.ForeignKey('clubs.Club', on_delete=models.CASCADE, blank=True, null=True, related_name='exports', verbose_name='Клуб')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name='Статус')
+    file = models.FileField(upload_to='exports/', blank=True, verbose_name='Файл')
+    rows = models.PositiveIntegerField(default=0, verbose_name='Строк')
+    size = models.PositiveBigIntegerField(default=0, verbose_name='Размер, байт')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name='Готова')
+    
+    class Meta:
+        verbose_name = _('Экспорт')
+        verbose_name_plural = _('Экспорты')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f'{self.get_kind_display()} ({self.format}, {self.get_status_display()})'
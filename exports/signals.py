@@ -0,0 +1,70 @@
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from jobs.queue import job
+from notifications_custom.fanout import bulk_notify
+from . import datasets, formats
+from .models import Export
+
+TTL_DAYS = getattr(settings, 'EXPORT_TTL_DAYS', 7)
+
+
+@receiver(post_delete, sender=Export)
+def delete_export_file(sender, instance, **kwargs):
+    """Удаляет файл выгрузки из хранилища вместе с записью"""
+    if instance.file:
+        instance.file.delete(save=False)
+
+
+@job('exports.build')
+def build_export(export_id):
+    """
+    Готовит выгрузку в файл хранилища и уведомляет пользователя.
+
+    Данные пишутся потоком во временный файл на диске, а из него - в
+    хранилище (в S3 - multipart-частями), так что память воркера не
+    зависит от размера выгрузки.
+    """
+    export = Export.objects.select_related('user', 'club').filter(pk=export_id).first()
+    if export is None or export.status == Export.STATUS_DONE:
+        return
+    Export.objects.filter(pk=export.pk).update(status=Export.STATUS_RUNNING, error='')
+    dataset = datasets.for_export(export)
+    try:
+        with tempfile.TemporaryFile() as output:
+            for chunk in formats.stream(dataset, export.format):
+                output.write(chunk)
+            size = output.tell()
+            output.seek(0)
+            # Случайный каталог: в публичном хранилище имя файла нельзя подобрать
+            export.file.save(f'{uuid.uuid4().hex}/{dataset.filename(export.format)}', File(output), save=False)
+    except Exception as error:
+        Export.objects.filter(pk=export.pk).update(status=Export.STATUS_FAILED, error=str(error))
+        raise
+
+    export.status = Export.STATUS_DONE
+    export.rows = dataset.written
+    export.size = size
+    export.finished_at = timezone.now()
+    export.save(update_fields=['file', 'status', 'rows', 'size', 'finished_at'])
+    bulk_notify(
+        export,
+        [export.user_id],
+        verb='готов к скачиванию',
+        description=f'Экспорт "{export.get_kind_display()}" готов к скачиванию',
+    )
+
+
+@job('exports.cleanup')
+def cleanup_exports():
+    """Удаляет выгрузки старше EXPORT_TTL_DAYS вместе с файлами"""
+    cutoff = timezone.now() - timedelta(days=TTL_DAYS)
+    for export in Export.objects.filter(created_at__lt=cutoff).iterator():
+        export.delete()
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = 'exports'
+
+urlpatterns = [
+    path('', views.export_list, name='list'),
+    path('reading/<str:fmt>/', views.export_reading, name='reading'),
+    path('clubs/<int:club_id>/<str:fmt>/', views.export_club, name='club'),
+    path('<int:pk>/download/', views.download, name='download'),
+]
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
+
+from clubs.models import Club
+from jobs.queue import enqueue
+from . import datasets, formats
+from .models import Export
+
+# Выгрузки больше этого числа строк готовятся фоновой задачей
+SYNC_MAX_ROWS = getattr(settings, 'EXPORT_SYNC_MAX_ROWS', 50000)
+
+
+@login_required
+def export_list(request):
+    """Выгрузки пользователя и экспорт истории чтения"""
+    return render(request, 'exports/list.html', {
+        'exports': Export.objects.filter(user=request.user).select_related('club')[:50],
+        'formats': Export.FORMAT_CHOICES,
+    })
+
+
+@login_required
+@require_POST
+def export_reading(request, fmt):
+    """История чтения пользователя"""
+    return _export(request, Export.KIND_READING, fmt, datasets.reading_history(request.user))
+
+
+@login_required
+@require_POST
+def export_club(request, club_id, fmt):
+    """Посты и комментарии клуба (для администраторов и модераторов)"""
+    club = get_object_or_404(Club, pk=club_id)
+    if not (club.can_manage(request.user) or request.user.is_staff):
+        messages.error(request, 'Экспорт обсуждений доступен только администраторам и модераторам клуба.')
+        return redirect('clubs:detail', pk=club.pk)
+    return _export(request, Export.KIND_CLUB, fmt, datasets.club_discussions(club), club=club)
+
+
+def _export(request, kind, fmt, dataset, club=None):
+    """Небольшая выгрузка отдается сразу потоком, большая ставится в очередь"""
+    if fmt not in formats.STREAMS:
+        raise Http404
+    if request.POST.get('background') or dataset.count() > SYNC_MAX_ROWS:
+        export = Export.objects.create(user=request.user, kind=kind, format=fmt, club=club)
+        enqueue('exports.build', export.pk)
+        messages.info(request, 'Экспорт готовится. Когда он будет готов, придет уведомление со ссылкой для скачивания.')
+        return redirect('exports:list')
+    response = StreamingHttpResponse(formats.stream(dataset, fmt), content_type=formats.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{dataset.filename(fmt)}"'
+    return response
+
+
+@login_required
+def download(request, pk):
+    """Готовая выгрузка; файл читается из хранилища кусками"""
+    export = get_object_or_404(Export, pk=pk, user=request.user, status=Export.STATUS_DONE)
+    if not export.file:
+        raise Http404
+    return FileResponse(export.file.open('rb'), as_attachment=True, filename=export.file.name.rsplit('/', 1)[-1])
@@ -0,0 +1,35 @@
+"""
+Создает копии изображений для уже загруженных файлов.
+
+Запуск: python manage.py generate_image_variants [--now]
+По умолчанию ставит задачи images.generate в очередь; с --now строит
+копии в текущем процессе.
+"""
+from django.core.management.base import BaseCommand
+
+from images.signals import IMAGE_FIELDS, generate
+from jobs.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Создает копии обложек и аватаров (IMAGE_FIELD_VARIANTS) для существующих файлов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--now', action='store_true', help='Создать копии сразу, без очереди')
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, field_names in IMAGE_FIELDS.items():
+            for field_name in field_names:
+                names = (
+                    model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                    .values_list(field_name, flat=True).distinct().iterator()
+                )
+                for name in names:
+                    if options['now']:
+                        generate(model._meta.label, field_name, name)
+                    else:
+                        enqueue('images.generate', model._meta.label, field_name, name, key=f'images.generate:{name}')
+                    total += 1
+        action = 'Обработано' if options['now'] else 'Поставлено в очередь'
+        self.stdout.write(self.style.SUCCESS(f'{action} изображений: {total}'))
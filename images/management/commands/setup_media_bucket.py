@@ -0,0 +1,60 @@
+"""
+Готовит бакет медиа-файлов для MEDIA_STORAGE=s3.
+
+Запуск: python manage.py setup_media_bucket --origin https://bookclubhub.example [--public]
+Создает бакет, если его нет, и разрешает CORS-загрузки (POST) с указанных
+адресов сайта - без этого браузер не сможет грузить файлы напрямую. С
+--public объекты бакета становятся доступны на чтение без подписи
+(для AWS_QUERYSTRING_AUTH=False).
+
+Подходит и для локальной проверки с MinIO или moto_server.
+"""
+import json
+
+from botocore.exceptions import ClientError
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Создает бакет медиа-файлов и настраивает CORS для прямой загрузки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--origin', action='append', default=[],
+                            help='Адрес сайта, с которого браузер загружает файлы (можно несколько)')
+        parser.add_argument('--public', action='store_true', help='Разрешить анонимное чтение объектов')
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'bucket'):
+            raise CommandError('Команда нужна только для MEDIA_STORAGE=s3')
+        bucket = default_storage.bucket
+        client = bucket.meta.client
+        try:
+            client.head_bucket(Bucket=bucket.name)
+        except ClientError:
+            params = {'Bucket': bucket.name}
+            region = default_storage.region_name
+            if region and region != 'us-east-1':
+                params['CreateBucketConfiguration'] = {'LocationConstraint': region}
+            client.create_bucket(**params)
+            self.stdout.write(f'Создан бакет {bucket.name}')
+
+        origins = options['origin'] or ['*']
+        client.put_bucket_cors(Bucket=bucket.name, CORSConfiguration={'CORSRules': [{
+            'AllowedOrigins': origins,
+            'AllowedMethods': ['POST', 'GET'],
+            'AllowedHeaders': ['*'],
+            'MaxAgeSeconds': 3600,
+        }]})
+
+        if options['public']:
+            client.put_bucket_policy(Bucket=bucket.name, Policy=json.dumps({
+                'Version': '2012-10-17',
+                'Statement': [{
+                    'Effect': 'Allow',
+                    'Principal': '*',
+                    'Action': 's3:GetObject',
+                    'Resource': f'arn:aws:s3:::{bucket.name}/*',
+                }],
+            }))
+        self.stdout.write(self.style.SUCCESS(f'Бакет {bucket.name} готов, CORS: {", ".join(origins)}'))
@@ -0,0 +1,55 @@
+from django.apps import apps
+from django.db.models.signals import post_init, post_save, post_delete
+from jobs.queue import job, enqueue
+from . import variants
+
+# Модель -> поля изображений, для которых заданы варианты
+IMAGE_FIELDS = {}
+for key in variants.FIELD_VARIANTS:
+    label, field_name = key.rsplit('.', 1)
+    IMAGE_FIELDS.setdefault(apps.get_model(label), []).append(field_name)
+
+
+def _names(instance):
+    return {name: getattr(instance.__dict__.get(name), 'name', instance.__dict__.get(name)) or None
+            for name in IMAGE_FIELDS[type(instance)]}
+
+
+def remember_images(sender, instance, **kwargs):
+    """Запоминает имена файлов, чтобы строить копии только для новых загрузок"""
+    instance._image_names = _names(instance)
+
+
+def generate_variants(sender, instance, **kwargs):
+    """Ставит в очередь создание копий для нового файла"""
+    previous = getattr(instance, '_image_names', {})
+    current = _names(instance)
+    for field_name, name in current.items():
+        old = previous.get(field_name)
+        if name and name != old:
+            enqueue('images.generate', sender._meta.label, field_name, name, key=f'images.generate:{name}')
+        if old and old != name:
+            variants.forget(old)
+    instance._image_names = current
+
+
+def forget_variants(sender, instance, **kwargs):
+    for name in _names(instance).values():
+        if name:
+            variants.forget(name)
+
+
+for model in IMAGE_FIELDS:
+    post_init.connect(remember_images, sender=model, dispatch_uid=f'images.remember:{model._meta.label}')
+    post_save.connect(generate_variants, sender=model, dispatch_uid=f'images.generate:{model._meta.label}')
+    post_delete.connect(forget_variants, sender=model, dispatch_uid=f'images.forget:{model._meta.label}')
+
+
+@job('images.generate')
+def generate(model_label, field_name, file_name):
+    """Создает все копии изображения, заданные для поля модели"""
+    field = apps.get_model(model_label)._meta.get_field(field_name)
+    if not field.storage.exists(file_name):
+        return
+    source = variants.Source(file_name, field.storage)
+    variants.generate_all(source, variants.field_variants(field.model, field_name))
@@ -0,0 +1,66 @@
+from django import template
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+
+from images import variants as image_variants
+
+register = template.Library()
+
+SIGNING_SALT = 'images.variant'
+
+
+def variant_url(file, variant, density, fmt, state):
+    """Готовая копия отдается из хранилища, остальные - через ленивую генерацию"""
+    if state and image_variants.variant_key(variant, density, fmt) in state['ready']:
+        return default_storage.url(image_variants.variant_name(state['hash'], variant, density, fmt))
+    token = signing.dumps([file.name, variant, density, fmt], salt=SIGNING_SALT)
+    return reverse('images:variant', kwargs={'token': token})
+
+
+def srcset(file, variant, fmt, state):
+    return ', '.join(
+        f'{variant_url(file, variant, density, fmt, state)} {density}x'
+        for density in image_variants.DENSITIES
+    )
+
+
+@register.simple_tag
+def picture(file, variant, alt='', **attrs):
+    """
+    <picture> с копиями изображения в AVIF/WebP и JPEG для плотностей 1x и 2x.
+
+    {% picture book.cover 'book_list' alt=book.title class='card-img-top' %}
+    Дополнительные именованные аргументы становятся атрибутами <img>.
+    """
+    if not file:
+        return ''
+    spec = image_variants.VARIANTS.get(variant)
+    if spec is None:
+        return format_html('<img src="{}" alt="{}"{}>', file.url, alt, _attrs(attrs))
+
+    state = image_variants.get_state(file.name)
+    formats = image_variants.supported_formats()
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}">',
+        ((image_variants.FORMATS[fmt][1], srcset(file, variant, fmt, state)) for fmt in formats[:-1]),
+    )
+    fallback = formats[-1]
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    if spec.get('crop'):
+        attrs.setdefault('width', spec['width'])
+        attrs.setdefault('height', spec['height'])
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" alt="{}"{}></picture>',
+        sources,
+        variant_url(file, variant, 1, fallback, state),
+        srcset(file, variant, fallback, state),
+        alt,
+        _attrs(attrs),
+    )
+
+
+def _attrs(attrs):
+    return format_html_join('', ' {}="{}"', ((name.replace('_', '-'), value) for name, value in attrs.items()))
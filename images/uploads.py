@@ -0,0 +1,154 @@
+"""
+Загрузка изображений браузером прямо в хранилище.
+
+Если хранилище умеет подписывать формы загрузки (bookclubhub.storage.
+MediaStorage), браузер запрашивает у images.views.upload подписанную
+форму, отправляет файл в бакет и кладет в скрытое поле <поле>_upload
+полученный токен. Форма модели (DirectUploadMixin) проверяет токен и
+записывает в поле ключ уже загруженного объекта: байты изображения не
+проходят через воркеры приложения.
+
+С локальным хранилищем скрытые поля остаются пустыми и файл загружается
+обычной формой.
+"""
+import posixpath
+import uuid
+
+from PIL import Image
+from django import forms
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from . import variants
+
+SIGNING_SALT = 'images.upload'
+MAX_SIZE = getattr(settings, 'MEDIA_DIRECT_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+EXPIRES = getattr(settings, 'MEDIA_DIRECT_UPLOAD_EXPIRES', 600)
+# Только растровые форматы: SVG из публичного бакета исполнял бы скрипты
+CONTENT_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.avif': 'image/avif',
+}
+EXTENSIONS = tuple(CONTENT_TYPES)
+
+
+def enabled(storage=None):
+    storage = storage or default_storage
+    return getattr(settings, 'MEDIA_DIRECT_UPLOADS', True) and hasattr(storage, 'presigned_post')
+
+
+def _field(label):
+    """Поле модели по метке 'app.Model.field'; загружать можно только поля с копиями изображений"""
+    if label not in variants.FIELD_VARIANTS:
+        raise ValidationError('Поле не принимает загрузки')
+    model_label, field_name = label.rsplit('.', 1)
+    return apps.get_model(model_label)._meta.get_field(field_name)
+
+
+def new_upload(label, filename, content_type, size):
+    """
+    Подписанная форма загрузки файла для поля label.
+
+    Ключ объекта строится по upload_to поля со случайным именем; имя файла
+    пользователя используется только ради расширения. Возвращает
+    {'url', 'fields', 'token'}.
+    """
+    field = _field(label)
+    extension = posixpath.splitext(filename)[1].lower()
+    if CONTENT_TYPES.get(extension) != content_type:
+        raise ValidationError('Можно загрузить только изображение JPEG, PNG, GIF, WebP или AVIF')
+    if not 0 < size <= MAX_SIZE:
+        raise ValidationError(f'Размер файла должен быть не больше {MAX_SIZE // (1024 * 1024)} МБ')
+    name = field.generate_filename(None, f'{uuid.uuid4().hex}{extension}')
+    post = default_storage.presigned_post(name, content_type, MAX_SIZE, EXPIRES)
+    post['token'] = signing.dumps([label, name], salt=SIGNING_SALT)
+    return post
+
+
+def _is_image(name):
+    """Объект читается Pillow, и его формат совпадает с расширением ключа"""
+    expected = CONTENT_TYPES.get(posixpath.splitext(name)[1].lower())
+    try:
+        with default_storage.open(name, 'rb') as file:
+            image = Image.open(file)
+            image_format = image.format
+            image.verify()
+    except Exception:
+        return False
+    return Image.MIME.get(image_format) == expected
+
+
+def claim(label, token):
+    """
+    Имя загруженного объекта по токену.
+
+    Браузер загружает файл мимо формы, поэтому содержимое проверяется здесь
+    так же, как это делает forms.ImageField; не прошедший проверку объект
+    удаляется. ValidationError, если токен чужой, файла нет или это не
+    изображение.
+    """
+    try:
+        token_label, name = signing.loads(token, salt=SIGNING_SALT, max_age=EXPIRES * 2)
+    except signing.BadSignature:
+        raise ValidationError('Ссылка на загруженный файл устарела, загрузите его еще раз')
+    if token_label != label or not default_storage.exists(name):
+        raise ValidationError('Загруженный файл не найден, загрузите его еще раз')
+    if not _is_image(name):
+        default_storage.delete(name)
+        raise ValidationError('Загрузите правильное изображение. Файл поврежден или не является изображением.')
+    return name
+
+
+class DirectUploadMixin:
+    """
+    Форма модели с прямой загрузкой полей direct_upload_fields.
+
+    Для каждого поля добавляется скрытое поле <поле>_upload; его атрибуты
+    data-* использует static/js/direct_upload.js. Файл из обычной формы
+    имеет приоритет над токеном.
+    """
+
+    direct_upload_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._direct_uploads = {}
+        direct = enabled()
+        for name in self.direct_upload_fields:
+            attrs = {}
+            if direct:
+                attrs = {
+                    'data-direct-upload': self._upload_label(name),
+                    'data-file-input': self[name].auto_id,
+                    'data-presign-url': reverse('images:upload'),
+                }
+            self.fields[f'{name}_upload'] = forms.CharField(required=False, widget=forms.HiddenInput(attrs=attrs))
+
+    def _upload_label(self, name):
+        return f'{self._meta.model._meta.label}.{name}'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for name in self.direct_upload_fields:
+            token = cleaned_data.get(f'{name}_upload')
+            if not token or self.files.get(self.add_prefix(name)):
+                continue
+            try:
+                self._direct_uploads[name] = claim(self._upload_label(name), token)
+            except ValidationError as error:
+                self.add_error(name, error)
+        return cleaned_data
+
+    def _post_clean(self):
+        super()._post_clean()
+        for name, file_name in self._direct_uploads.items():
+            # Объект уже в хранилище: FieldFile с этим именем считается сохраненным
+            setattr(self.instance, name, file_name)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'images'
+
+urlpatterns = [
+    path('uploads/', views.upload, name='upload'),
+    path('<str:token>/', views.variant, name='variant'),
+]
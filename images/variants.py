@@ -0,0 +1,164 @@
+"""
+Варианты изображений (обложки, аватары) в современных форматах.
+
+Для исходного файла ImageField строятся уменьшенные копии по описаниям из
+IMAGE_VARIANTS в плотностях 1x и 2x и в форматах IMAGE_FORMATS (AVIF и
+WebP, если Pillow их поддерживает, плюс JPEG для старых браузеров).
+Копии сохраняются в хранилище файлов под MEDIA_ROOT/variants/ с хешем
+содержимого исходника в имени, поэтому их можно отдавать с бессрочным
+кешированием: новый файл - новое имя.
+
+Копии создаются фоновой задачей images.generate после загрузки файла или
+лениво при первом запросе (images.views.variant). Что уже создано, хранится
+в кеше Django, чтобы тег {% picture %} не проверял файлы при каждом показе.
+
+Веб-сервер должен отдавать /media/variants/ с заголовком
+Cache-Control: public, max-age=31536000, immutable.
+"""
+import hashlib
+import io
+import posixpath
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+VARIANTS = getattr(settings, 'IMAGE_VARIANTS', {})
+FIELD_VARIANTS = getattr(settings, 'IMAGE_FIELD_VARIANTS', {})
+DENSITIES = (1, 2)
+QUALITY = getattr(settings, 'IMAGE_QUALITY', {'avif': 55, 'webp': 75, 'jpeg': 80})
+ROOT = 'variants'
+STATE_TIMEOUT = None
+
+FORMATS = {
+    'avif': ('AVIF', 'image/avif'),
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+FALLBACK_FORMAT = 'jpeg'
+
+# Исходный файл: FieldFile или Source(имя, хранилище)
+Source = namedtuple('Source', ['name', 'storage'])
+
+
+def supported_formats():
+    """Форматы из IMAGE_FORMATS, которые умеет кодировать установленный Pillow"""
+    formats = [
+        fmt for fmt in getattr(settings, 'IMAGE_FORMATS', ('avif', 'webp'))
+        if fmt in FORMATS and features.check(fmt)
+    ]
+    return formats + [FALLBACK_FORMAT]
+
+
+def _state_key(name):
+    return f'image-variants:{hashlib.md5(name.encode()).hexdigest()}'
+
+
+def get_state(name):
+    """{'hash': хеш исходника, 'ready': [созданные варианты]} или None"""
+    return cache.get(_state_key(name))
+
+
+def _set_state(name, state):
+    cache.set(_state_key(name), state, STATE_TIMEOUT)
+
+
+def source_hash(file):
+    """Хеш содержимого исходного файла (первые 16 символов sha256)"""
+    digest = hashlib.sha256()
+    with file.storage.open(file.name, 'rb') as source:
+        for chunk in iter(lambda: source.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def ensure_state(file):
+    """Состояние исходника; при первом обращении считает хеш содержимого"""
+    state = get_state(file.name)
+    if state is None:
+        state = {'hash': source_hash(file), 'ready': []}
+        _set_state(file.name, state)
+    return state
+
+
+def variant_key(variant, density, fmt):
+    return f'{variant}@{density}x.{fmt}'
+
+
+def variant_name(file_hash, variant, density, fmt):
+    """Путь копии в хранилище: variants/ab/abcdef...-book_list@2x.webp"""
+    return posixpath.join(ROOT, file_hash[:2], f'{file_hash}-{variant_key(variant, density, fmt)}')
+
+
+def render(source, variant, density, fmt):
+    """Строит копию изображения и возвращает ее байты"""
+    spec = VARIANTS[variant]
+    size = (spec['width'] * density, spec['height'] * density)
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if spec.get('crop'):
+            image = ImageOps.fit(image, size, Image.LANCZOS)
+        else:
+            image = image.copy()
+            image.thumbnail(size, Image.LANCZOS)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if fmt == 'jpeg' or not has_alpha:
+            if has_alpha:
+                background = Image.new('RGB', image.size, 'white')
+                background.paste(image.convert('RGBA'), mask=image.convert('RGBA').getchannel('A'))
+                image = background
+            else:
+                image = image.convert('RGB')
+        else:
+            image = image.convert('RGBA')
+        output = io.BytesIO()
+        image.save(output, FORMATS[fmt][0], quality=QUALITY.get(fmt, 80))
+    return output.getvalue()
+
+
+def generate(file, variant, density, fmt, storage=None):
+    """
+    Создает копию, если ее еще нет, и возвращает (имя в хранилище, байты|None).
+
+    Байты возвращаются, только если копия построена в этом вызове.
+    """
+    storage = storage or default_storage
+    state = ensure_state(file)
+    name = variant_name(state['hash'], variant, density, fmt)
+    data = None
+    if not storage.exists(name):
+        with file.storage.open(file.name, 'rb') as source:
+            data = render(source, variant, density, fmt)
+        if not storage.exists(name):
+            storage.save(name, ContentFile(data))
+    key = variant_key(variant, density, fmt)
+    # Состояние перечитывается: другой процесс мог отметить свои копии
+    state = get_state(file.name) or state
+    if key not in state['ready']:
+        state['ready'] = state['ready'] + [key]
+        _set_state(file.name, state)
+    return name, data
+
+
+def field_variants(model, field_name):
+    """Варианты, которые заранее строятся для поля модели (IMAGE_FIELD_VARIANTS)"""
+    return FIELD_VARIANTS.get(f'{model._meta.label}.{field_name}', ())
+
+
+def generate_all(file, variants):
+    """Создает все плотности и форматы для перечисленных вариантов"""
+    created = 0
+    for variant in variants:
+        for density in DENSITIES:
+            for fmt in supported_formats():
+                _, data = generate(file, variant, density, fmt)
+                created += data is not None
+    return created
+
+
+def forget(name):
+    """Сбрасывает состояние исходника (после замены или удаления файла)"""
+    cache.delete(_state_key(name))
@@ -0,0 +1,50 @@
+from django.contrib.auth.decorators import login_required
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET, require_POST
+
+from . import uploads, variants
+from .templatetags.images import SIGNING_SALT
+
+
+@require_GET
+@cache_control(public=True, max_age=3600)
+def variant(request, token):
+    """Лениво создает копию изображения и перенаправляет на файл в хранилище"""
+    try:
+        name, variant_name, density, fmt = signing.loads(token, salt=SIGNING_SALT)
+    except (signing.BadSignature, ValueError):
+        raise Http404
+    if variant_name not in variants.VARIANTS or density not in variants.DENSITIES or fmt not in variants.supported_formats():
+        raise Http404
+    source = variants.Source(name, default_storage)
+    if not default_storage.exists(name):
+        variants.forget(name)
+        raise Http404
+    stored_name, _ = variants.generate(source, variant_name, density, fmt)
+    # Файл с хешем содержимого в имени кешируется бессрочно
+    return HttpResponseRedirect(default_storage.url(stored_name))
+
+
+@login_required
+@require_POST
+def upload(request):
+    """Подписанная форма для загрузки изображения браузером прямо в хранилище"""
+    if not uploads.enabled():
+        raise Http404
+    try:
+        size = int(request.POST.get('size', 0))
+        post = uploads.new_upload(
+            request.POST.get('field', ''),
+            request.POST.get('filename', ''),
+            request.POST.get('content_type', ''),
+            size,
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Некорректный размер файла'}, status=400)
+    except ValidationError as error:
+        return JsonResponse({'error': ' '.join(error.messages)}, status=400)
+    return JsonResponse(post)
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'key', 'status', 'attempts', 'run_after', 'created_at')
+    list_filter = ('status', 'name', 'created_at')
+    search_fields = ('key', 'name', 'last_error')
+    readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,76 @@
+"""
+Бэкенды исполнения фоновых задач.
+
+- sync: выполняет задачу сразу после фиксации транзакции (тесты, отладка);
+- thread: пул потоков внутри процесса (один сервер без брокера);
+- celery: задачи отправляются воркерам Celery.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from .queue import run_job
+
+
+class SyncBackend:
+    """Выполнение в текущем потоке"""
+    
+    def submit(self, job_id):
+        run_job(job_id)
+
+
+class ThreadBackend:
+    """Выполнение в пуле потоков текущего процесса"""
+    
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'JOBS_THREAD_WORKERS', 4),
+            thread_name_prefix='jobs',
+        )
+    
+    def submit(self, job_id):
+        self.executor.submit(self._run, job_id)
+    
+    def _run(self, job_id):
+        try:
+            delay = run_job(job_id)
+        finally:
+            # Соединения с БД привязаны к потоку и сами не закрываются
+            connections.close_all()
+        if delay is not None:
+            timer = threading.Timer(delay, self.submit, args=[job_id])
+            timer.daemon = True
+            timer.start()
+
+
+class CeleryBackend:
+    """Отправка задачи воркерам Celery"""
+    
+    def submit(self, job_id):
+        from .tasks import run_job_task
+        run_job_task.delay(job_id)
+
+
+BACKENDS = {
+    'sync': SyncBackend,
+    'thread': ThreadBackend,
+    'celery': CeleryBackend,
+}
+
+_backend = None
+_lock = threading.Lock()
+
+
+def get_backend():
+    """Возвращает бэкенд из настройки JOBS_BACKEND (имя или путь к классу)"""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                name = getattr(settings, 'JOBS_BACKEND', 'thread')
+                backend_class = BACKENDS.get(name) or import_string(name)
+                _backend = backend_class()
+    return _backend
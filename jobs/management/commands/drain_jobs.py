@@ -0,0 +1,48 @@
+"""
+Выполняет накопившиеся фоновые задачи в текущем процессе.
+
+Нужна после перезапуска сервера с бэкендом thread (задачи из пула потоков
+теряются вместе с процессом) и для ручного разбора очереди.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import due_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Выполняет все готовые задачи из очереди jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Максимальное число задач за запуск')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Вернуть в очередь задачи, исчерпавшие попытки')
+        parser.add_argument('--stale-minutes', type=int, default=30,
+                            help='Через сколько минут зависшая задача в статусе running возвращается в очередь')
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        requeued = Job.objects.filter(status=Job.STATUS_RUNNING, updated_at__lt=stale_before).update(
+            status=Job.STATUS_PENDING, updated_at=timezone.now()
+        )
+        if options['retry_failed']:
+            requeued += Job.objects.filter(status=Job.STATUS_FAILED).update(
+                status=Job.STATUS_PENDING, attempts=0, run_after=timezone.now(), updated_at=timezone.now()
+            )
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь: {requeued}')
+
+        processed = 0
+        limit = options['limit']
+        while limit is None or processed < limit:
+            job_id = due_jobs().order_by('run_after').values_list('pk', flat=True).first()
+            if job_id is None:
+                break
+            run_job(job_id)
+            processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {processed}'))
@@ -0,0 +1,100 @@
+"""
+Очередь фоновых задач.
+
+Задача регистрируется декоратором @job и ставится в очередь через enqueue().
+Запись Job создается в той же транзакции, что и вызвавшие ее изменения
+(outbox), а передача бэкенду происходит только после фиксации транзакции.
+Повторная постановка с тем же ключом идемпотентности ничего не делает.
+"""
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, 'JOBS_MAX_ATTEMPTS', 5)
+RETRY_BACKOFF = getattr(settings, 'JOBS_RETRY_BACKOFF', 10)
+
+_registry = {}
+
+
+def job(name):
+    """Регистрирует функцию как фоновую задачу"""
+    def decorator(func):
+        _registry[name] = func
+        func.job_name = name
+        return func
+    return decorator
+
+
+def enqueue(name, *args, key=None):
+    """Ставит задачу в очередь после фиксации текущей транзакции"""
+    if name not in _registry:
+        raise KeyError(f'Неизвестная задача: {name}')
+    key = key or f'{name}:{uuid.uuid4().hex}'
+    
+    queued, created = Job.objects.get_or_create(key=key, defaults={'name': name, 'args': list(args)})
+    if created:
+        from .backends import get_backend
+        transaction.on_commit(lambda: get_backend().submit(queued.pk))
+    return queued
+
+
+def run_job(job_id):
+    """
+    Выполняет задачу из очереди.
+
+    Возвращает задержку в секундах до следующей попытки или None,
+    если повторять не нужно (выполнена, исчерпаны попытки, уже взята другим
+    воркером).
+    """
+    # Захват задачи атомарным UPDATE: один и тот же job выполнится один раз
+    claimed = Job.objects.filter(pk=job_id, status=Job.STATUS_PENDING).update(
+        status=Job.STATUS_RUNNING,
+        attempts=F('attempts') + 1,
+        updated_at=timezone.now(),
+    )
+    if not claimed:
+        return None
+    
+    queued = Job.objects.get(pk=job_id)
+    try:
+        func = _registry[queued.name]
+        func(*queued.args)
+    except Exception:
+        logger.exception('Ошибка фоновой задачи %s', queued.key)
+        return _schedule_retry(queued, traceback.format_exc())
+    
+    Job.objects.filter(pk=job_id).update(status=Job.STATUS_DONE, last_error='', updated_at=timezone.now())
+    return None
+
+
+def _schedule_retry(queued, error):
+    """Возвращает задачу в очередь с экспоненциальной задержкой"""
+    if queued.attempts >= MAX_ATTEMPTS:
+        Job.objects.filter(pk=queued.pk).update(
+            status=Job.STATUS_FAILED, last_error=error, updated_at=timezone.now()
+        )
+        return None
+    
+    delay = RETRY_BACKOFF * 2 ** (queued.attempts - 1)
+    Job.objects.filter(pk=queued.pk).update(
+        status=Job.STATUS_PENDING,
+        last_error=error,
+        run_after=timezone.now() + timedelta(seconds=delay),
+        updated_at=timezone.now(),
+    )
+    return delay
+
+
+def due_jobs():
+    """Задачи, готовые к выполнению"""
+    return Job.objects.filter(status=Job.STATUS_PENDING, run_after__lte=timezone.now())
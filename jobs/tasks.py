@@ -0,0 +1,20 @@
+import time
+
+from celery import shared_task
+
+from .queue import enqueue, run_job
+
+
+@shared_task(bind=True, max_retries=None, ignore_result=True)
+def run_job_task(self, job_id):
+    """Выполняет задачу из очереди jobs в воркере Celery"""
+    delay = run_job(job_id)
+    if delay is not None:
+        raise self.retry(countdown=delay)
+
+
+@shared_task(ignore_result=True)
+def enqueue_periodic(name, period=3600):
+    """Ставит задачу jobs в очередь из Celery beat не чаще раза за period секунд"""
+    slot = int(time.time() // period)
+    enqueue(name, key=f'{name}:{slot}')
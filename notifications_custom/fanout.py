@@ -0,0 +1,67 @@
+"""
+Пакетная рассылка уведомлений.
+
+notify.send создает уведомления по одному (один INSERT на получателя),
+поэтому для рассылки всем участникам клуба строки Notification собираются
+в памяти и записываются через bulk_create порциями.
+"""
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.query import QuerySet
+from django.utils import timezone
+from swapper import load_model
+
+BATCH_SIZE = getattr(settings, 'NOTIFICATIONS_BATCH_SIZE', 500)
+
+
+def _content_type_fields(prefix, obj):
+    """Поля generic-связи уведомления для объекта"""
+    if obj is None:
+        return {}
+    return {
+        f'{prefix}_content_type': ContentType.objects.get_for_model(obj),
+        f'{prefix}_object_id': obj.pk,
+    }
+
+
+def bulk_notify(actor, recipients, verb, action_object=None, target=None,
+                description=None, batch_size=None):
+    """
+    Создает уведомление для каждого получателя пакетными INSERT.
+
+    recipients - QuerySet пользователей или итерируемое с их id.
+    Возвращает количество созданных уведомлений.
+    """
+    Notification = load_model('notifications', 'Notification')
+    batch_size = batch_size or BATCH_SIZE
+
+    if isinstance(recipients, QuerySet):
+        recipients = recipients.values_list('pk', flat=True).iterator(chunk_size=batch_size)
+
+    # Общие для всех получателей поля вычисляются один раз
+    common = {
+        'actor_content_type': ContentType.objects.get_for_model(actor),
+        'actor_object_id': actor.pk,
+        'verb': str(verb),
+        'description': description,
+        'timestamp': timezone.now(),
+        'level': Notification.LEVELS.info,
+        'public': True,
+    }
+    common.update(_content_type_fields('action_object', action_object))
+    common.update(_content_type_fields('target', target))
+
+    created = 0
+    batch = []
+    with transaction.atomic():
+        for recipient_id in recipients:
+            batch.append(Notification(recipient_id=recipient_id, **common))
+            if len(batch) >= batch_size:
+                Notification.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            Notification.objects.bulk_create(batch)
+            created += len(batch)
+    return created
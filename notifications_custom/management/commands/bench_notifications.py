@@ -0,0 +1,78 @@
+"""
+Бенчмарк рассылки уведомлений о новом посте в зависимости от размера клуба.
+
+Отдельно замеряется создание поста (путь запроса, только постановка задачи
+в очередь) и сама рассылка, которая выполняется фоновой задачей.
+
+Запуск: python manage.py bench_notifications --sizes 10 100 1000 5000
+Все созданные данные откатываются после замера.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from notifications.signals import notify
+
+from clubs.models import Club, ClubMembership
+from discussions.models import Post
+from discussions.signals import send_new_post_notifications
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    """Откатывает транзакцию бенчмарка"""
+
+
+class Command(BaseCommand):
+    help = 'Измеряет время создания поста в зависимости от количества участников клуба'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000, 5000],
+                            help='Размеры клубов для замера')
+        parser.add_argument('--legacy', action='store_true',
+                            help='Дополнительно замерить рассылку через notify.send по одному')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"участников":>12} {"пост, мс":>10} {"bulk, мс":>10} {"notify.send, мс":>16}')
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    post_ms, bulk_ms, legacy_ms = self._measure(size, options['legacy'])
+                    raise _Rollback
+            except _Rollback:
+                pass
+            legacy = f'{legacy_ms:16.1f}' if legacy_ms is not None else f'{"-":>16}'
+            self.stdout.write(f'{size:>12} {post_ms:10.1f} {bulk_ms:10.1f} {legacy}')
+
+    def _measure(self, size, legacy):
+        prefix = f'bench_{size}_'
+        User.objects.bulk_create([
+            User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com')
+            for i in range(size)
+        ])
+        # SQLite не возвращает pk из bulk_create, поэтому перечитываем
+        users = list(User.objects.filter(username__startswith=prefix).order_by('pk'))
+        author = users[0]
+        club = Club.objects.create(name=f'Бенчмарк {size}', description='-', created_by=author)
+        ClubMembership.objects.bulk_create([
+            ClubMembership(club=club, user=user, role='member') for user in users
+        ])
+
+        start = time.perf_counter()
+        post = Post.objects.create(club=club, author=author, title='Бенчмарк', content='-')
+        post_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        send_new_post_notifications(post.pk)
+        bulk_ms = (time.perf_counter() - start) * 1000
+
+        legacy_ms = None
+        if legacy:
+            start = time.perf_counter()
+            for member in club.members.exclude(pk=author.pk):
+                notify.send(author, recipient=member, verb='создал новый пост',
+                            action_object=post, target=club)
+            legacy_ms = (time.perf_counter() - start) * 1000
+        return post_ms, bulk_ms, legacy_ms
@@ -0,0 +1,75 @@
+// Загрузка изображений прямо в хранилище (images/uploads.py).
+// Скрытое поле с data-direct-upload получает токен загруженного файла,
+// а поле выбора файла очищается, чтобы форма не отправляла байты на сервер.
+(function () {
+    function csrfToken(form) {
+        const input = form.querySelector('input[name="csrfmiddlewaretoken"]');
+        return input ? input.value : '';
+    }
+
+    function setStatus(fileInput, text, isError) {
+        let status = fileInput.parentNode.querySelector('.direct-upload-status');
+        if (!status) {
+            status = document.createElement('div');
+            status.className = 'direct-upload-status small mt-1';
+            fileInput.insertAdjacentElement('afterend', status);
+        }
+        status.textContent = text;
+        status.classList.toggle('text-danger', !!isError);
+        status.classList.toggle('text-muted', !isError);
+    }
+
+    async function upload(hidden, fileInput, file) {
+        const form = hidden.form;
+        const request = new FormData();
+        request.append('field', hidden.dataset.directUpload);
+        request.append('filename', file.name);
+        request.append('content_type', file.type);
+        request.append('size', file.size);
+        const presign = await fetch(hidden.dataset.presignUrl, {
+            method: 'POST',
+            body: request,
+            headers: {'X-CSRFToken': csrfToken(form)},
+            credentials: 'same-origin',
+        });
+        const post = await presign.json();
+        if (!presign.ok) {
+            throw new Error(post.error || 'Не удалось начать загрузку');
+        }
+        const body = new FormData();
+        Object.entries(post.fields).forEach(([name, value]) => body.append(name, value));
+        body.append('file', file);
+        const response = await fetch(post.url, {method: 'POST', body: body});
+        if (!response.ok) {
+            throw new Error('Хранилище отклонило файл');
+        }
+        return post.token;
+    }
+
+    document.querySelectorAll('input[data-direct-upload]').forEach(function (hidden) {
+        const fileInput = document.getElementById(hidden.dataset.fileInput);
+        if (!fileInput || !window.fetch) {
+            return;
+        }
+        fileInput.addEventListener('change', async function () {
+            const file = fileInput.files[0];
+            hidden.value = '';
+            if (!file) {
+                return;
+            }
+            const submit = hidden.form.querySelectorAll('[type="submit"]');
+            submit.forEach((button) => { button.disabled = true; });
+            setStatus(fileInput, 'Загрузка…', false);
+            try {
+                hidden.value = await upload(hidden, fileInput, file);
+                fileInput.value = '';
+                setStatus(fileInput, 'Файл загружен: ' + file.name, false);
+            } catch (error) {
+                // Файл останется в поле и уйдет обычной отправкой формы
+                setStatus(fileInput, error.message, true);
+            } finally {
+                submit.forEach((button) => { button.disabled = false; });
+            }
+        });
+    });
+})();